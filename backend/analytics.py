@@ -0,0 +1,222 @@
+"""Per-quiz score distribution and item statistics, maintained incrementally.
+
+Every graded result adds one row's worth of counts and sums to two small
+tables: ``quiz_score_counts`` (how many results got each score out of each
+total) and ``question_stats`` (sums of points earned per question, of the
+result score, and of their squares and product). Writes are atomic
+``col = col + delta`` upserts, so concurrent submissions never lose an
+update. Re-grading a result subtracts its old contribution and adds the new
+one. Reading the analytics only touches these tables, never ``results``.
+Quizzes whose results predate the tables (``Quiz.analytics_backfilled`` is
+false) are rebuilt from ``results`` once, on their first read.
+
+p-value is the mean fraction of a question's points earned, out of what it
+was worth when each result was graded. Discrimination is
+the point-biserial (Pearson) correlation between points earned on the
+question and the result's total score.
+"""
+import math
+from collections import defaultdict
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from backend import database, grading, models, papers
+
+HISTOGRAM_BINS = 10
+ITEM_SUMS = ("n", "earned_sum", "earned_sq_sum", "score_sum", "score_sq_sum", "cross_sum", "points_sum")
+
+
+def contribution(key: grading.AnswerKey, answers, feedback, selected, score, total_marks):
+    """(score, total_marks, [(question_id, points earned, points possible)]) for one result."""
+    columns = key.earned_columns([answers], [feedback], [selected])
+    items = [
+        (key.ids[i], column[0], key.points[i])
+        for i, column in enumerate(columns)
+        if selected is None or key.keys[i] in selected
+    ]
+    return score or 0, total_marks or 0, items
+
+
+def _aggregate(quiz_id, contributions, sign):
+    counts = defaultdict(int)
+    items = defaultdict(lambda: [0] * len(ITEM_SUMS))
+    for score, total_marks, earned in contributions:
+        counts[(score, total_marks)] += sign
+        for question_id, e, points in earned:
+            sums = items[question_id]
+            for i, value in enumerate((1, e, e * e, score, score * score, e * score, points)):
+                sums[i] += sign * value
+    score_rows = [
+        {"quiz_id": quiz_id, "score": score, "total_marks": total_marks, "count": count}
+        for (score, total_marks), count in counts.items() if count
+    ]
+    item_rows = [
+        {"question_id": question_id, "quiz_id": quiz_id, **dict(zip(ITEM_SUMS, sums))}
+        for question_id, sums in items.items()
+    ]
+    return score_rows, item_rows
+
+
+def _upsert_add(db: Session, model, keys, rows):
+    """Add each row's non-key columns onto the existing row, inserting it if missing."""
+    if not rows:
+        return
+    columns = [c for c in rows[0] if c not in keys and c != "quiz_id"]
+    insert = database.upsert_insert(db.get_bind())
+    if insert is not None:
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: getattr(model, c) + getattr(stmt.excluded, c) for c in columns},
+        )
+        db.execute(stmt, rows)
+        return
+    # Portable fallback: increment in place, insert what was not there yet
+    for row in rows:
+        stmt = (
+            update(model)
+            .where(*(getattr(model, k) == row[k] for k in keys))
+            .values({c: getattr(model, c) + row[c] for c in columns})
+        )
+        if db.execute(stmt).rowcount == 0:
+            db.add(model(**row))
+
+
+def apply(db: Session, quiz_id: int, contributions, sign=1):
+    """Add (sign=1) or remove (sign=-1) result contributions; the caller commits."""
+    score_rows, item_rows = _aggregate(quiz_id, contributions, sign)
+    _upsert_add(db, models.QuizScoreCount, ["quiz_id", "score", "total_marks"], score_rows)
+    _upsert_add(db, models.QuestionStats, ["question_id"], item_rows)
+
+
+def record(db: Session, quiz_id: int, contributions):
+    apply(db, quiz_id, contributions, 1)
+
+
+def replace(db: Session, quiz_id: int, old, new):
+    """Swap one result's old contribution for its new one after it was re-graded."""
+    apply(db, quiz_id, [old], -1)
+    apply(db, quiz_id, [new], 1)
+
+
+def clear(db: Session, quiz_id: int):
+    db.execute(delete(models.QuizScoreCount).where(models.QuizScoreCount.quiz_id == quiz_id))
+    db.execute(delete(models.QuestionStats).where(models.QuestionStats.quiz_id == quiz_id))
+
+
+def rebuild(db: Session, quiz_id: int):
+    """Recompute a quiz's aggregates from its results (backfill, or after a bulk regrade)."""
+    clear(db, quiz_id)
+    key = grading.get_answer_key(db, quiz_id)
+    paper = papers.get_paper(db, quiz_id)
+    rows = db.execute(
+        select(
+            models.Result.answers, models.Result.feedback, models.Result.score, models.Result.total_marks,
+            models.QuizAttempt.seed, models.QuizAttempt.max_questions, models.QuizAttempt.shuffled, models.QuizAttempt.question_ids,
+        )
+        .outerjoin(models.QuizAttempt, models.QuizAttempt.id == models.Result.attempt_id)
+        .where(models.Result.quiz_id == quiz_id)
+    ).all()
+    if not rows:
+        return
+    selections = [key.selection(papers.attempt_question_ids(paper, r)) if r.seed is not None else None for r in rows]
+    columns = key.earned_columns([r.answers for r in rows], [r.feedback for r in rows], selections)
+    contributions = []
+    for i, (r, selected) in enumerate(zip(rows, selections)):
+        earned = [(key.ids[j], column[i], key.points[j]) for j, column in enumerate(columns) if selected is None or key.keys[j] in selected]
+        contributions.append((r.score or 0, r.total_marks or 0, earned))
+    apply(db, quiz_id, contributions, 1)
+
+
+def ensure(db: Session, quiz: models.Quiz):
+    """Backfill a quiz whose results predate the aggregate tables, once.
+
+    Submissions recorded since then are in the tables too, so their presence
+    says nothing about the older results; only the flag does.
+    """
+    if quiz.analytics_backfilled:
+        return
+    rebuild(db, quiz.id)
+    quiz.analytics_backfilled = True
+    db.commit()
+
+
+def _median(score_counts, n):
+    middle = ((n - 1) // 2, n // 2)
+    values, seen = [], 0
+    for score, count in score_counts:
+        while len(values) < 2 and seen + count > middle[len(values)]:
+            values.append(score)
+        seen += count
+    return sum(values) / 2
+
+
+def _correlation(n, sx, sxx, sy, syy, sxy):
+    if n < 2:
+        return None
+    denominator = (n * sxx - sx * sx) * (n * syy - sy * sy)
+    if denominator <= 0:
+        return None
+    return (n * sxy - sx * sy) / math.sqrt(denominator)
+
+
+def summary(db: Session, quiz: models.Quiz):
+    ensure(db, quiz)
+    counts = db.execute(
+        select(models.QuizScoreCount.score, models.QuizScoreCount.total_marks, models.QuizScoreCount.count)
+        .where(models.QuizScoreCount.quiz_id == quiz.id, models.QuizScoreCount.count > 0)
+    ).all()
+
+    n = sum(c.count for c in counts)
+    by_score = defaultdict(int)
+    histogram = [0] * HISTOGRAM_BINS
+    passed = 0
+    total = total_sq = 0
+    for score, total_marks, count in counts:
+        by_score[score] += count
+        total += score * count
+        total_sq += score * score * count
+        if quiz.passing_marks is not None and score >= quiz.passing_marks:
+            passed += count
+        percent = score / total_marks if total_marks else 0
+        histogram[min(max(int(percent * HISTOGRAM_BINS), 0), HISTOGRAM_BINS - 1)] += count
+
+    mean = total / n if n else None
+    width = 100 // HISTOGRAM_BINS
+    questions = db.execute(
+        select(models.Question.id, models.QuestionBankItem.text, models.Question.point_value, models.QuestionBankItem.question_type, *(getattr(models.QuestionStats, c) for c in ITEM_SUMS))
+        .join(models.Question.item)
+        .outerjoin(models.QuestionStats, models.QuestionStats.question_id == models.Question.id)
+        .where(models.Question.quiz_id == quiz.id)
+        .order_by(models.Question.id)
+    ).all()
+
+    return {
+        "quiz_id": quiz.id,
+        "attempts": n,
+        "mean": mean,
+        "median": _median(sorted(by_score.items()), n) if n else None,
+        "std_dev": math.sqrt(max(total_sq / n - mean * mean, 0)) if n else None,
+        "min": min(by_score) if n else None,
+        "max": max(by_score) if n else None,
+        "passing_marks": quiz.passing_marks,
+        # Older quizzes may have no passing mark, and then no pass rate
+        "pass_rate": passed / n if n and quiz.passing_marks is not None else None,
+        "histogram": [
+            {"from_percent": i * width, "to_percent": (i + 1) * width, "count": count}
+            for i, count in enumerate(histogram)
+        ],
+        "questions": [
+            {
+                "question_id": q.id,
+                "text": q.text,
+                "question_type": q.question_type,
+                "point_value": q.point_value,
+                "responses": q.n or 0,
+                "p_value": q.earned_sum / q.points_sum if q.n and q.points_sum else None,
+                "discrimination": _correlation(q.n or 0, q.earned_sum, q.earned_sq_sum, q.score_sum, q.score_sq_sum, q.cross_sum),
+            }
+            for q in questions
+        ],
+    }
@@ -1,3 +1,7 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -8,13 +12,102 @@ SECRET_KEY = "supersecretkeyforquiziapp"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost; hashes made with a different cost are upgraded on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("QUIZI_BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so a small thread pool is enough to use several cores
+HASH_WORKERS = int(os.getenv("QUIZI_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.getenv("QUIZI_HASH_QUEUE_LIMIT", "256"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HashPoolBusy(Exception):
+    """Raised when too many hashing jobs are already waiting."""
+
+
+class HashPool:
+    """Dedicated, size-limited executor for bcrypt work, kept off the request threadpool."""
+
+    def __init__(self, workers, queue_limit):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(queue_limit)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _run(self, fn, args):
+        with self._lock:
+            self.pending -= 1
+            self.active += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+            self._slots.release()
+
+    def submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashPoolBusy("Password hashing queue is full")
+        with self._lock:
+            self.pending += 1
+        return self._executor.submit(self._run, fn, args)
+
+    def run(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "queue_depth": self.pending,
+                "active": self.active,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+            }
+
+
+hash_pool = HashPool(HASH_WORKERS, HASH_QUEUE_LIMIT)
+
+
+def _verify_and_rehash(plain_password, hashed_password):
+    if not pwd_context.verify(plain_password, hashed_password):
+        return False, None
+    if pwd_context.needs_update(hashed_password):
+        return True, pwd_context.hash(plain_password)
+    return True, None
+
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return hash_pool.run(pwd_context.verify, plain_password, hashed_password)
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return hash_pool.run(pwd_context.hash, password)
+
+async def get_password_hash_async(password):
+    return await hash_pool.run_async(pwd_context.hash, password)
+
+async def verify_and_rehash_async(plain_password, hashed_password):
+    """Returns (valid, new_hash); new_hash is set when the stored hash uses an outdated cost."""
+    return await hash_pool.run_async(_verify_and_rehash, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -31,8 +124,11 @@ def verify_token(token: str):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         user_type: int = payload.get("user_type")
+        user_id: Optional[int] = payload.get("uid")  # absent in tokens issued before uid was added
+        version: Optional[int] = payload.get("ver")  # likewise before ver was added
+        profile_version: Optional[int] = payload.get("pv")  # and before pv
         if email is None:
             return None
-        return {"email": email, "user_type": user_type}
+        return {"email": email, "user_type": user_type, "user_id": user_id, "version": version, "profile_version": profile_version}
     except JWTError:
         return None
@@ -0,0 +1,75 @@
+"""Server-side autosave for in-progress quiz attempts.
+
+PATCH /attempts/{id} carries only what changed since the client's last save:
+answers that changed (None clears one), new timeline events and the latest
+position/violations/time left. ``timeline_start`` is the index of the first
+event in the attempt's timeline, so a patch retried after a lost response
+doesn't add its events twice.
+
+Each patch is written to ``quiz_attempts`` in its own short transaction before
+the route answers 204. An acknowledged save is therefore in the database
+whichever worker grades the submission, and survives a server restart. That
+is what lets the final POST /results send only the tail the client has not
+had acknowledged yet.
+"""
+from datetime import datetime, timezone
+
+from backend import models
+
+SCALAR_FIELDS = ("current_index", "violations", "time_left")
+
+
+def sequence(events, start=None):
+    """Pair timeline events with their index in the attempt's timeline; an index of None always appends."""
+    return [(None if start is None else start + i, event) for i, event in enumerate(events or ())]
+
+
+def append_events(timeline, events):
+    """``timeline`` plus the (index, event) pairs it does not hold yet."""
+    timeline = list(timeline or [])
+    for index, event in events:
+        if index is None or index >= len(timeline):
+            timeline.append(event)
+    return timeline
+
+
+def patch_delta(changes):
+    """The parts of an AttemptPatch to apply, in the form ``apply_delta`` takes."""
+    return {
+        "answers": changes.answers or {},
+        "timeline": sequence(changes.timeline, changes.timeline_start),
+        "fields": {field: getattr(changes, field) for field in SCALAR_FIELDS if getattr(changes, field) is not None},
+    }
+
+
+def apply_delta(attempt: models.QuizAttempt, delta):
+    """Merge a delta into the attempt row (new objects, so the JSON columns register as changed)."""
+    if delta["answers"]:
+        answers = dict(attempt.answers or {})
+        for key, value in delta["answers"].items():
+            if value is None:
+                answers.pop(key, None)
+            else:
+                answers[key] = value
+        attempt.answers = answers
+    if delta["timeline"]:
+        attempt.timeline = append_events(attempt.timeline, delta["timeline"])
+    for field, value in delta["fields"].items():
+        setattr(attempt, field, value)
+    attempt.saved_at = datetime.now(timezone.utc)
+
+
+def attempt_state(attempt: models.QuizAttempt):
+    """The attempt as the client last saved it."""
+    return {
+        "id": attempt.id,
+        "quiz_id": attempt.quiz_id,
+        "answers": dict(attempt.answers or {}),
+        "timeline": list(attempt.timeline or []),
+        "current_index": attempt.current_index or 0,
+        "violations": attempt.violations or 0,
+        "time_left": attempt.time_left,
+        "started_at": attempt.started_at,
+        "saved_at": attempt.saved_at,
+        "submitted_at": attempt.submitted_at,
+    }
@@ -0,0 +1,117 @@
+"""Gradebook export benchmark over a synthetic course.
+
+Seeds one course with --students enrolled students, --quizzes quizzes and
+--results results (several attempts per student x quiz), then compares:
+  - naive: load every Result as an ORM object with its student, then pivot in
+    Python (what the teacher dashboard does with /results/teacher/all)
+  - gradebook CSV / Parquet: the aggregate query streamed in chunks
+reporting wall time, output size and peak Python heap (tracemalloc). Run from
+the project root:
+    python -m backend.bench_gradebook --results 50000
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import selectinload, sessionmaker
+
+from backend import gradebook, models
+from backend.database import Base
+
+
+def seed(db, n_students, n_quizzes, n_results):
+    teacher = models.User(email="t@example.com", full_name="Teacher", mobile="1", hashed_password="x", user_type=1)
+    db.add(teacher)
+    db.flush()
+    course = models.Course(title="Course", course_code="C1", subject="s", semester="1", batch="b", description="d", teacher_id=teacher.id)
+    db.add(course)
+    db.flush()
+    db.execute(insert(models.User), [
+        dict(email=f"s{i}@example.com", full_name=f"Student {i}", mobile="1", hashed_password="x", user_type=0, student_id=f"S{i:05d}")
+        for i in range(n_students)
+    ])
+    db.execute(insert(models.Quiz), [
+        dict(title=f"Quiz {i}", description="d", duration=30, passing_marks=5, total_marks=10, access_key="k", course_id=course.id)
+        for i in range(n_quizzes)
+    ])
+    student_ids = [u.id for u in db.query(models.User.id).filter(models.User.user_type == 0)]
+    quiz_ids = [q.id for q in db.query(models.Quiz.id)]
+    db.execute(insert(models.Enrollment), [dict(student_id=s, course_id=course.id) for s in student_ids])
+    start = datetime(2025, 1, 1)
+    db.execute(insert(models.Result), [
+        dict(student_id=random.choice(student_ids), quiz_id=random.choice(quiz_ids), score=random.randint(0, 10),
+             total_marks=10, answers={"1": "a"}, completed_at=start + timedelta(seconds=i))
+        for i in range(n_results)
+    ])
+    db.commit()
+    return course.id
+
+
+def naive(db, course_id):
+    quizzes = gradebook.course_quizzes(db, course_id)
+    results = (
+        db.query(models.Result).options(selectinload(models.Result.student))
+        .join(models.Quiz).filter(models.Quiz.course_id == course_id).all()
+    )
+    matrix = {}
+    for r in results:
+        row = matrix.setdefault(r.student_id, {"student": r.student})
+        row[r.quiz_id] = max(row.get(r.quiz_id, r.score), r.score)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(gradebook.header(quizzes))
+    for student_id in sorted(matrix):
+        row = matrix[student_id]
+        s = row["student"]
+        scores = [row.get(q.id) for q in quizzes]
+        writer.writerow([s.id, s.full_name, s.email, s.student_id, *scores, sum(x for x in scores if x is not None)])
+    return [buffer.getvalue().encode()]
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = sum(len(chunk) for chunk in fn())
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, size, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=2500)
+    parser.add_argument("--quizzes", type=int, default=20)
+    parser.add_argument("--results", type=int, default=50000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    path = os.path.join(tempfile.mkdtemp(), "bench_gradebook.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        course_id = seed(db, args.students, args.quizzes, args.results)
+
+    cases = [("naive ORM pivot", lambda db: naive(db, course_id)), ("gradebook csv", lambda db: gradebook.export(db, course_id, "csv"))]
+    if gradebook.parquet_supported():
+        cases.append(("gradebook parquet", lambda db: gradebook.export(db, course_id, "parquet")))
+
+    print(f"{args.results} results, {args.students} students x {args.quizzes} quizzes\n")
+    print(f"{'path':<20}{'seconds':>9}{'bytes':>11}{'peak heap MB':>14}")
+    for label, fn in cases:
+        with SessionLocal() as db:
+            seconds, size, peak = measure(lambda: fn(db))
+        print(f"{label:<20}{seconds:>9.3f}{size:>11}{peak / 1e6:>14.1f}")
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Grading throughput benchmark: per-request question scan vs compiled answer key.
+
+Run from the project root:
+    python -m backend.bench_grading --questions 50 --submissions 500
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models, grading, question_bank
+from backend.database import Base
+
+
+def seed(db, n_questions):
+    course = models.Course(title="Bench", course_code="B1", subject="", semester="", batch="", description="")
+    quiz = models.Quiz(title="Bench", description="", duration=30, passing_marks=0, total_marks=0, access_key="k", course=course)
+    db.add(quiz)
+    db.flush()
+    rows = []
+    for i in range(n_questions):
+        q_type = random.choice(["mcq", "mcq", "mcq", "true_false", "description"])
+        correct = {"mcq": random.choice("abcd"), "true_false": random.choice(["true", "false"]), "description": None}[q_type]
+        rows.append(dict(
+            text=f"Question {i}", option_a="A", option_b="B", option_c="C", option_d="D",
+            correct_option=correct, point_value=random.randint(1, 5), question_type=q_type,
+        ))
+    question_bank.add_questions(db, quiz, rows)
+    db.commit()
+    return quiz.id
+
+
+def make_submissions(db, quiz_id, count):
+    ids = [q_id for (q_id,) in db.query(models.Question.id).filter(models.Question.quiz_id == quiz_id)]
+    return [{str(q_id): random.choice(["a", "b", "c", "d", "True", " false "]) for q_id in ids} for _ in range(count)]
+
+
+def grade_by_scan(db, quiz_id, answers):
+    # The original submit_quiz_result loop
+    questions = db.query(models.Question).filter(models.Question.quiz_id == quiz_id).all()
+    score = 0
+    total = 0
+    for q in questions:
+        total += q.point_value
+        ans = str(answers.get(str(q.id), "")).lower().strip()
+        if q.question_type == 'description':
+            continue
+        correct = str(q.correct_option).lower().strip()
+        if ans == correct and ans != "":
+            score += q.point_value
+    return score, total
+
+
+def grade_by_key(db, quiz_id, answers):
+    key = grading.get_answer_key(db, quiz_id)
+    return key.score(answers), key.total_marks
+
+
+def run(label, fn, SessionLocal, quiz_id, submissions):
+    start = time.perf_counter()
+    scores = []
+    for answers in submissions:
+        db = SessionLocal()  # one session per request, like get_db
+        try:
+            scores.append(fn(db, quiz_id, answers))
+        finally:
+            db.close()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {len(submissions) / elapsed:>10.0f} submissions/s  ({elapsed * 1000:.1f} ms total)")
+    return scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--submissions", type=int, default=500)
+    parser.add_argument("--db", default="sqlite://", help="database URL (default: in-memory SQLite)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.db, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = SessionLocal()
+    quiz_id = seed(db, args.questions)
+    submissions = make_submissions(db, quiz_id, args.submissions)
+    db.close()
+
+    print(f"{args.submissions} submissions against a {args.questions}-question quiz")
+    before = run("before (question scan)", grade_by_scan, SessionLocal, quiz_id, submissions)
+    grading.invalidate_answer_key(quiz_id)
+    after = run("after (answer key)", grade_by_key, SessionLocal, quiz_id, submissions)
+    assert before == after, "compiled answer key disagrees with the original grading loop"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Question payload size and serialization benchmark.
+
+Compares, for one quiz, the old per-request path (ORM rows validated into
+QuestionResponse on every call) against the cached student paper in list and
+columnar form. Run from the project root:
+    python -m backend.bench_payload --questions 200
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models, papers, question_bank, schemas
+from backend.database import Base
+
+
+def seed(db, n_questions):
+    course = models.Course(title="Bench", course_code="B1", subject="", semester="", batch="", description="")
+    quiz = models.Quiz(title="Bench", description="", duration=30, passing_marks=0, total_marks=0, access_key="k", course=course)
+    db.add(quiz)
+    db.flush()
+    words = "photosynthesis relativity algorithm database network compiler protocol molecule".split()
+    rows = []
+    for i in range(n_questions):
+        rows.append(dict(
+            text=f"Question {i}: " + " ".join(random.choices(words, k=12)) + "?",
+            option_a=" ".join(random.choices(words, k=3)),
+            option_b=" ".join(random.choices(words, k=3)),
+            option_c=" ".join(random.choices(words, k=3)),
+            option_d=" ".join(random.choices(words, k=3)),
+            correct_option=random.choice("abcd"),
+            point_value=random.randint(1, 5),
+        ))
+    question_bank.add_questions(db, quiz, rows)
+    db.commit()
+    return quiz.id
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn()
+    return (time.perf_counter() - start) / repeat, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    quiz_id = seed(db, args.questions)
+
+    def per_request():
+        # What start_quiz used to do on every call
+        rows = db.query(models.Question).filter_by(quiz_id=quiz_id).all()
+        return json.dumps([schemas.QuestionResponse.model_validate(q).model_dump() for q in rows]).encode()
+
+    paper = papers.build_paper(db, quiz_id)
+    indices = papers.select_indices(len(paper), papers.new_seed(), 0, True)
+
+    cases = [
+        ("per-request QuestionResponse", per_request),
+        ("cached paper, list", lambda: paper.render(indices)),
+        ("cached paper, columnar", lambda: paper.render_columnar(indices)),
+    ]
+
+    print(f"{args.questions}-question quiz, {args.repeat} renders each\n")
+    print(f"{'path':<30}{'bytes':>9}{'gzip':>8}{'ms/render':>11}")
+    for label, fn in cases:
+        seconds, body = timed(fn, args.repeat)
+        print(f"{label:<30}{len(body):>9}{len(gzip.compress(body)):>8}{seconds * 1000:>11.3f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
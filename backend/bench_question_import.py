@@ -0,0 +1,93 @@
+"""Bulk question import benchmark.
+
+Writes a pipe-delimited MCQ bank of --questions lines, then imports it into
+an empty quiz two ways:
+  - json bulk: what /quizzes/{id}/questions/bulk does with the browser-parsed
+    list: validate every row as QuestionCreate, then store the whole list in
+    the question bank at once
+  - streamed import: question_import.import_questions reading the file line by
+    line with executemany batches
+reporting wall time and peak Python heap (tracemalloc). Run from the project
+root:
+    python -m backend.bench_question_import --questions 100000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, question_bank, question_import, schemas
+from backend.database import Base
+
+
+def write_bank(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(f"Question number {i}? | Option one {i} | Option two | Option three | Option four | {'abcd'[i % 4]} | {i % 5 + 1}\n")
+
+
+def json_bulk(db, quiz_id, path):
+    # The browser's parse, then the JSON route's validation and add_all
+    with open(path) as f:
+        rows = []
+        for line in f:
+            parts = [p.strip() for p in line.split("|")]
+            rows.append(dict(text=parts[0], question_type="mcq", option_a=parts[1], option_b=parts[2], option_c=parts[3],
+                             option_d=parts[4], correct_option=parts[5].lower(), point_value=int(parts[6])))
+    questions = [schemas.QuestionCreate(**row) for row in rows]
+    question_bank.add_questions(db, db.get(models.Quiz, quiz_id), [q.model_dump(exclude={"quiz_id"}) for q in questions])
+    question_bank.update_total_marks(db, quiz_id)
+    db.commit()
+    return len(questions)
+
+
+def streamed(db, quiz_id, path):
+    with open(path, "rb") as f:
+        summary = question_import.import_questions(db, quiz_id, f, "mcq")
+    db.commit()
+    return summary["imported"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=100000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    bank = os.path.join(directory, "bank.txt")
+    write_bank(bank, args.questions)
+    print(f"{args.questions} questions, {os.path.getsize(bank) / 1e6:.1f} MB file\n")
+    print(f"{'path':<18}{'seconds':>9}{'imported':>10}{'peak heap MB':>14}")
+
+    for label, fn in [("json bulk", json_bulk), ("streamed import", streamed)]:
+        path = os.path.join(directory, "bench_import.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            teacher = models.User(email="t@example.com", full_name="Teacher", mobile="1", hashed_password="x", user_type=1)
+            course = models.Course(title="Course", course_code="C1", subject="s", semester="1", batch="b", description="d", teacher=teacher)
+            quiz = models.Quiz(title="Quiz", description="d", duration=30, passing_marks=1, total_marks=0, access_key="k", course=course)
+            db.add(quiz)
+            db.commit()
+            quiz_id = quiz.id
+
+        with SessionLocal() as db:
+            tracemalloc.start()
+            start = time.perf_counter()
+            imported = fn(db, quiz_id, bank)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print(f"{label:<18}{seconds:>9.2f}{imported:>10}{peak / 1e6:>14.1f}")
+        engine.dispose()
+        os.remove(path)
+    os.remove(bank)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Question search benchmark: FTS5 index vs LIKE scan.
+
+Fills a SQLite question bank with --questions generated questions, builds the
+FTS5 index, then runs the same searches through search.search both ways:
+  - like: the fallback, every term as text LIKE '%term%' (what filtering a
+    downloaded list amounts to, done by the database)
+  - fts5: MATCH on question_bank_fts, bm25-ranked, with snippets
+Both return the first --limit hits. Also reports the index build time, its
+size, and the insert cost the sync triggers add. Run from the project root:
+    python -m backend.bench_search --questions 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from backend import models, search
+from backend.database import Base
+
+BATCH = 10000
+SYLLABLES = "ka ri to mu sel va no phi dra lon quis ter ba zo gen cy".split()
+
+
+def vocabulary(n, rng):
+    words = set()
+    while len(words) < n:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def rows(start, count, words, rng, course_id):
+    for i in range(start, start + count):
+        # Zipf-like word frequencies, plus marker words at fixed rates
+        body = [words[min(int(rng.paretovariate(1.2)) - 1, len(words) - 1)] for _ in range(12)]
+        if i % 100000 == 7:
+            body.append("xenolith")
+        if i % 1000 == 3:
+            body.append("photosynthesis")
+        if i % 10 == 3:
+            body.append("equation")
+        yield dict(course_id=course_id, content_hash=f"{i:064x}", text=" ".join(body) + "?", option_a="a", option_b="b",
+                   option_c="c", option_d="d", correct_option="a", question_type="mcq", random_key=rng.random())
+
+
+def load(engine, start, count, words, rng, course_id):
+    table = models.QuestionBankItem.__table__
+    with engine.begin() as conn:
+        for offset in range(start, start + count, BATCH):
+            conn.execute(insert(table), list(rows(offset, min(BATCH, start + count - offset), words, rng, course_id)))
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = vocabulary(5000, rng)
+    path = os.path.join(tempfile.mkdtemp(), "bench_search.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        course_id = conn.execute(insert(models.Course.__table__).values(title="Bench", course_code="B1")).inserted_primary_key[0]
+
+    start = time.perf_counter()
+    load(engine, 0, args.questions, words, rng, course_id)
+    load_seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+
+    start = time.perf_counter()
+    if not search.ensure(engine):
+        raise SystemExit("This SQLite build has no FTS5 support")
+    build_seconds = time.perf_counter() - start
+    index_size = os.path.getsize(path) - size
+
+    # Insert cost with the sync trigger in place, against the plain load rate
+    start = time.perf_counter()
+    load(engine, args.questions, BATCH, words, rng, course_id)
+    trigger_seconds = time.perf_counter() - start
+
+    print(f"{args.questions} questions, {size / 1e6:.0f} MB table")
+    print(f"index build {build_seconds:.1f}s, {index_size / 1e6:.0f} MB")
+    print(f"insert {BATCH}: {load_seconds / args.questions * BATCH * 1000:.0f} ms plain, {trigger_seconds * 1000:.0f} ms with sync trigger\n")
+
+    queries = [
+        ("rare word", "xenolith"),
+        ("0.1% word", "photosynthesis"),
+        ("10% word", "equation"),
+        ("prefix", "photosyn"),
+        ("two words", "photosynthesis equation"),
+        ("no match", "zzzzzz"),
+    ]
+    Session = sessionmaker(bind=engine)
+    url = str(engine.url)
+    print(f"{'query':<14}{'like ms':>10}{'fts5 ms':>10}{'speedup':>10}{'hits':>6}")
+    with Session() as db:
+        for label, query in queries:
+            search._ready.discard(url)
+            like, like_rows = timed(lambda: search.search(db, "question_bank_fts", query, args.limit), args.repeat)
+            search._ready.add(url)
+            fts, fts_rows = timed(lambda: search.search(db, "question_bank_fts", query, args.limit), args.repeat)
+            db.expunge_all()
+            print(f"{label:<14}{like * 1000:>10.1f}{fts * 1000:>10.1f}{like / fts:>9.0f}x{len(fts_rows):>6}")
+    engine.dispose()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
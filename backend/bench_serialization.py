@@ -0,0 +1,109 @@
+"""Per-1k-row serialization cost of the list endpoints.
+
+For each row shape (results with nested student/quiz/course, quizzes with
+nested course, notifications) compares:
+  - response_model path: Pydantic from_attributes validation + JSON dump
+  - fast path: serializers.*_to_dict + orjson (QUIZI_FAST_JSON=1)
+  - fast path with the stdlib json encoder, for reference
+Rows are loaded once up front, so only serialization is timed. Run from the
+project root:
+    python -m backend.bench_serialization --rows 1000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import selectinload, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import models, schemas, serializers
+from backend.database import Base
+
+
+def seed(db, n_rows):
+    teacher = models.User(email="t@example.com", full_name="Teacher", mobile="1", hashed_password="x", user_type=1)
+    db.add(teacher)
+    db.flush()
+    course = models.Course(title="Course", course_code="C1", subject="s", semester="1", batch="b", description="d", teacher_id=teacher.id)
+    db.add(course)
+    db.flush()
+    quizzes = [models.Quiz(title=f"Quiz {i}", description="d", duration=30, passing_marks=5, total_marks=10, access_key="k", course_id=course.id) for i in range(20)]
+    students = [models.User(email=f"s{i}@example.com", full_name=f"Student {i}", mobile="1", hashed_password="x", user_type=0) for i in range(50)]
+    db.add_all(quizzes + students)
+    db.flush()
+    start = datetime(2025, 1, 1)
+    db.add_all(models.Result(
+        student_id=students[i % len(students)].id,
+        quiz_id=quizzes[i % len(quizzes)].id,
+        score=i % 10,
+        total_marks=10,
+        timeline=[{"time": "10:00:01 AM", "reason": "blur"}],
+        answers={str(q): "a" for q in range(10)},
+        completed_at=start + timedelta(minutes=i),
+    ) for i in range(n_rows))
+    db.add_all(models.Notification(
+        user_id=students[0].id, title=f"Notice {i}", message="A new quiz is available", type="quiz",
+        created_at=start + timedelta(minutes=i),
+    ) for i in range(n_rows))
+    db.commit()
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        body = fn()
+    return (time.perf_counter() - start) / repeat, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    seed(db, args.rows)
+
+    results = db.query(models.Result).options(
+        selectinload(models.Result.student),
+        selectinload(models.Result.quiz).selectinload(models.Quiz.course),
+    ).all()
+    quizzes = db.query(models.Quiz).options(selectinload(models.Quiz.course)).all()
+    # Repeat the 20 quizzes so every shape is measured over the same row count
+    quizzes = (quizzes * (args.rows // len(quizzes) + 1))[:args.rows]
+    notifs = db.query(models.Notification).all()
+
+    shapes = [
+        ("results", results, schemas.ResultResponse, serializers.result_to_dict),
+        ("quizzes", quizzes, schemas.QuizResponse, serializers.quiz_to_dict),
+        ("notifications", notifs, schemas.NotificationResponse, serializers.notification_to_dict),
+    ]
+
+    print(f"{args.rows} rows per shape, {args.repeat} renders each; cost per 1k rows\n")
+    print(f"{'shape':<15}{'path':<28}{'ms/1k':>9}{'speedup':>9}{'bytes':>10}")
+    for name, rows, model, to_dict in shapes:
+        adapter = TypeAdapter(List[model])
+        cases = [
+            ("response_model (pydantic)", lambda: adapter.dump_json(adapter.validate_python(rows, from_attributes=True))),
+            ("fast dict + orjson", lambda: orjson.dumps([to_dict(r) for r in rows])),
+            ("fast dict + json", lambda: json.dumps([to_dict(r) for r in rows], default=str).encode()),
+        ]
+        baseline = None
+        for label, fn in cases:
+            seconds, body = timed(fn, args.repeat)
+            per_1k = seconds * 1000 * 1000 / len(rows)
+            baseline = baseline or per_1k
+            print(f"{name:<15}{label:<28}{per_1k:>9.2f}{baseline / per_1k:>8.1f}x{len(body):>10}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
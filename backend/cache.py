@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from backend import models
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize=1024, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return entry[0] if entry else default
+
+    def discard_where(self, predicate):
+        with self._lock:
+            stale = [key for key, (value, _) in self._data.items() if predicate(value)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# --- Authenticated user cache ---
+# Holds plain column snapshots keyed on the user id, never live ORM objects, so a
+# cached user can be attached to whichever session the request uses. A snapshot
+# only serves tokens of its token_version, and tokens whose profile_version it
+# has caught up with: the client that edited a profile through another worker
+# comes with a newer token, which misses here and reloads the row. Other
+# sessions of that user keep their tokens and see the edit within the TTL.
+
+user_cache = TTLCache(
+    maxsize=int(os.getenv("QUIZI_USER_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("QUIZI_USER_CACHE_TTL", "60")),
+)
+
+_user_columns = [column.key for column in inspect(models.User).column_attrs]
+
+
+def snapshot_user(user):
+    return {key: getattr(user, key) for key in _user_columns}
+
+
+def restore_user(snapshot):
+    """Rebuild a detached User from a snapshot; merge(load=False) it into a session."""
+    user = models.User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+
+def user_key(payload):
+    # Tokens issued before the user id was added are keyed on their email
+    return payload["user_id"] if payload.get("user_id") is not None else payload["email"]
+
+
+def token_is_current(payload, version):
+    # Tokens issued before versioning carry none and are only bounded by their expiry
+    return payload.get("version") is None or payload["version"] == (version or 0)
+
+
+def snapshot_serves(payload, snapshot):
+    """Whether a cached snapshot may stand in for the row for this token."""
+    if not token_is_current(payload, snapshot["token_version"]):
+        return False
+    return payload.get("profile_version") is None or (snapshot["profile_version"] or 0) >= payload["profile_version"]
+
+
+def invalidate_user(user_id):
+    user_cache.discard_where(lambda snapshot: snapshot["id"] == user_id)
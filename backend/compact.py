@@ -0,0 +1,272 @@
+"""Compact binary encodings for ``Result.timeline`` and ``Result.answers``.
+
+Both columns used to hold free-form JSON. They are now stored as small
+binary blobs.
+
+The first byte of every blob says how the rest is encoded:
+
+* ``FORMAT_JSON``: UTF-8 JSON. Used for anything the compact form can't
+  reproduce exactly, so decoding always gives back an equal value (answers
+  come back ordered by question id).
+* ``FORMAT_COMPACT``: a varint-packed form.
+  - Timelines store each event's time of day as a zigzag delta in seconds
+    from the previous event. Its reason is a code: either an index into
+    ``REASONS`` or into a small per-blob table of other reasons.
+  - Answers are parallel arrays of delta-encoded question ids and value
+    codes, indexing a per-blob table of distinct answer strings.
+
+This module only depends on the standard library and SQLAlchemy, so the
+sqlite3 migration scripts can import it on their own.
+"""
+import json
+import re
+
+from sqlalchemy.types import LargeBinary, TypeDecorator
+
+FORMAT_JSON = 0
+FORMAT_COMPACT = 1
+
+# Reasons the quiz runner logs. Append only: stored blobs refer to these by index.
+BASE_REASONS = (
+    "Tab Switch/Window Blur",
+    "Face Not Detected",
+    "Looking Away (Yaw)",
+    "Looking Away (Pitch)",
+    "General Detection",
+)
+REASONS = BASE_REASONS + tuple(f"AUTO-SUBMIT: {reason}" for reason in BASE_REASONS)
+REASON_CODES = {reason: code for code, reason in enumerate(REASONS)}
+
+# toLocaleTimeString(), e.g. "9:05:01 AM", "09:05:01", or "9:05:01 PM" in recent browsers
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d\d):(\d\d)(?:(\s?)(AM|PM))?")
+HOUR12 = 1
+PAD_HOUR = 2
+
+
+def _write_varint(out: bytearray, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _write_string(out: bytearray, s):
+    raw = s.encode()
+    _write_varint(out, len(raw))
+    out += raw
+
+
+def _read_string(data, pos):
+    size, pos = _read_varint(data, pos)
+    return bytes(data[pos:pos + size]).decode(), pos + size
+
+
+def _zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n):
+    return n // 2 if n % 2 == 0 else -(n + 1) // 2
+
+
+def _json_blob(value):
+    return bytes([FORMAT_JSON]) + json.dumps(value, separators=(",", ":")).encode()
+
+
+def _legacy(data):
+    """(True, value) for JSON text stored before this encoding existed, e.g. before the migration ran."""
+    if isinstance(data, str):
+        return True, json.loads(data)
+    if data[:1] in (b"[", b"{", b"n"):
+        return True, json.loads(data)
+    return False, None
+
+
+def _parse_time(text):
+    """(seconds of day, 12-hour, AM/PM separator, zero-padded hour or None if the hour can't tell)."""
+    match = TIME_PATTERN.fullmatch(text)
+    if not match:
+        return None
+    hour, minute, second = int(match[1]), int(match[2]), int(match[3])
+    separator, meridiem = match[4] or "", match[5]
+    padded = match[1].startswith("0") if hour < 10 else None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem == "PM" else 0)
+    seconds = hour * 3600 + minute * 60 + second
+    flags = (HOUR12 if meridiem else 0) | (PAD_HOUR if padded else 0)
+    if _format_time(seconds, flags, separator) != text:
+        return None
+    return seconds, bool(meridiem), separator, padded
+
+
+def _format_time(seconds, flags, separator):
+    hour, rest = divmod(seconds, 3600)
+    minute, second = divmod(rest, 60)
+    meridiem = ""
+    if flags & HOUR12:
+        meridiem = separator + ("PM" if hour >= 12 else "AM")
+        hour = hour % 12 or 12
+    hour_text = f"{hour:02d}" if flags & PAD_HOUR else str(hour)
+    return f"{hour_text}:{minute:02d}:{second:02d}{meridiem}"
+
+
+def encode_timeline(timeline):
+    if not isinstance(timeline, list) or not timeline:
+        return _json_blob(timeline)
+    times, reasons, style, padded = [], [], None, None
+    for event in timeline:
+        if not isinstance(event, dict) or event.keys() != {"time", "reason"}:
+            return _json_blob(timeline)
+        if not isinstance(event["time"], str) or not isinstance(event["reason"], str):
+            return _json_blob(timeline)
+        parsed = _parse_time(event["time"])
+        # One time style per blob: a timeline always comes from one browser
+        if parsed is None or (style is not None and parsed[1:3] != style):
+            return _json_blob(timeline)
+        if parsed[3] is not None:
+            if padded is not None and parsed[3] != padded:
+                return _json_blob(timeline)
+            padded = parsed[3]
+        style = parsed[1:3]
+        times.append(parsed[0])
+        reasons.append(event["reason"])
+
+    local = {}
+    codes = []
+    for reason in reasons:
+        code = REASON_CODES.get(reason)
+        if code is None:
+            code = len(REASONS) + local.setdefault(reason, len(local))
+        codes.append(code)
+
+    hour12, separator = style
+    flags = (HOUR12 if hour12 else 0) | (PAD_HOUR if padded else 0)
+    out = bytearray([FORMAT_COMPACT, flags])
+    if flags & HOUR12:
+        _write_string(out, separator)
+    _write_varint(out, len(local))
+    for reason in local:
+        _write_string(out, reason)
+    _write_varint(out, len(times))
+    previous = 0
+    for seconds, code in zip(times, codes):
+        _write_varint(out, _zigzag(seconds - previous))
+        _write_varint(out, code)
+        previous = seconds
+    return bytes(out)
+
+
+def decode_timeline(data):
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    legacy, value = _legacy(data)
+    if legacy:
+        return value
+    if data[0] == FORMAT_JSON:
+        return json.loads(data[1:])
+    flags, pos, separator = data[1], 2, ""
+    if flags & HOUR12:
+        separator, pos = _read_string(data, pos)
+    count, pos = _read_varint(data, pos)
+    local = []
+    for _ in range(count):
+        reason, pos = _read_string(data, pos)
+        local.append(reason)
+    count, pos = _read_varint(data, pos)
+    timeline, seconds = [], 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        code, pos = _read_varint(data, pos)
+        seconds += _unzigzag(delta)
+        reason = REASONS[code] if code < len(REASONS) else local[code - len(REASONS)]
+        timeline.append({"time": _format_time(seconds, flags, separator), "reason": reason})
+    return timeline
+
+
+def encode_answers(answers):
+    if not isinstance(answers, dict) or not answers:
+        return _json_blob(answers)
+    entries = []
+    for key, value in answers.items():
+        # Question ids as the client sends them ("12"); anything else keeps the JSON form
+        if not isinstance(key, str) or not (key.isascii() and key.isdigit()) or str(int(key)) != key or not isinstance(value, str):
+            return _json_blob(answers)
+        entries.append((int(key), value))
+    entries.sort()
+
+    values = {}
+    for _, value in entries:
+        values.setdefault(value, len(values))
+    out = bytearray([FORMAT_COMPACT])
+    _write_varint(out, len(values))
+    for value in values:
+        _write_string(out, value)
+    _write_varint(out, len(entries))
+    previous = 0
+    for question_id, _ in entries:
+        _write_varint(out, question_id - previous)
+        previous = question_id
+    for _, value in entries:
+        _write_varint(out, values[value])
+    return bytes(out)
+
+
+def decode_answers(data):
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    legacy, value = _legacy(data)
+    if legacy:
+        return value
+    if data[0] == FORMAT_JSON:
+        return json.loads(data[1:])
+    count, pos = _read_varint(data, 1)
+    values = []
+    for _ in range(count):
+        value, pos = _read_string(data, pos)
+        values.append(value)
+    count, pos = _read_varint(data, pos)
+    question_ids, question_id = [], 0
+    for _ in range(count):
+        delta, pos = _read_varint(data, pos)
+        question_id += delta
+        question_ids.append(question_id)
+    answers = {}
+    for question_id in question_ids:
+        code, pos = _read_varint(data, pos)
+        answers[str(question_id)] = values[code]
+    return answers
+
+
+class CompactTimeline(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else encode_timeline(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decode_timeline(value)
+
+
+class CompactAnswers(TypeDecorator):
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else encode_answers(value)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else decode_answers(value)
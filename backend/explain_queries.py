@@ -0,0 +1,219 @@
+"""Run EXPLAIN QUERY PLAN over the statements the routes actually send.
+
+Every step in ``exercise`` calls a route through TestClient (or a background job
+directly) against a scratch SQLite database. A before_cursor_execute listener on
+both engines records each statement with its parameters and the step that sent
+it. Every distinct statement is then explained with the parameters it ran with,
+and plans that read a whole table are flagged.
+"""
+import sys
+import os
+import argparse
+import shutil
+import tempfile
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# Same path setup as view_db.py so this runs from the project root or backend/
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+SKIPPED_PREFIXES = ("PRAGMA", "BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE", "CREATE", "DROP")
+
+
+class StatementLog:
+    """Distinct statements in first-seen order, with their first parameters and every step that sent them."""
+
+    def __init__(self):
+        self.step = None
+        self.statements = OrderedDict()  # sql -> (parameters, [steps])
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(SKIPPED_PREFIXES):
+            return
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        entry = self.statements.setdefault(statement, (parameters, []))
+        if self.step not in entry[1]:
+            entry[1].append(self.step)
+
+    @contextmanager
+    def labelled(self, step):
+        self.step = step
+        try:
+            yield
+        finally:
+            self.step = None
+
+
+def exercise(client, log):
+    """Drive the routes the way the dashboards do, one labelled step per call."""
+    from backend import database, lifecycle, notifications
+
+    def call(step, method, url, headers=None, expect=(200, 204), **kwargs):
+        with log.labelled(step):
+            response = client.request(method, url, headers=headers, **kwargs)
+        if response.status_code not in expect:
+            print(f"  {step}: {method} {url} -> {response.status_code} {response.text[:200]}")
+        return response
+
+    def user(email, user_type):
+        call("register", "POST", "/auth/register", json=dict(email=email, full_name=email, mobile="1", password="pw", user_type=user_type))
+        token = call("login", "POST", "/auth/login", json=dict(email=email, password="pw")).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    suffix = datetime.now().strftime("%H%M%S%f")
+    T = user(f"explain-teacher-{suffix}@example.com", 1)
+    S = user(f"explain-student-{suffix}@example.com", 0)
+
+    call("get_me", "GET", "/auth/me", T)
+    S = {"Authorization": "Bearer " + call("update_me", "PUT", "/auth/me", S, json={"full_name": "Explain Student"}).headers["X-Access-Token"]}
+
+    course = dict(title="Explain", course_code=f"EX{suffix}", subject="s", semester="1", batch="b", description="d")
+    cid = call("create_course", "POST", "/courses", T, json=course).json()["id"]
+    call("update_course", "PUT", f"/courses/{cid}", T, json={**course, "description": "d2"})
+    call("enroll_student", "POST", f"/courses/{cid}/enroll", S, json={})
+    call("get_courses", "GET", "/courses")
+    call("get_all_courses", "GET", "/courses/all", S)
+    call("get_my_courses (teacher)", "GET", "/courses/my", T)
+    call("get_my_courses (student)", "GET", "/courses/my", S)
+    call("get_course", "GET", f"/courses/{cid}")
+    call("get_my_enrollments", "GET", "/enrollments/my", S)
+    call("get_my_students", "GET", "/teacher/students", T)
+
+    quiz = dict(title="Explain quiz", description="d", duration=10, passing_marks=1, total_marks=0, access_key="k", course_id=cid, attempts_count=3)
+    qid = call("create_quiz", "POST", "/quizzes", T, json=quiz).json()["id"]
+    call("update_quiz", "PUT", f"/quizzes/{qid}", T, json={**quiz, "description": "d2"})
+    questions = [
+        dict(text="a", option_a="1", option_b="2", correct_option="a", point_value=2, tags=["x"]),
+        dict(text="b", correct_option="true", question_type="true_false"),
+        dict(text="c", question_type="description", point_value=3),
+    ]
+    call("add_questions_bulk", "POST", f"/quizzes/{qid}/questions/bulk", T, json=questions)
+    call("create_question", "POST", "/questions", T, json=dict(quiz_id=qid, text="d", option_a="1", option_b="2", correct_option="b"))
+    quiz_questions = call("get_quiz_questions", "GET", f"/quizzes/{qid}/questions", T).json()
+    first = quiz_questions[0]
+    call("update_question", "PUT", f"/questions/{first['id']}", T, json=dict(text="a2", option_a="1", option_b="2", correct_option="a", point_value=2))
+    call("get_course_quizzes", "GET", f"/courses/{cid}/quizzes")
+    call("get_my_created_quizzes", "GET", "/quizzes/my", T)
+
+    bank = call("get_course_bank", "GET", f"/courses/{cid}/bank", T).json()
+    call("get_course_bank?tag", "GET", f"/courses/{cid}/bank?tag=x", T)
+    call("update_bank_item", "PUT", f"/bank/{bank[0]['id']}", T, json={"difficulty": 2, "tags": ["x", "y"]})
+    qid2 = call("create_quiz", "POST", "/quizzes", T, json={**quiz, "title": "Explain quiz 2"}).json()["id"]
+    call("add_bank_questions", "POST", f"/quizzes/{qid2}/questions/bank", T, json={"item_ids": [bank[0]["id"]]})
+    call("draw (course)", "POST", f"/quizzes/{qid2}/questions/draw", T, json={"count": 2})
+    call("draw (tag)", "POST", f"/quizzes/{qid2}/questions/draw", T, json={"count": 2, "tags": ["y"]})
+    call("draw (difficulty)", "POST", f"/quizzes/{qid2}/questions/draw", T, json={"count": 2, "difficulty": 2})
+
+    call("validate_quiz_key", "POST", f"/quizzes/{qid}/validate?key=k")
+    started = call("start_quiz", "GET", f"/quizzes/{qid}/start?key=k", S)
+    aid = int(started.headers["X-Attempt-Id"])
+    ids = sorted(q["id"] for q in started.json())
+    call("autosave_attempt", "PATCH", f"/attempts/{aid}", S, json={"answers": {str(ids[0]): "a"}, "timeline": [{"reason": "blur"}], "timeline_start": 0})
+    call("get_attempt", "GET", f"/attempts/{aid}", S)
+    call("autosave_attempt", "PATCH", f"/attempts/{aid}", S, json={"answers": {str(ids[1]): "true"}})
+    rid = call("submit_quiz_result", "POST", "/results", S, json=dict(quiz_id=qid, attempt_id=aid, answers={str(ids[2]): "text"})).json()["id"]
+
+    call("get_my_results", "GET", "/results/my", S)
+    call("get_teacher_results", "GET", "/results/teacher/all", T)
+    call("get_teacher_results?quiz_id", "GET", f"/results/teacher/all?quiz_id={qid}", T)
+    call("stream_teacher_results", "GET", "/results/teacher/stream", T)
+    call("get_result_timeline", "GET", f"/results/{rid}/timeline", T)
+    call("grade_result", "PUT", f"/results/{rid}/grade", T, json={"feedback": {str(ids[2]): {"score": 2}}})
+    call("regrade_quiz", "POST", f"/quizzes/{qid}/regrade", T)
+    call("get_quiz_analytics", "GET", f"/quizzes/{qid}/analytics", T)
+    call("export_gradebook", "GET", f"/courses/{cid}/gradebook", T)
+
+    call("search_courses", "GET", "/search/courses?q=explain")
+    call("search_quizzes", "GET", "/search/quizzes?q=explain", S)
+    call("search_questions", "GET", f"/search/questions?q=a2&course_id={cid}", T)
+
+    inbox = call("get_notifications", "GET", "/notifications?limit=1", S)
+    newest = inbox.json()[0]["id"] if inbox.json() else 1
+    call("get_notifications?before", "GET", f"/notifications?before={newest}", S)
+    call("get_notifications?since", "GET", "/notifications?since=0", S)
+    call("get_unread_count", "GET", "/notifications/unread-count", S)
+    call("mark_notification_read", "POST", f"/notifications/{newest}/read", S, expect=(200, 404))
+    call("mark_notifications_read", "POST", "/notifications/read", S, json={"max_id": newest})
+    call("delete_notifications", "POST", "/notifications/delete", S, json={"ids": [newest]})
+    call("delete_notification", "DELETE", f"/notifications/{newest}", S, expect=(200, 404))
+    with log.labelled("notification prune"), database.SessionLocal() as db:
+        notifications.prune(db, datetime.utcnow() - timedelta(days=90))
+
+    leave = call("request_to_leave_course", "POST", f"/courses/{cid}/leave-request", S, json={"reason": "explain"}).json()
+    call("get_leave_requests", "GET", "/teacher/leave-requests", T)
+    if "id" in leave:
+        call("process_leave_request", "PUT", f"/leave-requests/{leave['id']}", T, json={"status": "declined"})
+
+    with log.labelled("lifecycle reload"):
+        lifecycle.LifecycleScheduler().load()
+    with log.labelled("lifecycle finalize"), database.SessionLocal() as db:
+        lifecycle.finalize(db, qid)
+        db.rollback()
+
+    call("delete_question", "DELETE", f"/questions/{first['id']}", T)
+    call("delete_quiz", "DELETE", f"/quizzes/{qid2}", T)
+
+
+def is_full_scan(detail):
+    # "SCAN results" reads every row; "SCAN ... USING (COVERING) INDEX" walks an index instead.
+    # Scans of a materialized subquery (anon_1, subquery-1) read rows the plan already built.
+    if not detail.startswith("SCAN ") or "INDEX" in detail or "CONSTANT ROW" in detail:
+        return False
+    table = detail.split()[1]
+    return not (table.startswith("anon_") or table.startswith("(subquery-"))
+
+
+def explain(engine, log):
+    flagged = 0
+    with engine.connect() as conn:
+        for statement, (parameters, steps) in log.statements.items():
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters or ()).all()
+            scans = [row[-1] for row in plan if is_full_scan(row[-1])]
+            marker = "FULL SCAN" if scans else "ok"
+            flagged += bool(scans)
+            print(f"\n[{marker}] {', '.join(str(step) for step in steps)}")
+            print(f"    {' '.join(statement.split())[:300]}")
+            for row in plan:
+                print(f"    {'!! ' if is_full_scan(row[-1]) else '   '}{row[-1]}")
+    print(f"\n{flagged} of {len(log.statements)} distinct statements do a full table scan.")
+    return flagged
+
+
+def main(db_path=None):
+    scratch = tempfile.mkdtemp()
+    target = os.path.join(scratch, "explain.db")
+    if db_path:
+        # A copy: the routes write, and the indexes and data shape of a real database are what count
+        print(f"Using a copy of the database at: {db_path}")
+        shutil.copyfile(db_path, target)
+    else:
+        print("Using a fresh database built from models.py")
+    # The engines are created on import, so the URL has to be set first
+    os.environ["QUIZI_DATABASE_URL"] = f"sqlite:///{target}"
+
+    from fastapi.testclient import TestClient
+
+    from backend import database
+    from backend.main import app
+
+    log = StatementLog()
+    for engine in (database.engine, database.async_engine.sync_engine):
+        database.event.listen(engine, "before_cursor_execute", log.record)
+    try:
+        exercise(TestClient(app), log)
+    finally:
+        for engine in (database.engine, database.async_engine.sync_engine):
+            database.event.remove(engine, "before_cursor_execute", log.record)
+    return explain(database.engine, log)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run EXPLAIN QUERY PLAN over the statements the routes send.")
+    parser.add_argument("--db", help="path to an existing (migrated) SQLite database; a copy is used (default: fresh schema from models.py)")
+    args = parser.parse_args()
+    sys.exit(1 if main(args.db) else 0)
@@ -0,0 +1,157 @@
+"""Course gradebook export: one row per enrolled student, one column per quiz.
+
+The matrix comes from a single aggregate statement (best score per
+student x quiz, left-joined onto the enrollment list) read in batches with
+yield_per, and is written out a chunk of students at a time, so memory stays
+flat regardless of how many attempts the course has. Parquet output needs the
+optional ``pyarrow`` package.
+"""
+import csv
+import importlib.util
+import io
+from itertools import groupby
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend import models
+
+STUDENT_COLUMNS = ("student_id", "full_name", "email", "student_number")
+CHUNK_STUDENTS = 500
+FORMATS = ("csv", "parquet")
+
+
+def course_quizzes(db: Session, course_id: int):
+    return db.execute(
+        select(models.Quiz.id, models.Quiz.title, models.Quiz.total_marks)
+        .where(models.Quiz.course_id == course_id)
+        .order_by(models.Quiz.id)
+    ).all()
+
+
+def gradebook_query(course_id: int):
+    best = (
+        select(
+            models.Result.student_id,
+            models.Result.quiz_id,
+            func.max(models.Result.score).label("best_score"),
+        )
+        .join(models.Quiz, models.Quiz.id == models.Result.quiz_id)
+        .where(models.Quiz.course_id == course_id)
+        .group_by(models.Result.student_id, models.Result.quiz_id)
+        .subquery()
+    )
+    return (
+        select(
+            models.User.id, models.User.full_name, models.User.email, models.User.student_id,
+            best.c.quiz_id, best.c.best_score,
+        )
+        .select_from(models.Enrollment)
+        .join(models.User, models.User.id == models.Enrollment.student_id)
+        .outerjoin(best, best.c.student_id == models.Enrollment.student_id)
+        .where(models.Enrollment.course_id == course_id)
+        .order_by(models.User.id)
+    )
+
+
+def iter_student_rows(db: Session, course_id: int, quiz_ids):
+    """Yield (student columns..., score per quiz..., total) for each enrolled student.
+
+    Scores for quizzes not in ``quiz_ids`` are left out.
+    """
+    position = {quiz_id: i for i, quiz_id in enumerate(quiz_ids)}
+    rows = db.execute(gradebook_query(course_id).execution_options(yield_per=CHUNK_STUDENTS * 4))
+    for student, cells in groupby(rows, key=lambda row: row[:4]):
+        scores = [None] * len(position)
+        for cell in cells:
+            # The quiz list was read first: a quiz created since has no column in this export
+            column = position.get(cell.quiz_id)
+            if column is not None:
+                scores[column] = cell.best_score
+        yield (*student, *scores, sum(s for s in scores if s is not None))
+
+
+def header(quizzes):
+    return [*STUDENT_COLUMNS, *(f"{q.title} [{q.id}] /{q.total_marks}" for q in quizzes), "total"]
+
+
+def _chunks(rows, size=CHUNK_STUDENTS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_csv(quizzes, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header(quizzes))
+    for chunk in _chunks(rows):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _StreamSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_supported():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def write_parquet(quizzes, rows):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    names = header(quizzes)
+    types = [pa.int64(), pa.string(), pa.string(), pa.string()] + [pa.int64()] * (len(names) - len(STUDENT_COLUMNS))
+    schema = pa.schema([pa.field(name, type) for name, type in zip(names, types)])
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(rows):
+        # One row group per chunk of students
+        writer.write_table(pa.Table.from_arrays([pa.array(column, type=field.type) for column, field in zip(zip(*chunk), schema)], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def export(db: Session, course_id: int, format: str = "csv"):
+    """Generator of encoded gradebook chunks; ``db`` must stay open until it is exhausted."""
+    quizzes = course_quizzes(db, course_id)
+    rows = iter_student_rows(db, course_id, [q.id for q in quizzes])
+    if format == "parquet":
+        return write_parquet(quizzes, rows)
+    return write_csv(quizzes, rows)
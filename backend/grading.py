@@ -0,0 +1,171 @@
+import threading
+from array import array
+
+from sqlalchemy.orm import Session
+
+from backend import models, papers
+
+# Question type flags stored in AnswerKey.flags
+AUTO_GRADED = 0
+MANUAL_GRADED = 1  # 'description' questions, scored only through teacher feedback
+
+
+def normalize_answer(value):
+    return str(value).lower().strip()
+
+
+class AnswerKey:
+    """Compiled, read-only grading data for one quiz.
+
+    Questions are kept in id order as parallel arrays so grading a submission
+    is a single pass with no ORM objects and no per-request normalization.
+    """
+
+    __slots__ = ("quiz_id", "ids", "keys", "correct", "points", "flags", "total_marks", "positions")
+
+    def __init__(self, quiz_id, rows):
+        self.quiz_id = quiz_id
+        self.ids = array("q")
+        self.points = array("l")
+        self.flags = array("b")
+        correct = []
+        for q_id, correct_option, point_value, question_type in rows:
+            self.ids.append(q_id)
+            self.points.append(point_value or 0)
+            self.flags.append(MANUAL_GRADED if question_type == "description" else AUTO_GRADED)
+            correct.append(normalize_answer(correct_option))
+        self.correct = tuple(correct)
+        # Answers and feedback dicts are keyed by the question id as a string
+        self.keys = tuple(str(q_id) for q_id in self.ids)
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self.total_marks = sum(self.points)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def selection(self, question_ids):
+        """Set of answer keys for the questions one attempt was given (None means all)."""
+        return None if question_ids is None else {str(q_id) for q_id in question_ids}
+
+    def total_for(self, selected=None):
+        if selected is None:
+            return self.total_marks
+        return sum(points for key, points in zip(self.keys, self.points) if key in selected)
+
+    def score(self, answers, feedback=None, selected=None):
+        answers = answers or {}
+        feedback = feedback or {}
+        score = 0
+        for key, correct, points, flag in zip(self.keys, self.correct, self.points, self.flags):
+            if selected is not None and key not in selected:
+                continue
+            # Priority 1: Manual score in feedback (override)
+            q_feed = feedback.get(key)
+            if q_feed and "score" in q_feed:
+                try:
+                    score += int(q_feed["score"])
+                except (ValueError, TypeError):
+                    pass  # faulty score payload
+                continue
+            # Priority 2: Auto-grading; description questions get 0 until marked
+            if flag == MANUAL_GRADED:
+                continue
+            ans = normalize_answer(answers.get(key, ""))
+            if ans == correct and ans != "":
+                score += points
+        return score
+
+    def earned_columns(self, answers_list, feedback_list=None, selections=None):
+        """Points earned per (submission, question), as a batched loop over questions.
+
+        Returns a list of columns, one ``array`` per question, each holding the
+        points every submission earned on it. ``selections`` optionally gives, per
+        submission, the set of keys it was asked (see ``selection``). Every cell is
+        still a Python comparison on a normalized answer. What batching saves is
+        the per-submission overhead of ``score``: the key is read once per
+        question, and no ORM objects are built.
+        """
+        n = len(answers_list)
+        answers_list = [answers or {} for answers in answers_list]
+        feedback_list = [feedback or {} for feedback in (feedback_list or [None] * n)]
+        selections = selections or [None] * n
+        columns = []
+        for key, correct, points, flag in zip(self.keys, self.correct, self.points, self.flags):
+            if flag == MANUAL_GRADED or correct == "":
+                column = array("l", [0]) * n
+            else:
+                column = array("l", (
+                    points if normalize_answer(answers.get(key, "")) == correct else 0
+                    for answers in answers_list
+                ))
+            # Manual scores in feedback override the auto-graded cell
+            for i, feedback in enumerate(feedback_list):
+                q_feed = feedback.get(key) if feedback else None
+                if q_feed and "score" in q_feed:
+                    try:
+                        column[i] = int(q_feed["score"])
+                    except (ValueError, TypeError):
+                        column[i] = 0  # faulty score payload
+            # Questions left out of a student's paper earn nothing
+            for i, selected in enumerate(selections):
+                if selected is not None and key not in selected:
+                    column[i] = 0
+            columns.append(column)
+        return columns
+
+    def score_many(self, answers_list, feedback_list=None, selections=None):
+        scores = array("l", [0]) * len(answers_list)
+        for column in self.earned_columns(answers_list, feedback_list, selections):
+            for i, earned in enumerate(column):
+                scores[i] += earned
+        return scores
+
+
+# quiz_id -> (questions_version, key); see papers.questions_version
+_answer_keys = {}
+_lock = threading.Lock()
+
+
+def build_answer_key(db: Session, quiz_id: int) -> AnswerKey:
+    rows = (
+        db.query(
+            models.Question.id,
+            models.QuestionBankItem.correct_option,
+            models.Question.point_value,
+            models.QuestionBankItem.question_type,
+        )
+        .join(models.Question.item)
+        .filter(models.Question.quiz_id == quiz_id)
+        .order_by(models.Question.id)
+        .all()
+    )
+    return AnswerKey(quiz_id, rows)
+
+
+def get_answer_key(db: Session, quiz_id: int) -> AnswerKey:
+    version = papers.questions_version(db, quiz_id)
+    cached = _answer_keys.get(quiz_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    key = build_answer_key(db, quiz_id)
+    with _lock:
+        current = _answer_keys.get(quiz_id)
+        if current is None or current[0] <= version:
+            _answer_keys[quiz_id] = (version, key)
+    return key
+
+
+def selection_for_attempt(db: Session, key: AnswerKey, attempt):
+    """Answer keys for the questions in an attempt's paper; None grades the whole quiz."""
+    if attempt is None or attempt.seed is None:
+        return None
+    if attempt.question_ids is not None:
+        return key.selection(attempt.question_ids)
+    paper = papers.get_paper(db, key.quiz_id)
+    return key.selection(papers.attempt_question_ids(paper, attempt))
+
+
+def invalidate_answer_key(quiz_id: int):
+    with _lock:
+        _answer_keys.pop(quiz_id, None)
@@ -0,0 +1,312 @@
+"""Quiz lifecycle: moves quizzes through scheduled -> live -> ended on time.
+
+A quiz's status follows from its start/end window, so ``status`` computes it
+from the quiz row the caller has already loaded: no query, and no cache that
+another worker's edit could leave stale.
+
+The stored ``Quiz.status`` column and the work tied to each boundary belong
+to one scheduler for the whole deployment. Every worker runs a scheduler
+thread, but only the holder of the ``quiz-lifecycle`` row in
+``scheduler_leases`` acts on boundaries; the others keep trying to take the
+lease and succeed within QUIZI_LIFECYCLE_LEASE_SECONDS of the holder dying.
+The leader keeps a heap of upcoming boundaries and sleeps until the earliest:
+  - start: persist ``live`` and build the leader's own question paper and
+    answer key. The caches are per process, so every other worker still
+    builds its copy on its first /start request for the quiz.
+  - end: persist ``ended``
+  - end + QUIZI_QUIZ_END_GRACE_SECONDS: submit the attempts still open from
+    their autosaved answers and rebuild the quiz's analytics. The grace period
+    lets submissions sent at the deadline arrive first. Each of these
+    submissions counts against the student's attempt limit, like one the
+    student sent.
+
+The leader rebuilds its heap from ``quizzes`` every
+QUIZI_LIFECYCLE_RELOAD_SECONDS, which picks up edits made in other workers;
+``track`` schedules an edit the leader handled itself straight away. Every
+boundary action is idempotent, so one reached twice around a reload or a
+hand-over does no harm. ``draft`` stays the column default only: a quiz
+without a start time has always been open.
+"""
+import heapq
+import itertools
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from backend import analytics, database, grading, models, papers, schemas, submissions
+
+DRAFT, SCHEDULED, LIVE, ENDED = "draft", "scheduled", "live", "ended"
+FINALIZE = "finalize"  # heap action only, not a status
+
+END_GRACE_SECONDS = float(os.getenv("QUIZI_QUIZ_END_GRACE_SECONDS", "120"))
+LEASE_SECONDS = float(os.getenv("QUIZI_LIFECYCLE_LEASE_SECONDS", "30"))
+RELOAD_SECONDS = float(os.getenv("QUIZI_LIFECYCLE_RELOAD_SECONDS", "30"))
+LEASE_NAME = "quiz-lifecycle"
+
+logger = logging.getLogger(__name__)
+
+
+def now():
+    return datetime.now(timezone.utc)
+
+
+def status_at(start, end, at):
+    if end is not None and at >= database.as_utc(end):
+        return ENDED
+    if start is not None and at < database.as_utc(start):
+        return SCHEDULED
+    return LIVE
+
+
+def status(quiz: models.Quiz):
+    return status_at(quiz.start_time, quiz.end_time, now())
+
+
+def acquire_lease(db, name, owner, seconds):
+    """Take or renew the lease ``name`` for ``seconds``; False while another owner holds it."""
+    Lease = models.SchedulerLease
+    at = now()
+    expires = at + timedelta(seconds=seconds)
+    stmt = update(Lease).where(Lease.name == name, or_(Lease.owner == owner, Lease.expires_at < at)).values(owner=owner, expires_at=expires)
+    if not db.execute(stmt).rowcount:
+        if db.execute(select(Lease.name).where(Lease.name == name)).first():
+            db.rollback()
+            return False
+        try:
+            db.add(Lease(name=name, owner=owner, expires_at=expires))
+            db.flush()
+        except IntegrityError:
+            db.rollback()  # another worker created it first
+            return False
+    db.commit()
+    return True
+
+
+def release_lease(db, name, owner):
+    Lease = models.SchedulerLease
+    db.execute(delete(Lease).where(Lease.name == name, Lease.owner == owner))
+    db.commit()
+
+
+def finalize(db, quiz_id: int):
+    """Submit the quiz's open attempts as autosaved and rebuild its analytics; the caller commits.
+
+    Each submission goes through grade_submission, so it uses up one of the
+    student's attempts. Attempts the student can no longer submit (attempt
+    limit reached) are closed without a result. Returns the number of results
+    created.
+    """
+    Attempt = models.QuizAttempt
+    attempts = db.execute(select(Attempt.id, Attempt.student_id).where(Attempt.quiz_id == quiz_id, Attempt.submitted_at.is_(None))).all()
+    students = {u.id: u for u in db.execute(select(models.User).where(models.User.id.in_({a.student_id for a in attempts}))).scalars()}
+    graded, closed = 0, []
+    for attempt_id, student_id in attempts:
+        student = students.get(student_id)
+        if student is None:
+            closed.append(attempt_id)
+            continue
+        try:
+            # An empty payload: grade_submission merges in the autosaved answers and timeline
+            submissions.grade_submission(db, student, schemas.ResultCreate(quiz_id=quiz_id, attempt_id=attempt_id))
+            graded += 1
+        except submissions.SubmissionRejected:
+            closed.append(attempt_id)
+    if closed:
+        db.execute(update(Attempt).where(Attempt.id.in_(closed)).values(submitted_at=now()))
+    # Sessions don't autoflush; the rebuild has to see the results just added
+    db.flush()
+    analytics.rebuild(db, quiz_id)
+    return graded
+
+
+class LifecycleScheduler:
+    def __init__(self, grace_seconds=END_GRACE_SECONDS, lease_seconds=LEASE_SECONDS, reload_seconds=RELOAD_SECONDS):
+        self.grace = timedelta(seconds=grace_seconds)
+        self.lease_seconds = lease_seconds
+        self.reload_seconds = reload_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self._versions = {}  # quiz_id -> version of its current heap entries
+        self._heap = []  # (when, seq, quiz_id, version, action)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._renew_at = self._reload_at = None
+        self._loaded_at = None
+        self.transitions = 0
+        self.prewarmed = 0
+        self.finalized = 0
+        self.auto_submitted = 0
+
+    def _events(self, quiz_id, start, end, at):
+        version = self._versions[quiz_id] = self._versions.get(quiz_id, 0) + 1
+        start, end = database.as_utc(start), database.as_utc(end)
+        for when, action in ((start, LIVE), (end, ENDED), (end and end + self.grace, FINALIZE)):
+            if when is not None and when > at:
+                yield when, next(self._seq), quiz_id, version, action
+
+    def track(self, quiz_id, start, end):
+        """Schedule a quiz's new boundaries now, if this worker is the leader (else the leader's reload does)."""
+        if not self.leader:
+            return
+        with self._cond:
+            for entry in self._events(quiz_id, start, end, now()):
+                heapq.heappush(self._heap, entry)
+            self._cond.notify()
+
+    def forget(self, quiz_id):
+        with self._cond:
+            self._versions[quiz_id] = self._versions.get(quiz_id, 0) + 1
+
+    def load(self):
+        """Rebuild the heap from every quiz's window, correct stored statuses, and queue catch-up work."""
+        Quiz, Attempt = models.Quiz, models.QuizAttempt
+        at = now()
+        first = self._loaded_at is None
+        with database.SessionLocal() as db:
+            rows = db.execute(select(Quiz.id, Quiz.start_time, Quiz.end_time, Quiz.status)).all()
+            stale = {}
+            for quiz_id, start, end, stored in rows:
+                current = status_at(start, end, at)
+                if current != stored:
+                    stale.setdefault(current, []).append(quiz_id)
+            for current, quiz_ids in stale.items():
+                db.execute(update(Quiz).where(Quiz.id.in_(quiz_ids)).values(status=current))
+            db.commit()
+            # Past their grace period with attempts still open: ended while no leader was running,
+            # or moved into the past by an edit since the last reload
+            unfinished = select(Quiz.id).where(Quiz.end_time < at - self.grace, exists().where(Attempt.quiz_id == Quiz.id, Attempt.submitted_at.is_(None)))
+            if not first:
+                unfinished = unfinished.where(Quiz.end_time >= self._loaded_at - self.grace)
+            unfinished = db.execute(unfinished).scalars().all()
+
+        with self._cond:
+            self._versions = {}
+            heap = [entry for quiz_id, start, end, _ in rows for entry in self._events(quiz_id, start, end, at)]
+            for quiz_id in unfinished:
+                heap.append((at, next(self._seq), quiz_id, self._versions[quiz_id], FINALIZE))
+            if first:
+                # Warm the caches of windows that are open right now
+                heap.extend(
+                    (at, next(self._seq), quiz_id, self._versions[quiz_id], LIVE)
+                    for quiz_id, start, end, _ in rows if end is not None and status_at(start, end, at) == LIVE
+                )
+            heapq.heapify(heap)
+            self._heap = heap
+            self._cond.notify()
+        self._loaded_at = at
+
+    def start(self):
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="quiz-lifecycle", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if self.leader:
+            with database.SessionLocal() as db:
+                release_lease(db, LEASE_NAME, self.owner)
+            self.leader = False
+
+    def _renew(self, at):
+        was_leader = self.leader
+        try:
+            with database.SessionLocal() as db:
+                self.leader = acquire_lease(db, LEASE_NAME, self.owner, self.lease_seconds)
+        except Exception:
+            logger.exception("Lifecycle lease renewal failed")
+            self.leader = False
+        # Renew well before expiry; a follower retries at the same pace
+        self._renew_at = at + timedelta(seconds=self.lease_seconds / 3)
+        if self.leader and not was_leader:
+            self._loaded_at = None
+            self._reload_at = at
+        if was_leader and not self.leader:
+            with self._cond:
+                self._heap = []
+
+    def _next_due(self, at):
+        with self._cond:
+            while self._heap and self._heap[0][0] <= at:
+                _, _, quiz_id, version, action = heapq.heappop(self._heap)
+                if self._versions.get(quiz_id) == version:
+                    return quiz_id, action
+            return None
+
+    def _wait(self):
+        with self._cond:
+            if self._stopped:
+                return
+            wake = [self._renew_at]
+            if self.leader:
+                wake.append(self._reload_at)
+                if self._heap:
+                    wake.append(self._heap[0][0])
+            delay = (min(wake) - now()).total_seconds()
+            if delay > 0:
+                self._cond.wait(delay)
+
+    def _run(self):
+        self._renew_at = now()
+        while not self._stopped:
+            at = now()
+            if at >= self._renew_at:
+                self._renew(at)
+            if self.leader and at >= self._reload_at:
+                try:
+                    self.load()
+                except Exception:
+                    logger.exception("Lifecycle reload failed")
+                self._reload_at = at + timedelta(seconds=self.reload_seconds)
+            due = self._next_due(at) if self.leader else None
+            if due is None:
+                self._wait()
+                continue
+            try:
+                self._fire(*due)
+            except Exception:
+                logger.exception("Quiz %s %s failed", *due)
+
+    def _fire(self, quiz_id, action):
+        with database.SessionLocal() as db:
+            if action == FINALIZE:
+                self.auto_submitted += finalize(db, quiz_id)
+                db.commit()
+                self.finalized += 1
+                return
+            stmt = update(models.Quiz).where(models.Quiz.id == quiz_id, models.Quiz.status != action).values(status=action)
+            self.transitions += db.execute(stmt).rowcount
+            db.commit()
+            if action == LIVE:
+                # This process's caches only; other workers build theirs on first use
+                papers.get_paper(db, quiz_id)
+                grading.get_answer_key(db, quiz_id)
+                self.prewarmed += 1
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._heap)
+        return {
+            "leader": self.leader,
+            "owner": self.owner,
+            "pending_events": pending,
+            "transitions": self.transitions,
+            "prewarmed": self.prewarmed,
+            "finalized": self.finalized,
+            "auto_submitted": self.auto_submitted,
+            "end_grace_seconds": self.grace.total_seconds(),
+        }
+
+
+scheduler = LifecycleScheduler()
@@ -0,0 +1,121 @@
+"""Load test: N concurrent students start and submit the same quiz.
+
+Start the API first (uvicorn backend.main:app --workers 1), then from the project root:
+    python -m backend.loadtest --students 1000 --base-url http://127.0.0.1:8000
+
+Requires httpx (pip install httpx). Seeds its own teacher, course, quiz and
+students, so point it at a scratch database.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+import httpx
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def register_and_login(client, email, user_type):
+    await client.post("/auth/register", json={
+        "email": email, "full_name": email.split("@")[0], "mobile": "0",
+        "password": "loadtest", "user_type": user_type,
+    })
+    res = await client.post("/auth/login", json={"email": email, "password": "loadtest"})
+    res.raise_for_status()
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+async def seed(client, students, questions, run_id):
+    teacher = await register_and_login(client, f"teacher-{run_id}@loadtest.example.com", 1)
+    res = await client.post("/courses", headers=teacher, json={
+        "title": "Load Test", "course_code": f"LT-{run_id}", "subject": "load", "semester": "1",
+        "batch": "lt", "description": "load test course", "access_key": None,
+    })
+    res.raise_for_status()
+    course_id = res.json()["id"]
+    res = await client.post("/quizzes", headers=teacher, json={
+        "title": "Load Test Quiz", "description": "", "duration": 30, "passing_marks": 0,
+        "total_marks": 0, "access_key": "load", "course_id": course_id,
+    })
+    res.raise_for_status()
+    quiz_id = res.json()["id"]
+    res = await client.post(f"/quizzes/{quiz_id}/questions/bulk", headers=teacher, json=[
+        {"text": f"Q{i}", "option_a": "a", "option_b": "b", "option_c": "c", "option_d": "d", "correct_option": "a"}
+        for i in range(questions)
+    ])
+    res.raise_for_status()
+
+    # Logins are bcrypt-bound; keep them out of the measured phase
+    sem = asyncio.Semaphore(10)
+
+    async def make_student(i):
+        async with sem:
+            headers = await register_and_login(client, f"student-{run_id}-{i}@loadtest.example.com", 0)
+            await client.post(f"/courses/{course_id}/enroll", headers=headers, json={})
+            return headers
+
+    return quiz_id, await asyncio.gather(*(make_student(i) for i in range(students)))
+
+
+async def take_quiz(client, headers, quiz_id, latencies, errors):
+    async def timed(name, method, url, **kwargs):
+        start = time.perf_counter()
+        res = await client.request(method, url, headers=headers, **kwargs)
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if res.status_code >= 400:
+            errors[name] = errors.get(name, 0) + 1
+        return res
+
+    res = await timed("start_quiz", "GET", f"/quizzes/{quiz_id}/start", params={"key": "load"})
+    questions = res.json() if res.status_code == 200 else []
+    await timed("get_notifications", "GET", "/notifications")
+    submitted = time.perf_counter()
+    res = await timed("submit_quiz_result", "POST", "/results", json={
+        "quiz_id": quiz_id, "score": 0, "total_marks": 0,
+        "answers": {str(q["id"]): "a" for q in questions},
+    })
+    if res.status_code == 202:
+        # Journal mode (QUIZI_SUBMISSION_JOURNAL): also measure time until the result is graded
+        submission_id = res.json()["submission_id"]
+        while res.status_code == 202:
+            await asyncio.sleep(0.25)
+            res = await client.get(f"/results/submissions/{submission_id}", headers=headers)
+        latencies.setdefault("submission_graded", []).append(time.perf_counter() - submitted)
+        if res.status_code >= 400:
+            errors["submission_graded"] = errors.get("submission_graded", 0) + 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--students", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=30)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.students, max_keepalive_connections=args.students)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as client:
+        print(f"Seeding {args.students} students...")
+        quiz_id, students = await seed(client, args.students, args.questions, uuid.uuid4().hex[:8])
+
+        latencies, errors = {}, {}
+        print(f"Running {args.students} concurrent quiz-takers...")
+        start = time.perf_counter()
+        await asyncio.gather(*(take_quiz(client, h, quiz_id, latencies, errors) for h in students))
+        elapsed = time.perf_counter() - start
+
+    print(f"\nTotal wall time: {elapsed:.2f}s")
+    print(f"{'endpoint':<22}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, samples in latencies.items():
+        print(f"{name:<22}{len(samples):>7}{errors.get(name, 0):>8}"
+              f"{percentile(samples, 50) * 1000:>10.1f}{percentile(samples, 95) * 1000:>10.1f}{percentile(samples, 99) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,22 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, status, File, UploadFile
+from fastapi import FastAPI, BackgroundTasks, Depends, Header, HTTPException, Query, Request, Response, status, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
+import json
 import os
 import shutil
 from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from backend import models, schemas, auth, database
-from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager, joinedload, selectinload, undefer
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend import models, schemas, auth, database, grading, cache, notifications, papers, pubsub, serializers, gradebook, analytics, submissions, autosave, question_import, question_bank, search, lifecycle
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
 
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from typing import List
+from typing import List, Optional, Union
 
 models.Base.metadata.create_all(bind=database.engine)
+search.ensure(database.engine)
 
-app = FastAPI()
+# QUIZI_FAST_JSON=1 renders with orjson and lets the hot list routes skip response_model re-validation
+app = FastAPI(default_response_class=ORJSONResponse) if serializers.FAST_JSON else FastAPI()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login", auto_error=False)
 
 # Allow CORS for frontend
 origins = [
@@ -36,6 +44,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Attempt-Id", "X-Next-Cursor", "ETag", "X-Access-Token"],
 )
 
 # Static files for profile pictures
@@ -55,15 +64,104 @@ def get_db():
     finally:
         db.close()
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
+
+@app.get("/metrics/db")
+def get_db_metrics():
+    # Reported per engine: sync routes and async routes draw from separate pools
+    return database.all_pool_stats()
+
+@app.exception_handler(auth.HashPoolBusy)
+async def hash_pool_busy_handler(request: Request, exc: auth.HashPoolBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, please retry"}, headers={"Retry-After": "2"})
+
+@app.get("/metrics/hashing")
+def get_hashing_metrics():
+    return auth.hash_pool.stats()
+
+@app.get("/metrics/user-cache")
+def get_user_cache_metrics():
+    return cache.user_cache.stats()
+
+# Flips quiz status at start/end times and runs the start/end work (one leader across workers)
+@app.on_event("startup")
+def start_lifecycle_scheduler():
+    lifecycle.scheduler.start()
+
+@app.on_event("shutdown")
+def stop_lifecycle_scheduler():
+    lifecycle.scheduler.stop()
+
+@app.get("/metrics/lifecycle")
+def get_lifecycle_metrics():
+    return lifecycle.scheduler.stats()
+
+def user_lookup_query(payload):
+    # Tokens carry the user id, so lookups go by primary key; older tokens fall back to email
+    if payload.get("user_id") is not None:
+        return select(models.User).where(models.User.id == payload["user_id"])
+    return select(models.User).where(models.User.email == payload["email"])
+
+def resolve_user(payload, db: Session):
+    key = cache.user_key(payload)
+    snapshot = cache.user_cache.get(key)
+    if snapshot is not None and cache.snapshot_serves(payload, snapshot):
+        return db.merge(cache.restore_user(snapshot), load=False)
+    user = db.execute(user_lookup_query(payload)).scalars().first()
+    if user is None or not cache.token_is_current(payload, user.token_version):
+        return None
+    cache.user_cache.set(key, cache.snapshot_user(user))
+    return user
+
+def issue_token(user: models.User):
+    return auth.create_access_token(data={"sub": user.email, "uid": user.id, "user_type": user.user_type, "ver": user.token_version, "pv": user.profile_version})
+
+def bump_token_version(user: models.User):
+    # Revokes every token issued so far: for credential changes only. Call before committing,
+    # then send the new token with refresh_token
+    user.token_version = (user.token_version or 0) + 1
+
+def bump_profile_version(user: models.User):
+    # For other edits to the user: existing tokens stay valid, and the refreshed one
+    # makes any worker with an older cached copy reload it
+    user.profile_version = (user.profile_version or 0) + 1
+
+def refresh_token(response: Response, user: models.User):
+    cache.invalidate_user(user.id)
+    response.headers["X-Access-Token"] = issue_token(user)
+
+# Sync on purpose: FastAPI runs it in the threadpool instead of blocking the event loop
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     payload = auth.verify_token(token)
     if not payload:
         raise HTTPException(status_code=401, detail="Invalid token")
-    user = db.query(models.User).filter(models.User.email == payload["email"]).first()
+    user = resolve_user(payload, db)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
+# For routes that also serve anonymous callers
+def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme), db: Session = Depends(get_db)):
+    payload = auth.verify_token(token) if token else None
+    return resolve_user(payload, db) if payload else None
+
+# For async routes: the user is attached to the route's AsyncSession
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    payload = auth.verify_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    key = cache.user_key(payload)
+    snapshot = cache.user_cache.get(key)
+    if snapshot is not None and cache.snapshot_serves(payload, snapshot):
+        return await db.merge(cache.restore_user(snapshot), load=False)
+    user = (await db.execute(user_lookup_query(payload))).scalars().first()
+    if user is None or not cache.token_is_current(payload, user.token_version):
+        raise HTTPException(status_code=401, detail="User not found")
+    cache.user_cache.set(key, cache.snapshot_user(user))
+    return user
+
 # --- AUTH ROUTES ---
 
 @app.post("/auth/register", response_model=schemas.UserRegistrationResponse)
@@ -90,15 +188,23 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     return {"message": "Account created successfully!", "user": new_user}
 
 @app.post("/auth/login", response_model=schemas.Token)
-def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == user_credentials.email).first()
+async def login(user_credentials: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(models.User).where(models.User.email == user_credentials.email))).scalars().first()
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
-    if not auth.verify_password(user_credentials.password, user.hashed_password):
+    # Hashing runs on the bcrypt pool, not on the event loop or the shared threadpool
+    valid, new_hash = await auth.verify_and_rehash_async(user_credentials.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
-    access_token = auth.create_access_token(data={"sub": user.email, "user_type": user.user_type})
+    # Stored hash uses an outdated bcrypt cost: upgrade it transparently
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+        cache.invalidate_user(user.id)
+    
+    access_token = issue_token(user)
     return {"access_token": access_token, "token_type": "bearer", "user": user}
 
 @app.get("/auth/me", response_model=schemas.UserResponse)
@@ -106,7 +212,7 @@ def get_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 @app.post("/auth/change-password")
-def change_password(request: schemas.PasswordChangeRequest, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def change_password(request: schemas.PasswordChangeRequest, response: Response, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if not auth.verify_password(request.old_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect old password")
     
@@ -114,11 +220,13 @@ def change_password(request: schemas.PasswordChangeRequest, current_user: models
         raise HTTPException(status_code=400, detail="New passwords do not match")
     
     current_user.hashed_password = auth.get_password_hash(request.new_password)
+    bump_token_version(current_user)
     db.commit()
+    refresh_token(response, current_user)
     return {"message": "Password updated successfully"}
 
 @app.put("/auth/me", response_model=schemas.UserResponse)
-def update_me(user_update: schemas.UserUpdate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_me(user_update: schemas.UserUpdate, response: Response, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     # If email is being updated, check if it's already taken
     if user_update.email and user_update.email != current_user.email:
         existing_user = db.query(models.User).filter(models.User.email == user_update.email).first()
@@ -143,12 +251,17 @@ def update_me(user_update: schemas.UserUpdate, current_user: models.User = Depen
     if user_update.university is not None:
         current_user.university = user_update.university
 
+    if user_update.password:
+        bump_token_version(current_user)
+    else:
+        bump_profile_version(current_user)
     db.commit()
-    db.refresh(current_user)
+    refresh_token(response, current_user)
     return current_user
 
 @app.post("/auth/profile-picture")
 async def upload_profile_picture(
+    response: Response,
     file: UploadFile = File(...),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -169,13 +282,15 @@ async def upload_profile_picture(
     # Update user record
     profile_pic_url = f"http://127.0.0.1:8000/uploads/profile_pics/{filename}"
     current_user.profile_picture = profile_pic_url
+    bump_profile_version(current_user)
     db.commit()
-    db.refresh(current_user)
+    refresh_token(response, current_user)
     
     return {"message": "Profile picture uploaded successfully", "url": profile_pic_url}
 
 @app.delete("/auth/profile-picture")
 async def delete_profile_picture(
+    response: Response,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -190,7 +305,9 @@ async def delete_profile_picture(
         os.remove(full_path)
 
     current_user.profile_picture = None
+    bump_profile_version(current_user)
     db.commit()
+    refresh_token(response, current_user)
     return {"message": "Profile picture deleted successfully"}
 
 # --- TEACHER UTILS ---
@@ -251,41 +368,64 @@ def create_course(course: schemas.CourseCreate, current_user: models.User = Depe
         db.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/courses", response_model=List[schemas.CourseResponse])
-def get_courses(db: Session = Depends(get_db)):
-    courses = db.query(models.Course).all()
-    for c in courses:
-        c.quiz_count = len(c.quizzes)
+def courses_with_quiz_counts():
+    # One grouped COUNT joined onto courses instead of lazy-loading every quiz
+    counts = select(models.Quiz.course_id, func.count(models.Quiz.id).label("quiz_count")).group_by(models.Quiz.course_id).subquery()
+    return (
+        select(models.Course, func.coalesce(counts.c.quiz_count, 0))
+        .outerjoin(counts, counts.c.course_id == models.Course.id)
+    )
+
+def attach_quiz_counts(rows):
+    courses = []
+    for course, quiz_count in rows:
+        course.quiz_count = quiz_count
+        courses.append(course)
     return courses
 
+def list_courses(db: Session, response: Response, cursor, limit, subject, semester, batch):
+    query = courses_with_quiz_counts()
+    if cursor is not None:
+        query = query.where(models.Course.id > cursor)
+    if subject:
+        query = query.where(models.Course.subject == subject)
+    if semester:
+        query = query.where(models.Course.semester == semester)
+    if batch:
+        query = query.where(models.Course.batch == batch)
+    # Fetch one extra row to know whether another page exists
+    rows = db.execute(query.order_by(models.Course.id).limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1][0].id)
+    return attach_quiz_counts(rows)
+
+@app.get("/courses", response_model=List[schemas.CourseResponse])
+def get_courses(response: Response, cursor: Optional[int] = None, limit: int = Query(100, ge=1, le=500), subject: Optional[str] = None, semester: Optional[str] = None, batch: Optional[str] = None, db: Session = Depends(get_db)):
+    return list_courses(db, response, cursor, limit, subject, semester, batch)
+
 @app.get("/courses/all", response_model=List[schemas.CourseResponse])
-def get_all_courses(db: Session = Depends(get_db)):
-    courses = db.query(models.Course).all()
-    for c in courses:
-        c.quiz_count = len(c.quizzes)
-    return courses
+def get_all_courses(response: Response, cursor: Optional[int] = None, limit: int = Query(100, ge=1, le=500), subject: Optional[str] = None, semester: Optional[str] = None, batch: Optional[str] = None, db: Session = Depends(get_db)):
+    return list_courses(db, response, cursor, limit, subject, semester, batch)
 
 @app.get("/courses/my", response_model=List[schemas.CourseResponse])
-def get_my_courses(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_my_courses(current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    query = courses_with_quiz_counts()
     if current_user.user_type == 1: # Teacher
-        courses = current_user.taught_courses
+        query = query.where(models.Course.teacher_id == current_user.id).order_by(models.Course.id)
     else: # Student
-        courses = [enrollment.course for enrollment in current_user.enrollments]
-    
-    for c in courses:
-        c.quiz_count = len(c.quizzes)
-    return courses
+        query = query.join(models.Enrollment).where(models.Enrollment.student_id == current_user.id).order_by(models.Enrollment.id)
+    return attach_quiz_counts((await db.execute(query)).all())
 
 @app.get("/courses/{course_id}", response_model=schemas.CourseResponse)
 def get_course(course_id: int, db: Session = Depends(get_db)):
-    course = db.query(models.Course).filter(models.Course.id == course_id).first()
-    if not course:
+    row = db.execute(courses_with_quiz_counts().where(models.Course.id == course_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Course not found")
-    course.quiz_count = len(course.quizzes)
-    return course
+    return attach_quiz_counts([row])[0]
 
 @app.put("/courses/{course_id}", response_model=schemas.CourseResponse)
-def update_course(course_id: int, course_update: schemas.CourseCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_course(course_id: int, course_update: schemas.CourseCreate, background_tasks: BackgroundTasks, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     course = db.query(models.Course).filter(models.Course.id == course_id).first()
     if not course or course.teacher_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
@@ -293,17 +433,14 @@ def update_course(course_id: int, course_update: schemas.CourseCreate, current_u
         setattr(course, key, value)
     db.commit()
     
-    # Create notifications for all enrolled students
-    enrollments = db.query(models.Enrollment).filter_by(course_id=course.id).all()
-    for enrollment in enrollments:
-        notif = models.Notification(
-            user_id=enrollment.student_id,
-            title="Course Updated",
-            message=f"The course '{course.title}' has been updated by the instructor.",
-            type="course"
-        )
-        db.add(notif)
-    db.commit()
+    # Notify all enrolled students after the response is sent
+    background_tasks.add_task(
+        notifications.fan_out_in_background,
+        course.id,
+        "Course Updated",
+        f"The course '{course.title}' has been updated by the instructor.",
+        "course",
+    )
 
     db.refresh(course)
     return course
@@ -349,7 +486,12 @@ def enroll_student(course_id: int, enrollment_data: dict, current_user: models.U
     )
     db.add(notif)
     
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request enrolled the same student first (unique constraint)
+        db.rollback()
+        return {"message": "Already enrolled"}
     return {"message": "Successfully enrolled"}
 
 @app.post("/courses/{course_id}/leave-request")
@@ -385,34 +527,35 @@ def request_to_leave_course(course_id: int, current_user: models.User = Depends(
 # --- QUIZ ROUTES ---
 
 @app.post("/quizzes", response_model=schemas.QuizResponse)
-def create_quiz(quiz: schemas.QuizCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def create_quiz(quiz: schemas.QuizCreate, background_tasks: BackgroundTasks, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.user_type != 1:
         raise HTTPException(status_code=403, detail="Only teachers can create quizzes")
     
-    new_quiz = models.Quiz(**quiz.dict())
+    # Status follows the time window; whatever the client sent is ignored
+    new_quiz = models.Quiz(**quiz.dict(exclude={"status"}))
+    new_quiz.status = lifecycle.status(new_quiz)
     db.add(new_quiz)
     
     # Get course title safely for notification
     course = db.query(models.Course).filter(models.Course.id == quiz.course_id).first()
     course_title = course.title if course else "Unknown Course"
     
-    # Notify all enrolled students
-    enrollments = db.query(models.Enrollment).filter_by(course_id=quiz.course_id).all()
-    for enrollment in enrollments:
-        notif = models.Notification(
-            user_id=enrollment.student_id,
-            title="New Quiz Posted!",
-            message=f"A new quiz '{quiz.title}' has been added to your course: {course_title}",
-            type="quiz"
-        )
-        db.add(notif)
-    
     db.commit()
     db.refresh(new_quiz)
+    lifecycle.scheduler.track(new_quiz.id, new_quiz.start_time, new_quiz.end_time)
+
+    # Notify all enrolled students after the response is sent
+    background_tasks.add_task(
+        notifications.fan_out_in_background,
+        quiz.course_id,
+        "New Quiz Posted!",
+        f"A new quiz '{quiz.title}' has been added to your course: {course_title}",
+        "quiz",
+    )
     return new_quiz
 
 @app.put("/quizzes/{quiz_id}", response_model=schemas.QuizResponse)
-def update_quiz(quiz_id: int, quiz_update: schemas.QuizBase, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def update_quiz(quiz_id: int, quiz_update: schemas.QuizBase, background_tasks: BackgroundTasks, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.user_type != 1:
         raise HTTPException(status_code=403, detail="Only teachers can update quizzes")
     
@@ -424,23 +567,22 @@ def update_quiz(quiz_id: int, quiz_update: schemas.QuizBase, current_user: model
     if quiz.course.teacher_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this quiz")
         
-    for key, value in quiz_update.dict().items():
+    for key, value in quiz_update.dict(exclude={"status"}).items():
         setattr(quiz, key, value)
-    
+    quiz.status = lifecycle.status(quiz)
+
     db.commit()
+    lifecycle.scheduler.track(quiz.id, quiz.start_time, quiz.end_time)
     
-    # Notify all enrolled students
+    # Notify all enrolled students after the response is sent
     course_title = quiz.course.title if quiz.course else "Unknown Course"
-    enrollments = db.query(models.Enrollment).filter_by(course_id=quiz.course_id).all()
-    for enrollment in enrollments:
-        notif = models.Notification(
-            user_id=enrollment.student_id,
-            title="Quiz Updated",
-            message=f"The quiz '{quiz.title}' in course '{course_title}' has been updated.",
-            type="quiz"
-        )
-        db.add(notif)
-    db.commit()
+    background_tasks.add_task(
+        notifications.fan_out_in_background,
+        quiz.course_id,
+        "Quiz Updated",
+        f"The quiz '{quiz.title}' in course '{course_title}' has been updated.",
+        "quiz",
+    )
 
     db.refresh(quiz)
     return quiz
@@ -453,7 +595,31 @@ def get_my_enrollments(current_user: models.User = Depends(get_current_user), db
 
 @app.get("/courses/{course_id}/quizzes", response_model=List[schemas.QuizResponse])
 def get_course_quizzes(course_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Quiz).filter_by(course_id=course_id).all()
+    quizzes = db.query(models.Quiz).options(selectinload(models.Quiz.course)).filter_by(course_id=course_id).all()
+    if serializers.FAST_JSON:
+        return ORJSONResponse([serializers.quiz_to_dict(q) for q in quizzes])
+    return quizzes
+
+GRADEBOOK_MEDIA_TYPES = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+@app.get("/courses/{course_id}/gradebook")
+def export_gradebook(course_id: int, format: str = Query("csv", pattern="^(csv|parquet)$"), current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    if not course or course.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if format == "parquet" and not gradebook.parquet_supported():
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow on the server")
+    filename = f"{course.course_code}-gradebook.{format}"
+
+    def chunks():
+        # Own session, so the stream does not depend on when the request's get_db session is closed
+        export_db = database.SessionLocal()
+        try:
+            yield from gradebook.export(export_db, course_id, format)
+        finally:
+            export_db.close()
+
+    return StreamingResponse(chunks(), media_type=GRADEBOOK_MEDIA_TYPES[format], headers={"Content-Disposition": f'attachment; filename="{filename}"'})
 
 @app.get("/quizzes/my", response_model=List[schemas.QuizResponse])
 def get_my_created_quizzes(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
@@ -473,51 +639,105 @@ def validate_quiz_key(quiz_id: int, key: str, db: Session = Depends(get_db)):
     if quiz.access_key != key:
         raise HTTPException(status_code=400, detail="Invalid access key")
     
-    # Check time window
-    now = datetime.utcnow()
-    # Note: Using naive UTC for simplicity, in production use proper timezone handling
-    if quiz.start_time and now < quiz.start_time:
+    check_quiz_open(quiz)
+    return {"message": "Key validated"}
+
+def check_quiz_open(quiz: models.Quiz):
+    # From the row already loaded, so an edit in another worker applies at once
+    status = lifecycle.status(quiz)
+    if status == lifecycle.SCHEDULED:
         raise HTTPException(status_code=400, detail="Quiz has not started yet")
-    if quiz.end_time and now > quiz.end_time:
+    if status == lifecycle.ENDED:
         raise HTTPException(status_code=400, detail="Quiz has ended")
-        
-    return {"message": "Key validated"}
 
-@app.get("/quizzes/{quiz_id}/start", response_model=List[schemas.QuestionResponse])
-def start_quiz(quiz_id: int, key: str, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+QUESTION_FORMATS = "^(list|columnar)$"
+
+@app.get("/quizzes/{quiz_id}/start", response_model=List[schemas.QuestionStudentResponse])
+async def start_quiz(quiz_id: int, key: str, attempt_id: Optional[int] = None, format: str = Query("list", pattern=QUESTION_FORMATS), if_none_match: Optional[str] = Header(None), current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     # Validate key and time again for security
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    quiz = await db.get(models.Quiz, quiz_id)
     if not quiz or quiz.access_key != key:
         raise HTTPException(status_code=400, detail="Unauthorized")
-    
-    # Randomized question selection
-    import random
-    all_questions = db.query(models.Question).filter_by(quiz_id=quiz_id).all()
-    
-    if quiz.shuffle_questions:
-        random.shuffle(all_questions)
-        
-    return all_questions
+    check_quiz_open(quiz)
+
+    # Cached pre-rendered paper; the seed picks this student's subset and order
+    paper = await db.run_sync(papers.get_paper, quiz_id)
+    if attempt_id is not None:
+        # Resuming: serve the same paper again instead of drawing a new one
+        attempt = await db.get(models.QuizAttempt, attempt_id)
+        if not attempt or attempt.student_id != current_user.id or attempt.quiz_id != quiz_id:
+            raise HTTPException(status_code=404, detail="Attempt not found")
+        if attempt.submitted_at is not None:
+            raise HTTPException(status_code=409, detail="Attempt already submitted")
+    else:
+        attempt = models.QuizAttempt(
+            student_id=current_user.id,
+            quiz_id=quiz_id,
+            seed=papers.new_seed(),
+            max_questions=quiz.max_questions or 0,
+            shuffled=bool(quiz.shuffle_questions),
+        )
+        attempt.question_ids = papers.draw_question_ids(paper, attempt.seed, attempt.max_questions, attempt.shuffled)
+        db.add(attempt)
+        await db.commit()
+    
+    headers = {"X-Attempt-Id": str(attempt.id), "ETag": papers.attempt_etag(paper, attempt.seed, format)}
+    if if_none_match == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    indices = papers.attempt_indices(paper, attempt)
+    return Response(content=paper.render_as(indices, format), media_type="application/json", headers=headers)
+
+# --- ATTEMPT AUTOSAVE ROUTES ---
+
+@app.patch("/attempts/{attempt_id}", status_code=204)
+async def autosave_attempt(attempt_id: int, changes: schemas.AttemptPatch, current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    # Committed before the 204: the client treats acknowledged changes as saved and leaves them out of the submission
+    attempt = await db.get(models.QuizAttempt, attempt_id)
+    if not attempt or attempt.student_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    if attempt.submitted_at is not None:
+        raise HTTPException(status_code=409, detail="Attempt already submitted")
+    autosave.apply_delta(attempt, autosave.patch_delta(changes))
+    await db.commit()
+    return Response(status_code=204)
+
+@app.get("/attempts/{attempt_id}", response_model=schemas.AttemptResponse)
+def get_attempt(attempt_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Saved progress for resuming on another device or after the browser lost its local copy
+    attempt = db.get(models.QuizAttempt, attempt_id)
+    if not attempt or attempt.student_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Attempt not found")
+    return autosave.attempt_state(attempt)
 
 # --- QUESTION ROUTES ---
 
+def questions_changed(db: Session, quiz_id: int):
+    # Call in the transaction that changes a quiz's questions: the version bump
+    # makes every worker rebuild its cached paper and answer key for the quiz
+    papers.bump_questions_version(db, quiz_id)
+
 @app.post("/questions", response_model=schemas.QuestionResponse)
 def create_question(question: schemas.QuestionCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.user_type != 1:
         raise HTTPException(status_code=403, detail="Only teachers can manage questions")
-    
-    new_question = models.Question(**question.dict())
+
+    quiz = db.query(models.Quiz).filter(models.Quiz.id == question.quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+
+    # Content goes to the course bank; a question the bank already has is linked, not copied
+    [(item_id, _)] = question_bank.store_items(db, quiz.course_id, [question.model_dump()])
+    if db.query(models.Question.id).filter_by(quiz_id=quiz.id, item_id=item_id).first():
+        db.rollback()
+        raise HTTPException(status_code=409, detail="The quiz already has this question")
+    new_question = models.Question(quiz_id=quiz.id, item_id=item_id, point_value=question.point_value)
     db.add(new_question)
+    db.flush()
+    question_bank.update_total_marks(db, quiz.id)
+    questions_changed(db, quiz.id)
     db.commit()
+
     db.refresh(new_question)
-    
-    # Update Quiz Total Marks
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == question.quiz_id).first()
-    if quiz:
-        total = db.query(func.sum(models.Question.point_value)).filter(models.Question.quiz_id == quiz.id).scalar() or 0
-        quiz.total_marks = total
-        db.commit()
-        
     return new_question
 
 @app.post("/quizzes/{quiz_id}/questions/bulk")
@@ -530,36 +750,151 @@ def bulk_upload_questions(quiz_id: int, questions: List[schemas.QuestionCreate],
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
 
-    new_questions = [models.Question(**q.dict(exclude={'quiz_id'}), quiz_id=quiz_id) for q in questions]
-    db.add_all(new_questions)
+    added, duplicates = question_bank.add_questions(db, quiz, [q.model_dump(exclude={'quiz_id'}) for q in questions])
+    question_bank.update_total_marks(db, quiz_id)
+    questions_changed(db, quiz_id)
     db.commit()
     
-    # Update Quiz Total Marks
-    total = db.query(func.sum(models.Question.point_value)).filter(models.Question.quiz_id == quiz_id).scalar() or 0
-    quiz.total_marks = total
+    message = f"Successfully uploaded {added} questions"
+    if duplicates:
+        message += f" ({duplicates} already in the quiz were skipped)"
+    return {"message": message}
+
+@app.post("/quizzes/{quiz_id}/questions/import")
+def import_quiz_questions(quiz_id: int, file: UploadFile = File(...), format: str = Query("mcq", pattern=question_import.FORMAT_PATTERN), skip_invalid: bool = False, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can manage questions")
+
+    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if quiz.course.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    # The upload is spooled to disk by the multipart parser and read back one line at a time
+    try:
+        summary = question_import.import_questions(db, quiz_id, file.file, format, skip_invalid)
+    except question_import.ImportFailed as exc:
+        db.rollback()
+        raise HTTPException(status_code=422, detail={
+            "message": f"{exc}, nothing was imported",
+            "error_count": exc.error_count,
+            "errors": exc.errors,
+        })
+    questions_changed(db, quiz_id)
     db.commit()
-    
-    return {"message": f"Successfully uploaded {len(new_questions)} questions"}
+    return summary
+
+def can_see_answer_key(db: Session, quiz_id: int, user: models.User):
+    # The teacher who owns the course, and students with no attempts left once the quiz has ended
+    # (anyone can register as a teacher; a live quiz's key would reach classmates still answering)
+    quiz = db.query(models.Quiz).options(joinedload(models.Quiz.course)).filter(models.Quiz.id == quiz_id).first()
+    if quiz is None:
+        return False
+    if user.user_type == 1:
+        return quiz.course is not None and quiz.course.teacher_id == user.id
+    if lifecycle.status(quiz) != lifecycle.ENDED:
+        return False
+    limit = quiz.attempts_count
+    if not limit or limit <= 0:
+        return False  # unlimited attempts are never used up
+    used = db.query(models.QuizAttemptCount.count).filter_by(student_id=user.id, quiz_id=quiz_id).scalar()
+    return (used or 0) >= limit
+
+@app.get("/quizzes/{quiz_id}/questions", response_model=Union[List[schemas.QuestionResponse], List[schemas.QuestionStudentResponse]])
+def get_quiz_questions(quiz_id: int, format: str = Query("list", pattern=QUESTION_FORMATS), if_none_match: Optional[str] = Header(None), current_user: Optional[models.User] = Depends(get_optional_user), db: Session = Depends(get_db)):
+    if current_user and can_see_answer_key(db, quiz_id, current_user):
+        return db.query(models.Question).filter_by(quiz_id=quiz_id).all()
+
+    paper = papers.get_paper(db, quiz_id)
+    etag = f'"{paper.etag}-{format}"'
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=paper.render_as(range(len(paper)), format), media_type="application/json", headers={"ETag": etag})
+
+def result_load_options(include_timeline=True):
+    # ResultResponse nests student, quiz and quiz.course; load them in three queries instead of per row
+    options = (
+        selectinload(models.Result.student),
+        selectinload(models.Result.quiz).selectinload(models.Quiz.course),
+    )
+    return options + timeline_options(include_timeline)
 
-@app.get("/quizzes/{quiz_id}/questions", response_model=List[schemas.QuestionResponse])
-def get_quiz_questions(quiz_id: int, db: Session = Depends(get_db)):
-    return db.query(models.Question).filter_by(quiz_id=quiz_id).all()
+def timeline_options(include_timeline):
+    # Timelines are deferred: list routes leave them out (timeline: null) unless asked for
+    return (undefer(models.Result.timeline),) if include_timeline else ()
 
 @app.get("/results/my", response_model=List[schemas.ResultResponse])
-def get_my_results(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.Result).filter(models.Result.student_id == current_user.id).all()
+def get_my_results(include_timeline: bool = False, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    results = db.query(models.Result).options(*result_load_options(include_timeline)).filter(models.Result.student_id == current_user.id).all()
+    if serializers.FAST_JSON:
+        return ORJSONResponse([serializers.result_to_dict(r) for r in results])
+    return results
+
+def teacher_results_query(teacher_id, quiz_id=None, course_id=None, completed_after=None, completed_before=None, min_score=None, max_score=None):
+    # One statement: quiz and course come from the ownership join, the student from a joined eager load
+    query = (
+        select(models.Result)
+        .join(models.Result.quiz)
+        .join(models.Quiz.course)
+        .where(models.Course.teacher_id == teacher_id)
+        .options(contains_eager(models.Result.quiz).contains_eager(models.Quiz.course), joinedload(models.Result.student))
+    )
+    if quiz_id is not None:
+        query = query.where(models.Result.quiz_id == quiz_id)
+    if course_id is not None:
+        query = query.where(models.Quiz.course_id == course_id)
+    if completed_after is not None:
+        query = query.where(models.Result.completed_at >= completed_after)
+    if completed_before is not None:
+        query = query.where(models.Result.completed_at < completed_before)
+    if min_score is not None:
+        query = query.where(models.Result.score >= min_score)
+    if max_score is not None:
+        query = query.where(models.Result.score <= max_score)
+    return query.order_by(models.Result.id)
 
 @app.get("/results/teacher/all", response_model=List[schemas.ResultResponse])
-def get_teacher_results(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_teacher_results(response: Response, include_timeline: bool = False, cursor: Optional[int] = None, limit: int = Query(500, ge=1, le=1000), quiz_id: Optional[int] = None, course_id: Optional[int] = None, completed_after: Optional[datetime] = None, completed_before: Optional[datetime] = None, min_score: Optional[int] = None, max_score: Optional[int] = None, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.user_type != 1: # Teacher
         raise HTTPException(status_code=403, detail="Only teachers can view all results")
-    
-    # Get all courses by this teacher
-    course_ids = [course.id for course in current_user.taught_courses]
-    # Get all quizzes in those courses
-    quiz_ids = [quiz.id for quiz in db.query(models.Quiz).filter(models.Quiz.course_id.in_(course_ids)).all()]
-    # Get all results for those quizzes
-    return db.query(models.Result).filter(models.Result.quiz_id.in_(quiz_ids)).all()
+
+    query = teacher_results_query(current_user.id, quiz_id, course_id, completed_after, completed_before, min_score, max_score)
+    query = query.options(*timeline_options(include_timeline))
+    if cursor is not None:
+        query = query.where(models.Result.id > cursor)
+    # Fetch one extra row to know whether another page exists
+    results = db.execute(query.limit(limit + 1)).scalars().all()
+    if len(results) > limit:
+        results = results[:limit]
+        response.headers["X-Next-Cursor"] = str(results[-1].id)
+    if serializers.FAST_JSON:
+        return ORJSONResponse([serializers.result_to_dict(r) for r in results], headers=dict(response.headers))
+    return results
+
+RESULT_STREAM_BATCH = 500
+
+@app.get("/results/teacher/stream")
+def stream_teacher_results(include_timeline: bool = False, cursor: Optional[int] = None, quiz_id: Optional[int] = None, course_id: Optional[int] = None, completed_after: Optional[datetime] = None, completed_before: Optional[datetime] = None, min_score: Optional[int] = None, max_score: Optional[int] = None, current_user: models.User = Depends(get_current_user)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can view all results")
+
+    query = teacher_results_query(current_user.id, quiz_id, course_id, completed_after, completed_before, min_score, max_score)
+    query = query.options(*timeline_options(include_timeline))
+    if cursor is not None:
+        query = query.where(models.Result.id > cursor)
+
+    def rows():
+        # Own session, so the stream does not depend on when the request's get_db session is closed
+        db = database.SessionLocal()
+        try:
+            # yield_per streams from the driver cursor in batches instead of buffering every row
+            for result in db.execute(query.execution_options(yield_per=RESULT_STREAM_BATCH)).scalars():
+                yield serializers.ndjson_line(serializers.result_to_dict(result))
+        finally:
+            db.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
 
 # --- QUESTION MANAGEMENT ---
 
@@ -572,17 +907,20 @@ def update_question(question_id: int, question_update: schemas.QuestionBase, cur
         raise HTTPException(status_code=404, detail="Question not found")
     
     update_data = question_update.dict(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(db_question, key, value)
-    
+    if "point_value" in update_data:
+        db_question.point_value = update_data.pop("point_value")
+    # Bank items are shared between quizzes: edited content moves this question to its own item
+    try:
+        question_bank.replace_content(db, db_question, update_data)
+    except question_bank.DuplicateQuestion as exc:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(exc))
+    db.flush()
+    question_bank.update_total_marks(db, db_question.quiz_id)
+    questions_changed(db, db_question.quiz_id)
     db.commit()
 
-    # Update Quiz Total Marks
     quiz = db.query(models.Quiz).filter(models.Quiz.id == db_question.quiz_id).first()
-    if quiz:
-        total = db.query(func.sum(models.Question.point_value)).filter(models.Question.quiz_id == quiz.id).scalar() or 0
-        quiz.total_marks = total
-        db.commit()
 
     # Notify Teacher
     notif = models.Notification(
@@ -605,19 +943,138 @@ def delete_question(question_id: int, current_user: models.User = Depends(get_cu
     if not db_question:
         raise HTTPException(status_code=404, detail="Question not found")
     
+    # Removes the question from its quiz; the bank item stays in the course bank
     quiz_id = db_question.quiz_id
+    db.query(models.QuestionStats).filter(models.QuestionStats.question_id == question_id).delete()
     db.delete(db_question)
+    db.flush()
+    question_bank.update_total_marks(db, quiz_id)
+    questions_changed(db, quiz_id)
     db.commit()
-    
-    # Update Quiz Total Marks
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
-    if quiz:
-        total = db.query(func.sum(models.Question.point_value)).filter(models.Question.quiz_id == quiz.id).scalar() or 0
-        quiz.total_marks = total
-        db.commit()
         
     return {"message": "Question deleted successfully"}
 
+# --- QUESTION BANK ---
+
+def owned_course(db: Session, course_id: int, teacher: models.User):
+    course = db.query(models.Course).filter(models.Course.id == course_id).first()
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if course.teacher_id != teacher.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return course
+
+def owned_quiz(db: Session, quiz_id: int, teacher: models.User):
+    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if quiz.course.teacher_id != teacher.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return quiz
+
+@app.get("/courses/{course_id}/bank", response_model=List[schemas.BankItemResponse])
+def get_course_bank(course_id: int, response: Response, tag: Optional[str] = None, difficulty: Optional[int] = None, cursor: Optional[int] = None, limit: int = Query(100, ge=1, le=500), current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can manage questions")
+    owned_course(db, course_id, current_user)
+
+    query = select(models.QuestionBankItem).where(models.QuestionBankItem.course_id == course_id)
+    for name in question_bank.normalize_tags([tag] if tag else ()):
+        query = query.join(models.QuestionBankTag).where(models.QuestionBankTag.tag == name)
+    if difficulty is not None:
+        query = query.where(models.QuestionBankItem.difficulty == difficulty)
+    if cursor is not None:
+        query = query.where(models.QuestionBankItem.id > cursor)
+    items = db.execute(query.order_by(models.QuestionBankItem.id).limit(limit + 1)).scalars().all()
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Cursor"] = str(items[-1].id)
+    return items
+
+@app.put("/bank/{item_id}", response_model=schemas.BankItemResponse)
+def update_bank_item(item_id: int, item_update: schemas.BankItemUpdate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can manage questions")
+    item = db.get(models.QuestionBankItem, item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Bank item not found")
+    owned_course(db, item.course_id, current_user)
+
+    # Only the metadata: content is what identifies an item, and edits go through PUT /questions/{id}
+    update_data = item_update.dict(exclude_unset=True)
+    if "difficulty" in update_data:
+        item.difficulty = update_data["difficulty"]
+    if update_data.get("tags") is not None:
+        question_bank.set_tags(item, update_data["tags"])
+    db.commit()
+    db.refresh(item)
+    return item
+
+@app.post("/quizzes/{quiz_id}/questions/bank")
+def add_bank_questions(quiz_id: int, request: schemas.BankLinkRequest, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can manage questions")
+    quiz = owned_quiz(db, quiz_id, current_user)
+
+    item_ids = set(db.execute(
+        select(models.QuestionBankItem.id).where(models.QuestionBankItem.course_id == quiz.course_id, models.QuestionBankItem.id.in_(request.item_ids))
+    ).scalars())
+    if len(item_ids) != len(set(request.item_ids)):
+        raise HTTPException(status_code=404, detail="Bank item not found in this course")
+    added = question_bank.link_items(db, quiz_id, [(item_id, request.point_value) for item_id in dict.fromkeys(request.item_ids)])
+    total = question_bank.update_total_marks(db, quiz_id)
+    questions_changed(db, quiz_id)
+    db.commit()
+    return {"added": added, "total_marks": total}
+
+@app.post("/quizzes/{quiz_id}/questions/draw")
+def draw_bank_questions(quiz_id: int, request: schemas.BankDrawRequest, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can manage questions")
+    quiz = owned_quiz(db, quiz_id, current_user)
+
+    # Random items of the course bank the quiz doesn't have yet, sampled on the random_key index
+    item_ids = question_bank.draw(db, quiz.course_id, request.count, request.tags, request.difficulty, exclude_quiz_id=quiz_id)
+    added = question_bank.link_items(db, quiz_id, [(item_id, request.point_value) for item_id in item_ids])
+    total = question_bank.update_total_marks(db, quiz_id)
+    questions_changed(db, quiz_id)
+    db.commit()
+    return {"requested": request.count, "added": added, "total_marks": total}
+
+# --- SEARCH ---
+
+def attach_snippets(rows):
+    hits = []
+    for row, snippet in rows:
+        row.snippet = snippet
+        hits.append(row)
+    return hits
+
+@app.get("/search/courses", response_model=List[schemas.CourseSearchHit])
+def search_courses(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_db)):
+    # Same visibility as /courses/all
+    return attach_snippets(search.search(db, "courses_fts", q, limit))
+
+@app.get("/search/quizzes", response_model=List[schemas.QuizSearchHit])
+def search_quizzes(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100), current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    # Teachers search the quizzes they created, students the quizzes of their courses
+    if current_user.user_type == 1:
+        courses = select(models.Course.id).where(models.Course.teacher_id == current_user.id)
+    else:
+        courses = select(models.Enrollment.course_id).where(models.Enrollment.student_id == current_user.id)
+    rows = search.search(db, "quizzes_fts", q, limit, models.Quiz.course_id.in_(courses), options=(selectinload(models.Quiz.course),))
+    return attach_snippets(rows)
+
+@app.get("/search/questions", response_model=List[schemas.QuestionSearchHit])
+def search_questions(q: str = Query(..., min_length=1, max_length=200), course_id: Optional[int] = None, limit: int = Query(20, ge=1, le=100), current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can manage questions")
+    # The bank items of the teacher's courses
+    where = [models.QuestionBankItem.course_id.in_(select(models.Course.id).where(models.Course.teacher_id == current_user.id))]
+    if course_id is not None:
+        where.append(models.QuestionBankItem.course_id == course_id)
+    return attach_snippets(search.search(db, "question_bank_fts", q, limit, *where))
+
 # --- QUIZ DELETION ---
 
 @app.delete("/quizzes/{quiz_id}")
@@ -628,63 +1085,78 @@ def delete_quiz(quiz_id: int, current_user: models.User = Depends(get_current_us
     if not db_quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
+    analytics.clear(db, quiz_id)
     db.delete(db_quiz)
     db.commit()
+    lifecycle.scheduler.forget(quiz_id)
     return {"message": "Quiz and its questions deleted successfully"}
 
+# Set QUIZI_SUBMISSION_JOURNAL to acknowledge submissions from a journal and grade them in batches
+submission_queue = submissions.queue_from_env()
+
+# Deletes notifications older than QUIZI_NOTIFICATION_RETENTION_DAYS (default 90; 0 keeps them), on one worker at a time
+notification_retention = notifications.retention_from_env()
+
+@app.on_event("startup")
+def start_notification_retention():
+    if notification_retention is not None:
+        notification_retention.start()
+
+@app.on_event("shutdown")
+def stop_notification_retention():
+    if notification_retention is not None:
+        notification_retention.stop()
+
+@app.get("/metrics/notification-retention")
+def get_notification_retention_metrics():
+    if notification_retention is None:
+        return {"retention_days": 0}
+    return notification_retention.stats()
+
 @app.post("/results", response_model=schemas.ResultResponse)
-def submit_quiz_result(result: schemas.ResultCreate, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def submit_quiz_result(result: schemas.ResultCreate, idempotency_key: Optional[str] = Header(None, max_length=255), current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
     if current_user.user_type != 0:
         raise HTTPException(status_code=403, detail="Only students can submit results")
-    
-    quiz = db.query(models.Quiz).filter(models.Quiz.id == result.quiz_id).first()
-    if not quiz:
-        raise HTTPException(status_code=404, detail="Quiz not found")
 
-    # Server-side Grading Logic
-    questions = db.query(models.Question).filter(models.Question.quiz_id == result.quiz_id).all()
-    calculated_score = 0
-    calculated_total_marks = 0 # Verify total marks dynamically
-    
-    user_answers = result.answers or {}
-    
-    for q in questions:
-        calculated_total_marks += q.point_value
-        ans = str(user_answers.get(str(q.id), "")).lower().strip()
-        
-        if q.question_type == 'description':
-            continue # Manual grading required, 0 points for now
-            
-        # MCQ and True/False Logic
-        correct = str(q.correct_option).lower().strip()
-        if ans == correct and ans != "":
-            calculated_score += q.point_value
-
-    new_result = models.Result(
-        score=calculated_score,
-        total_marks=calculated_total_marks,
-        eye_tracking_violations=result.eye_tracking_violations,
-        timeline=result.timeline,
-        answers=result.answers,
-        student_id=current_user.id,
-        quiz_id=result.quiz_id
-    )
-    db.add(new_result)
-    db.commit()
-    db.refresh(new_result)
-    
-    # Notify Teacher of Submission
-    notif = models.Notification(
-        user_id=new_result.quiz.course.teacher_id,
-        title="New Quiz Submission",
-        message=f"Student {current_user.full_name} has submitted an attempt for quiz: {new_result.quiz.title}",
-        type="quiz"
-    )
-    db.add(notif)
-    db.commit()
+    if submission_queue is not None:
+        submission_id = await run_in_threadpool(submission_queue.submit, current_user.id, result, idempotency_key)
+        return JSONResponse(status_code=202, content={"submission_id": submission_id, "status": "queued"})
+
+    try:
+        new_result = await db.run_sync(submissions.grade_submission, current_user, result, None, idempotency_key)
+    except submissions.SubmissionRejected as exc:
+        raise HTTPException(status_code=exc.status_code, detail=exc.detail)
+    await db.commit()
+    await db.refresh(new_result, attribute_names=["id", "completed_at"])
     
     return new_result
 
+@app.get("/results/submissions/{submission_id}", response_model=schemas.ResultResponse)
+def get_submission(submission_id: str, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    pending = submission_queue.status(submission_id) if submission_queue is not None else None
+    if pending is not None and pending["student_id"] == current_user.id:
+        if pending["status"] == "failed":
+            raise HTTPException(status_code=pending["status_code"], detail=pending["detail"])
+        return JSONResponse(status_code=202, content={"submission_id": submission_id, "status": "queued"})
+
+    result = db.query(models.Result).options(*result_load_options()).filter(models.Result.submission_id == submission_id, models.Result.student_id == current_user.id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Submission not found")
+    return result
+
+@app.get("/results/{result_id}/timeline", response_model=List[dict])
+def get_result_timeline(result_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    # The proctoring timeline of one result, for views that list results without it
+    row = db.execute(
+        select(models.Result.timeline, models.Result.student_id, models.Course.teacher_id)
+        .join(models.Result.quiz)
+        .join(models.Quiz.course)
+        .where(models.Result.id == result_id)
+    ).first()
+    if not row or current_user.id not in (row.student_id, row.teacher_id):
+        raise HTTPException(status_code=404, detail="Result not found")
+    return row.timeline or []
+
 @app.put("/results/{result_id}/grade")
 def grade_result(result_id: int, payload: dict, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.user_type != 1:
@@ -698,6 +1170,11 @@ def grade_result(result_id: int, payload: dict, current_user: models.User = Depe
     if result.quiz.course.teacher_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized")
     
+    # Contribution to the quiz analytics before anything changes (answers/feedback are updated in place)
+    answer_key = grading.get_answer_key(db, result.quiz_id)
+    selected = grading.selection_for_attempt(db, answer_key, result.attempt)
+    previous = analytics.contribution(answer_key, result.answers, result.feedback, selected, result.score, result.total_marks)
+
     # Payload can contain 'feedback' and 'answers'
     feedback = payload.get("feedback", {})
     answers = payload.get("answers", {})
@@ -718,34 +1195,9 @@ def grade_result(result_id: int, payload: dict, current_user: models.User = Depe
     db.commit()
     db.refresh(result)
     
-    # Recalculate Score
-    # 1. Start with Auto-graded score (re-verify)
-    questions = db.query(models.Question).filter(models.Question.quiz_id == result.quiz_id).all()
-    new_score = 0
-    user_answers = result.answers or {}
-
-    for q in questions:
-        ans = str(user_answers.get(str(q.id), "")).lower().strip()
-        
-        # Priority 1: Manual Score in Feedback (Override)
-        q_feed = current_feedback.get(str(q.id))
-        if q_feed and 'score' in q_feed:
-            try:
-                new_score += int(q_feed['score'])
-            except (ValueError, TypeError):
-                pass # faulty score payload
-        else:
-            # Priority 2: Auto-grading (Default for non-description)
-            if q.question_type == 'description':
-                # Description questions without manual score get 0 by default
-                pass 
-            else:
-                # Auto-grade check
-                correct = str(q.correct_option).lower().strip()
-                if ans == correct and ans != "":
-                    new_score += q.point_value
-    
-    result.score = new_score
+    # Recalculate Score: manual scores in feedback override auto-grading
+    result.score = answer_key.score(result.answers, current_feedback, selected)
+    analytics.replace(db, result.quiz_id, previous, analytics.contribution(answer_key, result.answers, current_feedback, selected, result.score, result.total_marks))
     db.commit()
     db.refresh(result)
 
@@ -761,26 +1213,152 @@ def grade_result(result_id: int, payload: dict, current_user: models.User = Depe
 
     return result
 
+@app.post("/quizzes/{quiz_id}/regrade")
+def regrade_quiz(quiz_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can grade")
+
+    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if quiz.course.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    # Score every attempt in one batched pass over the current key, keeping manual overrides
+    answer_key = grading.get_answer_key(db, quiz_id)
+    paper = papers.get_paper(db, quiz_id)
+    rows = (
+        db.query(
+            models.Result.id, models.Result.answers, models.Result.feedback, models.Result.score, models.Result.total_marks,
+            models.QuizAttempt.seed, models.QuizAttempt.max_questions, models.QuizAttempt.shuffled, models.QuizAttempt.question_ids,
+        )
+        .outerjoin(models.QuizAttempt, models.QuizAttempt.id == models.Result.attempt_id)
+        .filter(models.Result.quiz_id == quiz_id)
+        .all()
+    )
+    # Each attempt is graded only on the questions its seed selected
+    selections = [answer_key.selection(papers.attempt_question_ids(paper, r)) if r.seed is not None else None for r in rows]
+    scores = answer_key.score_many([r.answers for r in rows], [r.feedback for r in rows], selections)
+
+    changed = []
+    for r, score, selected in zip(rows, scores, selections):
+        total_marks = answer_key.total_for(selected)
+        if r.score != score or r.total_marks != total_marks:
+            changed.append({"id": r.id, "score": score, "total_marks": total_marks})
+    if changed:
+        db.bulk_update_mappings(models.Result, changed)
+    analytics.rebuild(db, quiz_id)
+    db.commit()
+
+    return {"message": f"Regraded {len(rows)} results", "regraded": len(rows), "changed": len(changed)}
+
+@app.get("/quizzes/{quiz_id}/analytics", response_model=schemas.QuizAnalyticsResponse)
+def get_quiz_analytics(quiz_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    if current_user.user_type != 1:
+        raise HTTPException(status_code=403, detail="Only teachers can view analytics")
+    quiz = db.query(models.Quiz).filter(models.Quiz.id == quiz_id).first()
+    if not quiz:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    if quiz.course.teacher_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return analytics.summary(db, quiz)
+
 @app.get("/notifications", response_model=List[schemas.NotificationResponse])
-def get_notifications(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    return db.query(models.Notification).filter(models.Notification.user_id == current_user.id).order_by(models.Notification.created_at.desc()).limit(20).all()
+async def get_notifications(response: Response, since: Optional[int] = None, before: Optional[int] = None, limit: int = Query(20, ge=1, le=100), unread_only: bool = False, current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    query = select(models.Notification).where(models.Notification.user_id == current_user.id)
+    if unread_only:
+        query = query.where(models.Notification.is_read == False)
+    if since is not None:
+        # Incremental poll: rows newer than the last id the client has seen, oldest first
+        query = query.where(models.Notification.id > since).order_by(models.Notification.id)
+    else:
+        # Newest first; the client pages back with before=<X-Next-Cursor>
+        if before is not None:
+            query = query.where(models.Notification.id < before)
+        query = query.order_by(models.Notification.id.desc())
+    # Fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.limit(limit + 1))).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    if serializers.FAST_JSON:
+        return ORJSONResponse([serializers.notification_to_dict(n) for n in rows], headers=dict(response.headers))
+    return rows
+
+@app.get("/notifications/unread-count")
+async def get_unread_notification_count(current_user: models.User = Depends(get_current_user_async), db: AsyncSession = Depends(get_async_db)):
+    # One primary-key read of the maintained counter, not a COUNT over the inbox
+    query = select(models.NotificationCount.unread).where(models.NotificationCount.user_id == current_user.id)
+    return {"unread": (await db.execute(query)).scalar() or 0}
+
+@app.post("/notifications/read")
+def mark_notifications_read(selection: schemas.NotificationSelection, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    updated = notifications.mark_read(db, current_user.id, selection.ids, selection.max_id)
+    db.commit()
+    return {"updated": updated, "unread": notifications.unread_count(db, current_user.id)}
+
+@app.post("/notifications/delete")
+def delete_notifications(selection: schemas.NotificationSelection, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    deleted = notifications.delete_notifications(db, current_user.id, selection.ids, selection.max_id)
+    db.commit()
+    return {"deleted": deleted, "unread": notifications.unread_count(db, current_user.id)}
+
+NOTIFICATION_HEARTBEAT_SECONDS = 15
+
+@app.get("/notifications/stream")
+async def stream_notifications(request: Request, token: str, since: Optional[int] = None, last_event_id: Optional[int] = Header(None)):
+    # EventSource cannot send an Authorization header, so the token comes as a query param
+    if since is None:
+        since = last_event_id  # sent automatically by EventSource when it reconnects
+    payload = auth.verify_token(token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    async with database.AsyncSessionLocal() as db:
+        row = (await db.execute(user_lookup_query(payload).with_only_columns(models.User.id, models.User.token_version))).first()
+    if row is None or not cache.token_is_current(payload, row.token_version):
+        raise HTTPException(status_code=401, detail="User not found")
+    user_id = row.id
+
+    async def event_stream():
+        # Subscribed only once streaming starts, so a client gone before then leaves nothing behind;
+        # and before reading the backlog, so nothing falls in between
+        subscription = await pubsub.get_broker().subscribe(user_id)
+        try:
+            last_id = since
+            if since is not None:
+                async with database.AsyncSessionLocal() as db:
+                    query = select(models.Notification).where(models.Notification.user_id == user_id, models.Notification.id > since).order_by(models.Notification.id)
+                    for notif in (await db.execute(query)).scalars():
+                        data = notifications.to_event(notif)
+                        last_id = data["id"]
+                        yield f"id: {data['id']}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+            while not await request.is_disconnected():
+                data = await subscription.get(timeout=NOTIFICATION_HEARTBEAT_SECONDS)
+                if data is None:
+                    yield ": ping\n\n"
+                elif last_id is None or data["id"] > last_id:
+                    yield f"id: {data['id']}\nevent: notification\ndata: {json.dumps(data)}\n\n"
+        finally:
+            await subscription.close()
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.delete("/notifications/{notif_id}")
 def delete_notification(notif_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
-    notif = db.query(models.Notification).filter(models.Notification.id == notif_id, models.Notification.user_id == current_user.id).first()
-    if notif:
-        db.delete(notif)
+    if notifications.delete_notifications(db, current_user.id, [notif_id]):
         db.commit()
         return {"message": "Notification deleted"}
     raise HTTPException(status_code=404, detail="Notification not found")
 
 @app.post("/notifications/{notif_id}/read")
-def mark_notification_read(notif_id: int, db: Session = Depends(get_db)):
-    notif = db.query(models.Notification).filter(models.Notification.id == notif_id).first()
-    if notif:
-        notif.is_read = True
-        db.commit()
+def mark_notification_read(notif_id: int, current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
+    exists = db.query(models.Notification.id).filter(models.Notification.id == notif_id, models.Notification.user_id == current_user.id).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Notification not found")
+    notifications.mark_read(db, current_user.id, [notif_id])
+    db.commit()
     return {"message": "Notification updated"}
+
 @app.get("/teacher/leave-requests", response_model=List[schemas.LeaveRequestResponse])
 def get_leave_requests(current_user: models.User = Depends(get_current_user), db: Session = Depends(get_db)):
     if current_user.user_type != 1:
@@ -0,0 +1,44 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(quizzes)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if not columns:
+        print("quizzes table not found.")
+        conn.close()
+        return
+
+    # Existing quizzes start un-backfilled: their analytics are rebuilt from results on first read
+    if "analytics_backfilled" not in columns:
+        print("Adding analytics_backfilled column...")
+        cursor.execute("ALTER TABLE quizzes ADD COLUMN analytics_backfilled BOOLEAN NOT NULL DEFAULT 0")
+    else:
+        print("analytics_backfilled already exists.")
+
+    cursor.execute("PRAGMA table_info(question_stats)")
+    stats_columns = [info[1] for info in cursor.fetchall()]
+    if stats_columns and "points_sum" not in stats_columns:
+        print("Adding points_sum column...")
+        cursor.execute("ALTER TABLE question_stats ADD COLUMN points_sum FLOAT DEFAULT 0")
+        # Sums without it are incomplete; rebuild those quizzes too
+        cursor.execute("UPDATE quizzes SET analytics_backfilled = 0 WHERE id IN (SELECT DISTINCT quiz_id FROM question_stats)")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
@@ -0,0 +1,52 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Same tables create_all makes on startup, so this can run before or after the new code
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS quiz_attempt_counts (
+            student_id INTEGER NOT NULL REFERENCES users(id),
+            quiz_id INTEGER NOT NULL REFERENCES quizzes(id),
+            count INTEGER,
+            PRIMARY KEY (student_id, quiz_id)
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            id INTEGER PRIMARY KEY,
+            student_id INTEGER REFERENCES users(id),
+            key VARCHAR,
+            result_id INTEGER REFERENCES results(id),
+            created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+            CONSTRAINT uq_idempotency_keys_student_key UNIQUE (student_id, key)
+        )
+    """)
+
+    # Seed the attempt counters from results submitted before they existed
+    cursor.execute("""
+        INSERT INTO quiz_attempt_counts (student_id, quiz_id, count)
+        SELECT student_id, quiz_id, COUNT(*) FROM results
+        WHERE student_id IS NOT NULL AND quiz_id IS NOT NULL
+        GROUP BY student_id, quiz_id
+        ON CONFLICT (student_id, quiz_id) DO UPDATE SET count = MAX(count, excluded.count)
+    """)
+    print(f"Backfilled attempt counts for {cursor.rowcount} student/quiz pairs.")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
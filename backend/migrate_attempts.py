@@ -0,0 +1,58 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # quiz_attempts itself is created by create_all on startup
+    cursor.execute("PRAGMA table_info(results)")
+    columns = [info[1] for info in cursor.fetchall()]
+
+    if "attempt_id" not in columns:
+        print("Adding attempt_id column...")
+        try:
+            cursor.execute("ALTER TABLE results ADD COLUMN attempt_id INTEGER REFERENCES quiz_attempts(id)")
+        except Exception as e:
+            print(f"Error adding attempt_id: {e}")
+    else:
+        print("attempt_id already exists.")
+
+    # Autosave columns, for quiz_attempts tables created before them
+    cursor.execute("PRAGMA table_info(quiz_attempts)")
+    attempt_columns = [info[1] for info in cursor.fetchall()]
+    if attempt_columns:
+        for name, ddl in [
+            ("answers", "JSON"),
+            ("timeline", "JSON"),
+            ("current_index", "INTEGER DEFAULT 0"),
+            ("violations", "INTEGER DEFAULT 0"),
+            ("time_left", "INTEGER"),
+            ("saved_at", "DATETIME"),
+            ("submitted_at", "DATETIME"),
+            ("question_ids", "JSON"),
+        ]:
+            if name in attempt_columns:
+                print(f"{name} already exists.")
+                continue
+            print(f"Adding {name} column...")
+            try:
+                cursor.execute(f"ALTER TABLE quiz_attempts ADD COLUMN {name} {ddl}")
+            except Exception as e:
+                print(f"Error adding {name}: {e}")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
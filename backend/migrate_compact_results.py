@@ -0,0 +1,67 @@
+import sqlite3
+import os
+import sys
+
+# compact.py only needs the standard library and SQLAlchemy, so import it directly
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from compact import decode_answers, decode_timeline, encode_answers, encode_timeline
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+BATCH = 1000
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='results'")
+    if not cursor.fetchone():
+        print("results table not found.")
+        conn.close()
+        return
+
+    # Rows still holding JSON text; already converted rows are blobs and are left alone
+    before = cursor.execute(
+        "SELECT COALESCE(SUM(LENGTH(CAST(timeline AS BLOB))), 0), COALESCE(SUM(LENGTH(CAST(answers AS BLOB))), 0) FROM results"
+    ).fetchone()
+    converted, last_id = 0, 0
+    while True:
+        rows = cursor.execute(
+            "SELECT id, timeline, answers FROM results "
+            "WHERE id > ? AND (typeof(timeline) = 'text' OR typeof(answers) = 'text') ORDER BY id LIMIT ?",
+            (last_id, BATCH),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for result_id, timeline, answers in rows:
+            # JSON 'null' text becomes a real NULL
+            if isinstance(timeline, str):
+                timeline = decode_timeline(timeline)
+                timeline = encode_timeline(timeline) if timeline is not None else None
+            if isinstance(answers, str):
+                answers = decode_answers(answers)
+                answers = encode_answers(answers) if answers is not None else None
+            updates.append((timeline, answers, result_id))
+        cursor.executemany("UPDATE results SET timeline = ?, answers = ? WHERE id = ?", updates)
+        conn.commit()
+        converted += len(rows)
+        last_id = rows[-1][0]
+
+    after = cursor.execute(
+        "SELECT COALESCE(SUM(LENGTH(CAST(timeline AS BLOB))), 0), COALESCE(SUM(LENGTH(CAST(answers AS BLOB))), 0) FROM results"
+    ).fetchone()
+    print(f"Re-encoded {converted} results.")
+    print(f"timeline: {before[0]} -> {after[0]} bytes, answers: {before[1]} -> {after[1]} bytes")
+
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
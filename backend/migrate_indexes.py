@@ -0,0 +1,57 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS ix_courses_teacher_id ON courses (teacher_id)",
+    "CREATE INDEX IF NOT EXISTS ix_enrollments_course_id ON enrollments (course_id)",
+    "CREATE INDEX IF NOT EXISTS ix_quizzes_course_id ON quizzes (course_id)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_quiz_id ON questions (quiz_id)",
+    "CREATE INDEX IF NOT EXISTS ix_results_student_quiz ON results (student_id, quiz_id)",
+    "CREATE INDEX IF NOT EXISTS ix_results_quiz_id ON results (quiz_id)",
+    "CREATE INDEX IF NOT EXISTS ix_notifications_user_id_id ON notifications (user_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_leave_requests_student_course_status ON leave_requests (student_id, course_id, status)",
+    "CREATE INDEX IF NOT EXISTS ix_leave_requests_course_id ON leave_requests (course_id)",
+]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Remove duplicate enrollments left by the old check-then-insert race, keeping the first
+    cursor.execute("""
+        DELETE FROM enrollments
+        WHERE id NOT IN (SELECT MIN(id) FROM enrollments GROUP BY student_id, course_id)
+    """)
+    if cursor.rowcount:
+        print(f"Removed {cursor.rowcount} duplicate enrollments.")
+
+    # SQLite cannot add a table constraint in place; a unique index enforces the same rule
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_enrollments_student_course ON enrollments (student_id, course_id)")
+        print("Ensured uq_enrollments_student_course.")
+    except Exception as e:
+        print(f"Error adding uq_enrollments_student_course: {e}")
+
+    for statement in INDEXES:
+        name = statement.split(" ON ")[0].split()[-1]
+        try:
+            cursor.execute(statement)
+            print(f"Ensured {name}.")
+        except Exception as e:
+            print(f"Error adding {name}: {e}")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
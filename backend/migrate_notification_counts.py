@@ -0,0 +1,49 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='notifications'")
+    if not cursor.fetchone():
+        print("notifications table not found.")
+        conn.close()
+        return
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS notification_counts (
+            user_id INTEGER NOT NULL PRIMARY KEY REFERENCES users (id),
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # Recount from scratch, so running this again repairs counters that drifted
+    cursor.execute("DELETE FROM notification_counts")
+    cursor.execute("""
+        INSERT INTO notification_counts (user_id, unread)
+        SELECT user_id, COUNT(*) FROM notifications
+        WHERE user_id IS NOT NULL AND NOT is_read
+        GROUP BY user_id
+    """)
+    print(f"Counted unread notifications for {cursor.rowcount} users.")
+
+    # The inbox now pages by id, so the index follows
+    cursor.execute("DROP INDEX IF EXISTS ix_notifications_user_created")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_notifications_user_id_id ON notifications (user_id, id)")
+    print("Replaced ix_notifications_user_created with ix_notifications_user_id_id.")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
@@ -0,0 +1,113 @@
+import sqlite3
+import os
+import random
+import sys
+
+# content_hash must match backend/question_bank.py, so import it from the package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from backend.question_bank import CONTENT_FIELDS, content_hash
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+BATCH = 1000
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS question_bank_items (
+        id INTEGER NOT NULL PRIMARY KEY,
+        course_id INTEGER NOT NULL REFERENCES courses (id),
+        content_hash VARCHAR(64) NOT NULL,
+        text VARCHAR, option_a VARCHAR, option_b VARCHAR, option_c VARCHAR, option_d VARCHAR,
+        correct_option VARCHAR, question_type VARCHAR, difficulty INTEGER, random_key FLOAT,
+        created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+        CONSTRAINT uq_question_bank_items_course_hash UNIQUE (course_id, content_hash)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_question_bank_items_id ON question_bank_items (id)",
+    "CREATE INDEX IF NOT EXISTS ix_question_bank_items_course_key ON question_bank_items (course_id, random_key)",
+    "CREATE INDEX IF NOT EXISTS ix_question_bank_items_course_difficulty_key ON question_bank_items (course_id, difficulty, random_key)",
+    """CREATE TABLE IF NOT EXISTS question_bank_tags (
+        item_id INTEGER NOT NULL REFERENCES question_bank_items (id),
+        tag VARCHAR NOT NULL,
+        course_id INTEGER NOT NULL REFERENCES courses (id),
+        random_key FLOAT NOT NULL,
+        PRIMARY KEY (item_id, tag)
+    )""",
+    "CREATE INDEX IF NOT EXISTS ix_question_bank_tags_course_tag_key ON question_bank_tags (course_id, tag, random_key)",
+]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='questions'")
+    if not cursor.fetchone():
+        print("questions table not found.")
+        conn.close()
+        return
+
+    for statement in SCHEMA:
+        cursor.execute(statement)
+    cursor.execute("PRAGMA table_info(questions)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if "item_id" not in columns:
+        print("Adding item_id column...")
+        cursor.execute("ALTER TABLE questions ADD COLUMN item_id INTEGER REFERENCES question_bank_items (id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS ix_questions_item_id ON questions (item_id)")
+    conn.commit()
+
+    if "text" not in columns:
+        print("questions has no content columns; nothing to move.")
+        conn.close()
+        print(f"Finished {db_path}.\n")
+        return
+
+    # Move each question's content into its course bank, one item per distinct content
+    field_list = ", ".join(f"q.{field}" for field in CONTENT_FIELDS)
+    linked, last_id = 0, 0
+    items_before = cursor.execute("SELECT COUNT(*) FROM question_bank_items").fetchone()[0]
+    while True:
+        rows = cursor.execute(
+            f"SELECT q.id, z.course_id, {field_list} FROM questions q JOIN quizzes z ON z.id = q.quiz_id "
+            "WHERE q.item_id IS NULL AND z.course_id IS NOT NULL AND q.id > ? ORDER BY q.id LIMIT ?",
+            (last_id, BATCH),
+        ).fetchall()
+        if not rows:
+            break
+        updates = []
+        for question_id, course_id, *content in rows:
+            row = dict(zip(CONTENT_FIELDS, content))
+            row["question_type"] = row["question_type"] or "mcq"
+            digest = content_hash(row)
+            cursor.execute(
+                f"INSERT OR IGNORE INTO question_bank_items (course_id, content_hash, {', '.join(CONTENT_FIELDS)}, random_key) "
+                f"VALUES (?, ?, {', '.join('?' * len(CONTENT_FIELDS))}, ?)",
+                (course_id, digest, *(row[field] for field in CONTENT_FIELDS), random.random()),
+            )
+            item_id = cursor.execute(
+                "SELECT id FROM question_bank_items WHERE course_id = ? AND content_hash = ?", (course_id, digest)
+            ).fetchone()[0]
+            updates.append((item_id, question_id))
+        cursor.executemany("UPDATE questions SET item_id = ? WHERE id = ?", updates)
+        conn.commit()
+        linked += len(rows)
+        last_id = rows[-1][0]
+
+    # The content now lives in the bank; clear the old copies
+    cursor.execute(f"UPDATE questions SET {', '.join(f'{field} = NULL' for field in CONTENT_FIELDS)} WHERE item_id IS NOT NULL")
+    conn.commit()
+    items_after = cursor.execute("SELECT COUNT(*) FROM question_bank_items").fetchone()[0]
+    orphans = cursor.execute("SELECT COUNT(*) FROM questions WHERE item_id IS NULL").fetchone()[0]
+    print(f"Linked {linked} questions to {items_after - items_before} new bank items.")
+    if orphans:
+        print(f"{orphans} questions belong to no course (deleted quizzes) and were left as they are.")
+
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
@@ -0,0 +1,36 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(quizzes)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if not columns:
+        print("quizzes table not found.")
+        conn.close()
+        return
+
+    # Cached papers and answer keys are tagged with this; every quiz starts at 0
+    if "questions_version" not in columns:
+        print("Adding questions_version column...")
+        cursor.execute("ALTER TABLE quizzes ADD COLUMN questions_version INTEGER NOT NULL DEFAULT 0")
+    else:
+        print("questions_version already exists.")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
@@ -0,0 +1,42 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    # Journal submission ids: unique so a replayed batch can never insert a result twice
+    cursor.execute("PRAGMA table_info(results)")
+    columns = [info[1] for info in cursor.fetchall()]
+
+    if "submission_id" not in columns:
+        print("Adding submission_id column...")
+        try:
+            cursor.execute("ALTER TABLE results ADD COLUMN submission_id VARCHAR")
+        except Exception as e:
+            print(f"Error adding submission_id: {e}")
+    else:
+        print("submission_id already exists.")
+
+    # SQLite cannot add a UNIQUE column in place; a unique index enforces the same rule
+    try:
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS uq_results_submission_id ON results (submission_id)")
+        print("Ensured uq_results_submission_id.")
+    except Exception as e:
+        print(f"Error adding uq_results_submission_id: {e}")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
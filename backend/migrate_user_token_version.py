@@ -0,0 +1,42 @@
+import sqlite3
+import os
+
+DB_FILES = ["quizi.db", "../quizi.db", "sql_app.db"]
+
+def migrate_db(db_path):
+    if not os.path.exists(db_path):
+        print(f"Skipping {db_path} (not found)")
+        return
+
+    print(f"Migrating {db_path}...")
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(users)")
+    columns = [info[1] for info in cursor.fetchall()]
+    if not columns:
+        print("users table not found.")
+        conn.close()
+        return
+
+    # Tokens issued from now on carry this; existing users start at 0
+    if "token_version" not in columns:
+        print("Adding token_version column...")
+        cursor.execute("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0")
+    else:
+        print("token_version already exists.")
+
+    if "profile_version" not in columns:
+        print("Adding profile_version column...")
+        cursor.execute("ALTER TABLE users ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 0")
+    else:
+        print("profile_version already exists.")
+
+    conn.commit()
+    conn.close()
+    print(f"Finished {db_path}.\n")
+
+if __name__ == "__main__":
+    # Run from backend directory
+    for db in DB_FILES:
+        migrate_db(db)
@@ -1,7 +1,10 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, JSON
-from sqlalchemy.orm import relationship
+import random
+
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Index, Integer, String, DateTime, JSON, UniqueConstraint, inspect
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
-from .database import Base
+from .database import Base, UTCDateTime
+from . import compact
 
 class User(Base):
     __tablename__ = "users"
@@ -23,6 +26,10 @@ class User(Base):
     department = Column(String, nullable=True)
     university = Column(String, nullable=True)
     profile_picture = Column(String, nullable=True)
+    # In every token; bumped when the password changes, so every worker refuses older tokens
+    token_version = Column(Integer, default=0, nullable=False)
+    # In every token too; bumped on profile edits, so a worker whose cached copy is older reloads it
+    profile_version = Column(Integer, default=0, nullable=False)
 
     # Relationships
     taught_courses = relationship("Course", back_populates="teacher")
@@ -44,7 +51,7 @@ class Course(Base):
     self_join_enabled = Column(Boolean, default=True)
     access_key = Column(String, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    teacher_id = Column(Integer, ForeignKey("users.id"))
+    teacher_id = Column(Integer, ForeignKey("users.id"), index=True)
 
     teacher = relationship("User", back_populates="taught_courses")
     quizzes = relationship("Quiz", back_populates="course")
@@ -61,15 +68,22 @@ class Enrollment(Base):
     student = relationship("User", back_populates="enrollments")
     course = relationship("Course", back_populates="enrollments")
 
+    __table_args__ = (
+        # One enrollment per student and course; also serves student_id lookups
+        UniqueConstraint("student_id", "course_id", name="uq_enrollments_student_course"),
+        Index("ix_enrollments_course_id", "course_id"),
+    )
+
 class Quiz(Base):
     __tablename__ = "quizzes"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(String)
-    start_time = Column(DateTime(timezone=True))
-    end_time = Column(DateTime(timezone=True))
+    # Aware UTC in and out; backend/lifecycle.py schedules status changes from these
+    start_time = Column(UTCDateTime)
+    end_time = Column(UTCDateTime)
     duration = Column(Integer)  # in minutes
-    deadline = Column(DateTime(timezone=True))
+    deadline = Column(UTCDateTime)
     passing_marks = Column(Integer)
     total_marks = Column(Integer)
     access_key = Column(String)
@@ -83,27 +97,82 @@ class Quiz(Base):
     tab_switch_detection = Column(Boolean, default=False)
     violation_limit = Column(Integer, default=5)
     
-    status = Column(String, default="draft")  # draft, scheduled, live, ended
-    course_id = Column(Integer, ForeignKey("courses.id"))
+    status = Column(String, default="draft")  # draft, scheduled, live, ended; set by the server from the time window
+    course_id = Column(Integer, ForeignKey("courses.id"), index=True)
+    # False until the analytics tables hold every result; quizzes from before them are rebuilt on first read
+    analytics_backfilled = Column(Boolean, default=True, nullable=False)
+    # Raised with every change to the quiz's questions (see papers.bump_questions_version); keys each worker's cached paper and answer key
+    questions_version = Column(Integer, default=0, nullable=False)
 
     course = relationship("Course", back_populates="quizzes")
     questions = relationship("Question", back_populates="quiz")
     results = relationship("Result", back_populates="quiz")
 
+def _item_field(name):
+    return property(lambda self: getattr(self.item, name))
+
 class Question(Base):
+    # A question of a quiz: the quiz's link to a course bank item, with the points it is worth here
     __tablename__ = "questions"
     id = Column(Integer, primary_key=True, index=True)
-    quiz_id = Column(Integer, ForeignKey("quizzes.id"))
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), index=True)
+    item_id = Column(Integer, ForeignKey("question_bank_items.id"), index=True)
+    point_value = Column(Integer, default=1)
+
+    quiz = relationship("Quiz", back_populates="questions")
+    item = relationship("QuestionBankItem", lazy="joined")
+
+    # Content is read through the bank item, so existing readers of question.text etc. keep working
+    text = _item_field("text")
+    option_a = _item_field("option_a")
+    option_b = _item_field("option_b")
+    option_c = _item_field("option_c")
+    option_d = _item_field("option_d")
+    correct_option = _item_field("correct_option")
+    question_type = _item_field("question_type")
+    difficulty = _item_field("difficulty")
+    tags = _item_field("tag_names")
+
+# Course-level question bank, one row per distinct question (see backend/question_bank.py)
+class QuestionBankItem(Base):
+    __tablename__ = "question_bank_items"
+    id = Column(Integer, primary_key=True, index=True)
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    content_hash = Column(String(64), nullable=False)  # sha256 of the normalized text, options and answer
     text = Column(String)
     option_a = Column(String)
     option_b = Column(String)
     option_c = Column(String)
     option_d = Column(String)
     correct_option = Column(String)  # 'a', 'b', 'c', or 'd'
-    point_value = Column(Integer, default=1)
     question_type = Column(String, default="mcq")  # 'mcq', 'true_false', 'description'
+    difficulty = Column(Integer, nullable=True)
+    random_key = Column(Float, default=random.random)  # uniform key random draws seek on; resampled when drawn
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
-    quiz = relationship("Quiz", back_populates="questions")
+    tags = relationship("QuestionBankTag", lazy="selectin", cascade="all, delete-orphan")
+
+    @property
+    def tag_names(self):
+        return sorted(tag.tag for tag in self.tags)
+
+    __table_args__ = (
+        UniqueConstraint("course_id", "content_hash", name="uq_question_bank_items_course_hash"),
+        Index("ix_question_bank_items_course_key", "course_id", "random_key"),
+        Index("ix_question_bank_items_course_difficulty_key", "course_id", "difficulty", "random_key"),
+    )
+
+class QuestionBankTag(Base):
+    __tablename__ = "question_bank_tags"
+    item_id = Column(Integer, ForeignKey("question_bank_items.id"), primary_key=True)
+    tag = Column(String, primary_key=True)
+    # Copied from the item so tag draws walk one index
+    course_id = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    random_key = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_question_bank_tags_course_tag_key", "course_id", "tag", "random_key"),
+    )
 
 class Result(Base):
     __tablename__ = "results"
@@ -113,13 +182,94 @@ class Result(Base):
     score = Column(Integer)
     total_marks = Column(Integer)
     eye_tracking_violations = Column(Integer, default=0)
-    timeline = Column(JSON, nullable=True)
-    answers = Column(JSON, nullable=True) # Stores student answers {q_id: answer}
+    # Binary-encoded (backend/compact.py); the timeline is only loaded and decoded when asked for
+    timeline = deferred(Column(compact.CompactTimeline, nullable=True))
+    answers = Column(compact.CompactAnswers, nullable=True) # Stores student answers {q_id: answer}
     feedback = Column(JSON, nullable=True) # Stores teacher feedback/marking {q_id: {score: 5, comment: "Good"}}
     completed_at = Column(DateTime(timezone=True), server_default=func.now())
+    attempt_id = Column(Integer, ForeignKey("quiz_attempts.id"), nullable=True)
+    submission_id = Column(String, unique=True, nullable=True) # Set when ingested through the submission journal
 
     student = relationship("User", back_populates="results")
     quiz = relationship("Quiz", back_populates="results")
+    attempt = relationship("QuizAttempt")
+
+    @property
+    def loaded_timeline(self):
+        # The timeline if the query undeferred it, None instead of a lazy load per row otherwise
+        return None if "timeline" in inspect(self).unloaded else self.timeline
+
+    __table_args__ = (
+        Index("ix_results_student_quiz", "student_id", "quiz_id"),
+        Index("ix_results_quiz_id", "quiz_id"),
+    )
+
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"))
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"))
+    # Seed plus the quiz settings at start time rebuild exactly the paper the student saw
+    seed = Column(Integer)
+    max_questions = Column(Integer, default=0)
+    shuffled = Column(Boolean, default=False)
+    # The drawn question ids in paper order, fixed at start; the seed alone would follow later question edits
+    question_ids = Column(JSON, nullable=True)
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Autosaved progress (PATCH /attempts/{id}); submitted_at closes the attempt
+    answers = Column(JSON, nullable=True)
+    timeline = Column(JSON, nullable=True)
+    current_index = Column(Integer, default=0)
+    violations = Column(Integer, default=0)
+    time_left = Column(Integer, nullable=True)
+    saved_at = Column(DateTime(timezone=True), nullable=True)
+    submitted_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_quiz_attempts_student_quiz", "student_id", "quiz_id"),
+    )
+
+# Client-supplied Idempotency-Key of a submission; the unique index makes the claim atomic
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(Integer, ForeignKey("users.id"))
+    key = Column(String)
+    result_id = Column(Integer, ForeignKey("results.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("student_id", "key", name="uq_idempotency_keys_student_key"),
+    )
+
+# Submitted results per (student, quiz), checked against Quiz.attempts_count without counting rows
+class QuizAttemptCount(Base):
+    __tablename__ = "quiz_attempt_counts"
+    student_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    count = Column(Integer, default=0)
+
+# Running aggregates behind /quizzes/{id}/analytics, kept current by backend/analytics.py
+class QuizScoreCount(Base):
+    __tablename__ = "quiz_score_counts"
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), primary_key=True)
+    score = Column(Integer, primary_key=True)
+    total_marks = Column(Integer, primary_key=True)
+    count = Column(Integer, default=0)
+
+class QuestionStats(Base):
+    __tablename__ = "question_stats"
+    question_id = Column(Integer, ForeignKey("questions.id"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id"), index=True)
+    # Sums over the results that were given this question: e = points earned on it, t = result score
+    n = Column(Integer, default=0)
+    earned_sum = Column(Float, default=0)
+    earned_sq_sum = Column(Float, default=0)
+    score_sum = Column(Float, default=0)
+    score_sq_sum = Column(Float, default=0)
+    cross_sum = Column(Float, default=0)
+    # Points the question was worth when each result was graded, so later point changes don't skew p-value
+    points_sum = Column(Float, default=0)
 
 class Notification(Base):
     __tablename__ = "notifications"
@@ -133,6 +283,26 @@ class Notification(Base):
 
     user = relationship("User", backref="notifications")
 
+    # Fetch created_at during flush so new rows can be pushed without a reload
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Keyset pagination of a user's inbox by id
+        Index("ix_notifications_user_id_id", "user_id", "id"),
+    )
+
+# Which process runs a singleton background job (backend/lifecycle.py); expires unless renewed
+class SchedulerLease(Base):
+    __tablename__ = "scheduler_leases"
+    name = Column(String, primary_key=True)
+    owner = Column(String, nullable=False)
+    expires_at = Column(UTCDateTime, nullable=False)
+
+# Unread notifications per user, kept current by backend/notifications.py instead of counting rows
+class NotificationCount(Base):
+    __tablename__ = "notification_counts"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    unread = Column(Integer, default=0, nullable=False)
+
 class LeaveRequest(Base):
     __tablename__ = "leave_requests"
     id = Column(Integer, primary_key=True, index=True)
@@ -143,3 +313,8 @@ class LeaveRequest(Base):
 
     student = relationship("User", back_populates="leave_requests")
     course = relationship("Course", back_populates="leave_requests")
+
+    __table_args__ = (
+        Index("ix_leave_requests_student_course_status", "student_id", "course_id", "status"),
+        Index("ix_leave_requests_course_id", "course_id"),
+    )
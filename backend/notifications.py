@@ -0,0 +1,291 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import bindparam, case, delete, event, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from backend import models, database, lifecycle, pubsub
+
+NOTIFICATION_COLUMNS = ("id", "user_id", "title", "message", "type", "is_read", "created_at")
+
+# Notifications older than this are deleted by the retention job; 0 keeps them forever
+RETENTION_DAYS = int(os.getenv("QUIZI_NOTIFICATION_RETENTION_DAYS", "90"))
+PRUNE_INTERVAL_SECONDS = float(os.getenv("QUIZI_NOTIFICATION_PRUNE_INTERVAL_SECONDS", "3600"))
+PRUNE_BATCH = int(os.getenv("QUIZI_NOTIFICATION_PRUNE_BATCH", "1000"))
+LEASE_NAME = "notification-retention"
+
+logger = logging.getLogger(__name__)
+
+
+def to_event(row) -> dict:
+    data = {key: getattr(row, key) for key in NOTIFICATION_COLUMNS}
+    if data["created_at"] is not None:
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+
+def publish(events):
+    broker = pubsub.get_broker()
+    for data in events:
+        broker.publish(data["user_id"], data)
+
+
+# Every Notification added through an ORM session is pushed to its user once the
+# transaction commits, so routes creating notifications need no extra code.
+
+@event.listens_for(Session, "after_flush")
+def _collect_new_notifications(session, flush_context):
+    unread = Counter()
+    for obj in session.new:
+        if isinstance(obj, models.Notification):
+            session.info.setdefault("pending_notification_events", []).append(to_event(obj))
+            if not obj.is_read and obj.user_id is not None:
+                unread[obj.user_id] += 1
+    if unread:
+        # Same transaction as the rows, so the counters commit or roll back with them
+        add_unread(session, unread)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_notifications(session):
+    publish(session.info.pop("pending_notification_events", ()))
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_notifications(session, previous_transaction):
+    session.info.pop("pending_notification_events", None)
+
+
+def fan_out_to_course(db: Session, course_id: int, title: str, message: str, type: str) -> int:
+    """Notify every student enrolled in a course with one INSERT ... SELECT.
+
+    No ORM objects are built, so the cost does not grow with Python-side work
+    per student. Returns the number of notifications written.
+    """
+    rows = select(
+        models.Enrollment.student_id,
+        literal(title),
+        literal(message),
+        literal(type),
+        literal(False),
+    ).where(models.Enrollment.course_id == course_id)
+    stmt = insert(models.Notification).from_select(["user_id", "title", "message", "type", "is_read"], rows)
+    count_enrolled_unread(db, course_id)
+
+    if not db.bind.dialect.insert_returning:
+        return db.execute(stmt).rowcount
+    # Get the new rows back in the same statement so they can be pushed as deltas
+    columns = [getattr(models.Notification, key) for key in NOTIFICATION_COLUMNS]
+    created = [to_event(row) for row in db.execute(stmt.returning(*columns))]
+    db.info.setdefault("pending_notification_events", []).extend(created)
+    return len(created)
+
+
+def fan_out_in_background(course_id: int, title: str, message: str, type: str):
+    # Runs after the response is sent, so it needs its own session
+    db = database.SessionLocal()
+    try:
+        fan_out_to_course(db, course_id, title, message, type)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+# --- Unread counters ---
+
+def add_unread(db: Session, counts):
+    """Add ``counts`` ({user_id: n}) to the users' unread counters, creating missing ones."""
+    table = models.NotificationCount.__table__
+    rows = [{"user_id": user_id, "unread": n} for user_id, n in counts.items()]
+    # The session's connection rather than session.execute, which would autoflush from inside a flush
+    conn = db.connection()
+    upsert = database.upsert_insert(conn.engine)
+    if upsert is not None:
+        stmt = upsert(table)
+        conn.execute(stmt.on_conflict_do_update(index_elements=["user_id"], set_={"unread": table.c.unread + stmt.excluded.unread}), rows)
+        return
+    existing = set(conn.execute(select(table.c.user_id).where(table.c.user_id.in_(counts))).scalars())
+    if existing:
+        conn.execute(
+            update(table).where(table.c.user_id == bindparam("uid")).values(unread=table.c.unread + bindparam("n")),
+            [{"uid": user_id, "n": n} for user_id, n in counts.items() if user_id in existing],
+        )
+    missing = [row for row in rows if row["user_id"] not in existing]
+    if missing:
+        conn.execute(table.insert(), missing)
+
+
+def subtract_unread(db: Session, counts):
+    """Take ``counts`` ({user_id: n}) off the users' unread counters, never below zero."""
+    params = [{"uid": user_id, "n": n} for user_id, n in counts.items() if n]
+    if not params:
+        return
+    table = models.NotificationCount.__table__
+    n = bindparam("n")
+    stmt = update(table).where(table.c.user_id == bindparam("uid")).values(unread=case((table.c.unread > n, table.c.unread - n), else_=0))
+    db.connection().execute(stmt, params)
+
+
+def count_enrolled_unread(db: Session, course_id: int):
+    """One more unread notification for every student of the course, as one statement."""
+    table = models.NotificationCount.__table__
+    students = select(models.Enrollment.student_id, literal(1)).where(models.Enrollment.course_id == course_id)
+    upsert = database.upsert_insert(db.get_bind())
+    if upsert is not None:
+        stmt = upsert(table).from_select(["user_id", "unread"], students)
+        db.execute(stmt.on_conflict_do_update(index_elements=["user_id"], set_={"unread": table.c.unread + 1}))
+        return
+    enrolled = select(models.Enrollment.student_id).where(models.Enrollment.course_id == course_id)
+    db.execute(update(table).where(table.c.user_id.in_(enrolled)).values(unread=table.c.unread + 1))
+    counted = exists().where(table.c.user_id == models.Enrollment.student_id)
+    db.execute(table.insert().from_select(["user_id", "unread"], students.where(~counted)))
+
+
+def unread_count(db: Session, user_id: int):
+    return db.execute(select(models.NotificationCount.unread).where(models.NotificationCount.user_id == user_id)).scalar() or 0
+
+
+# --- Bulk actions ---
+
+def _selection(user_id, ids=None, max_id=None):
+    # The user's notifications: the listed ids, or all of them up to max_id (so rows arriving meanwhile are kept)
+    where = [models.Notification.user_id == user_id]
+    if ids is not None:
+        where.append(models.Notification.id.in_(ids))
+    if max_id is not None:
+        where.append(models.Notification.id <= max_id)
+    return where
+
+
+def mark_read(db: Session, user_id: int, ids=None, max_id=None):
+    """Mark the selected notifications read with one UPDATE; returns how many were unread. The caller commits."""
+    stmt = update(models.Notification).where(*_selection(user_id, ids, max_id), models.Notification.is_read == False).values(is_read=True)
+    changed = db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+    subtract_unread(db, {user_id: changed})
+    return changed
+
+
+def delete_notifications(db: Session, user_id: int, ids=None, max_id=None):
+    """Delete the selected notifications with one DELETE; returns how many. The caller commits."""
+    # Marking them read first gives the counter its delta without reading the rows
+    mark_read(db, user_id, ids, max_id)
+    stmt = delete(models.Notification).where(*_selection(user_id, ids, max_id))
+    return db.execute(stmt.execution_options(synchronize_session=False)).rowcount
+
+
+# --- Retention ---
+
+def _delete_batch(db: Session, ids):
+    """Delete ``ids`` and take the unread ones off their users' counters, by the rows actually deleted."""
+    Notification = models.Notification
+    stmt = delete(Notification).where(Notification.id.in_(ids)).execution_options(synchronize_session=False)
+    if db.bind.dialect.delete_returning:
+        gone = db.execute(stmt.returning(Notification.user_id, Notification.is_read)).all()
+    else:
+        # Locked, so a concurrent mark-read or delete can't change them between the read and the delete
+        gone = db.execute(select(Notification.user_id, Notification.is_read).where(Notification.id.in_(ids)).with_for_update()).all()
+        db.execute(stmt)
+    subtract_unread(db, Counter(user_id for user_id, is_read in gone if not is_read and user_id is not None))
+    return len(gone)
+
+
+def prune(db: Session, cutoff: datetime, batch: int = PRUNE_BATCH):
+    """Delete notifications created before ``cutoff``, oldest first, committing every ``batch`` rows.
+
+    Short transactions keep writers (fan-outs, submissions) from waiting on
+    one long delete. Returns the number of notifications deleted.
+    """
+    Notification = models.Notification
+    # Ids follow creation order, so everything before the first recent id is old. Walking the
+    # primary key up to the first recent row avoids an index on created_at that every insert would pay for.
+    boundary = db.execute(select(Notification.id).where(Notification.created_at >= cutoff).order_by(Notification.id).limit(1)).scalar()
+    if boundary is None:
+        # No recent row yet: everything up to the newest id now is old, but not rows inserted while we prune
+        newest = db.execute(select(func.max(Notification.id))).scalar()
+        if newest is None:
+            return 0
+        boundary = newest + 1
+    deleted = 0
+    while True:
+        ids = db.execute(select(Notification.id).where(Notification.id < boundary).order_by(Notification.id).limit(batch)).scalars().all()
+        if not ids:
+            return deleted
+        deleted += _delete_batch(db, ids)
+        db.commit()
+        if len(ids) < batch:
+            return deleted
+
+
+class RetentionJob:
+    """Daemon thread pruning notifications older than ``days`` every ``interval`` seconds.
+
+    Every worker runs one, but only the holder of the ``notification-retention``
+    row in ``scheduler_leases`` prunes. The lease lasts two intervals, so a
+    follower takes over within about that long of the holder dying.
+    """
+
+    def __init__(self, days=RETENTION_DAYS, interval=PRUNE_INTERVAL_SECONDS, batch=PRUNE_BATCH):
+        self.days = days
+        self.interval = interval
+        self.batch = batch
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self.pruned = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notification-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.leader:
+            with database.SessionLocal() as db:
+                lifecycle.release_lease(db, LEASE_NAME, self.owner)
+            self.leader = False
+
+    def run_once(self):
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=self.days)
+        db = database.SessionLocal()
+        try:
+            self.leader = lifecycle.acquire_lease(db, LEASE_NAME, self.owner, 2 * self.interval)
+            if not self.leader:
+                return
+            self.pruned += prune(db, cutoff, self.batch)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self.last_run = datetime.now(timezone.utc)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Notification retention run failed")
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        return {"retention_days": self.days, "leader": self.leader, "pruned": self.pruned, "last_run": self.last_run}
+
+
+def retention_from_env():
+    """The retention job, unless QUIZI_NOTIFICATION_RETENTION_DAYS is 0; the app's startup hook starts it."""
+    if RETENTION_DAYS <= 0:
+        return None
+    return RetentionJob()
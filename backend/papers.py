@@ -0,0 +1,133 @@
+import hashlib
+import json
+import random
+import secrets
+import threading
+import time
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from backend import models, schemas
+
+
+STUDENT_FIELDS = tuple(schemas.QuestionStudentResponse.model_fields)
+
+
+class QuestionPaper:
+    """Pre-rendered, student-safe question JSON for one quiz.
+
+    Each question is serialized once as a QuestionStudentResponse (no answer
+    key); a student's paper is then just a join of the byte strings their
+    permutation selects.
+    """
+
+    __slots__ = ("quiz_id", "ids", "positions", "items", "rows", "etag")
+
+    def __init__(self, quiz_id, questions):
+        students = [schemas.QuestionStudentResponse.model_validate(q) for q in questions]
+        self.quiz_id = quiz_id
+        self.ids = tuple(q.id for q in students)
+        self.positions = {q_id: i for i, q_id in enumerate(self.ids)}
+        self.items = tuple(q.model_dump_json().encode() for q in students)
+        self.rows = tuple(tuple(getattr(q, field) for field in STUDENT_FIELDS) for q in students)
+        # Changes whenever any question's student-visible content changes
+        self.etag = hashlib.blake2b(b"\0".join(self.items), digest_size=12).hexdigest()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def render(self, indices):
+        return b"[" + b",".join(self.items[i] for i in indices) + b"]"
+
+    def render_columnar(self, indices):
+        """Parallel arrays, one per field, instead of a list of objects."""
+        columns = {field: [self.rows[i][j] for i in indices] for j, field in enumerate(STUDENT_FIELDS)}
+        return json.dumps(columns, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def render_as(self, indices, format="list"):
+        return self.render_columnar(indices) if format == "columnar" else self.render(indices)
+
+
+def attempt_etag(paper, seed, format="list"):
+    return f'"{paper.etag}-{seed}-{format}"'
+
+
+def new_seed():
+    return secrets.randbits(31)
+
+
+def select_indices(n_questions, seed, max_questions=0, shuffle=False):
+    """Deterministic subset/order of a paper for one attempt; same seed, same paper."""
+    rng = random.Random(seed)
+    indices = list(range(n_questions))
+    if max_questions and max_questions < n_questions:
+        indices = rng.sample(indices, max_questions)
+        if not shuffle:
+            indices.sort()
+    elif shuffle:
+        rng.shuffle(indices)
+    return indices
+
+
+def draw_question_ids(paper, seed, max_questions=0, shuffle=False):
+    """The ids a new attempt is given; stored on the attempt so later question edits cannot change them."""
+    return [paper.ids[i] for i in select_indices(len(paper), seed, max_questions, shuffle)]
+
+
+def attempt_question_ids(paper, attempt):
+    """Question ids the student saw in ``attempt``, in the order they saw them."""
+    if attempt.question_ids is not None:
+        return list(attempt.question_ids)
+    # Attempts started before the ids were stored: replay the seed over the current questions
+    return draw_question_ids(paper, attempt.seed, attempt.max_questions, attempt.shuffled)
+
+
+def attempt_indices(paper, attempt):
+    """Positions in ``paper`` of the attempt's questions; ones deleted since are left out."""
+    return [paper.positions[q_id] for q_id in attempt_question_ids(paper, attempt) if q_id in paper.positions]
+
+
+# quiz_id -> (questions_version, paper). The version lives on the quiz row, so a
+# change committed by any worker makes every worker's copy stale.
+_papers = {}
+_lock = threading.Lock()
+
+
+def questions_version(db: Session, quiz_id: int) -> int:
+    return db.execute(select(models.Quiz.questions_version).where(models.Quiz.id == quiz_id)).scalar() or 0
+
+
+def bump_questions_version(db: Session, quiz_id: int):
+    """Mark a quiz's questions changed, in the caller's transaction.
+
+    The new version is at least the current time in milliseconds. Quiz ids can
+    be reused after a delete, and a quiz created under a deleted quiz's id
+    must not reach a version some worker cached for the deleted one. Deleting
+    a quiz therefore needs no cache eviction.
+    """
+    quiz = models.Quiz.__table__
+    stamp = time.time_ns() // 1_000_000
+    following = quiz.c.questions_version + 1
+    db.execute(update(quiz).where(quiz.c.id == quiz_id).values(questions_version=case((following > stamp, following), else_=stamp)))
+
+
+def build_paper(db: Session, quiz_id: int) -> QuestionPaper:
+    questions = db.query(models.Question).filter(models.Question.quiz_id == quiz_id).order_by(models.Question.id).all()
+    return QuestionPaper(quiz_id, questions)
+
+
+def get_paper(db: Session, quiz_id: int) -> QuestionPaper:
+    # Read before building: a change racing the build leaves the entry tagged
+    # with the older version, which only costs the next caller a rebuild
+    version = questions_version(db, quiz_id)
+    cached = _papers.get(quiz_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    paper = build_paper(db, quiz_id)
+    with _lock:
+        current = _papers.get(quiz_id)
+        if current is None or current[0] <= version:
+            _papers[quiz_id] = (version, paper)
+    return paper
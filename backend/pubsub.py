@@ -0,0 +1,136 @@
+"""Per-user event channels for pushing notifications to connected clients.
+
+The in-memory broker only reaches clients connected to the same process. Set
+QUIZI_BROKER_URL=redis://host:6379/0 (requires the ``redis`` package) when
+running several uvicorn workers.
+"""
+import asyncio
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+
+
+class Subscription(ABC):
+    @abstractmethod
+    async def get(self, timeout):
+        """Next event, or None if nothing arrived within ``timeout`` seconds."""
+
+    @abstractmethod
+    async def close(self):
+        ...
+
+
+class Broker(ABC):
+    @abstractmethod
+    def publish(self, user_id: int, event: dict):
+        """Thread-safe; may be called from sync routes and background tasks."""
+
+    @abstractmethod
+    async def subscribe(self, user_id: int) -> Subscription:
+        ...
+
+
+class InMemorySubscription(Subscription):
+    def __init__(self, broker, user_id, maxsize):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass  # slow client; it resyncs with ?since= on reconnect
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._remove(self)
+
+
+class InMemoryBroker(Broker):
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, user_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(user_id, ()))
+        for sub in subscribers:
+            sub.loop.call_soon_threadsafe(sub.deliver, event)
+
+    async def subscribe(self, user_id):
+        sub = InMemorySubscription(self, user_id, self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+        return sub
+
+    def _remove(self, sub):
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+class RedisSubscription(Subscription):
+    def __init__(self, pubsub):
+        self.pubsub = pubsub
+
+    async def get(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+    async def close(self):
+        await self.pubsub.aclose()
+
+
+class RedisBroker(Broker):
+    def __init__(self, url, prefix="quizi:user:"):
+        import redis
+        import redis.asyncio
+
+        self.prefix = prefix
+        self._sync = redis.Redis.from_url(url)
+        self._async = redis.asyncio.Redis.from_url(url)
+
+    def publish(self, user_id, event):
+        self._sync.publish(f"{self.prefix}{user_id}", json.dumps(event, default=str))
+
+    async def subscribe(self, user_id):
+        pubsub = self._async.pubsub()
+        await pubsub.subscribe(f"{self.prefix}{user_id}")
+        return RedisSubscription(pubsub)
+
+
+def _default_broker():
+    url = os.getenv("QUIZI_BROKER_URL")
+    if url:
+        return RedisBroker(url)
+    return InMemoryBroker()
+
+
+broker = _default_broker()
+
+
+def get_broker() -> Broker:
+    return broker
+
+
+def set_broker(new_broker: Broker):
+    global broker
+    broker = new_broker
@@ -0,0 +1,242 @@
+"""Course-level question bank.
+
+Question content lives once per course in ``question_bank_items``; a quiz's
+``questions`` rows link to bank items and carry the points. Reusing material
+across quizzes or semesters therefore adds link rows, not copies.
+
+Items are deduplicated on a sha256 of their normalized content (whitespace
+collapsed, case folded, answer letter lowercased), unique per course, so
+inserting a question the bank already holds links the existing item.
+
+Random draws seek the ``random_key`` index: every item carries a uniform
+key, and each drawn item is the first one at or after its own independent
+random start point, wrapping around once. An item is picked with probability
+proportional to the key gap in front of it, so drawn items get a fresh key
+afterwards: no item keeps a large gap, and over repeated draws every item is
+equally likely. A draw of N items costs N short index seeks instead of
+loading the bank.
+"""
+import hashlib
+import random
+
+from sqlalchemy import bindparam, exists, func, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from backend import database, models
+
+CONTENT_FIELDS = ("text", "option_a", "option_b", "option_c", "option_d", "correct_option", "question_type")
+TAG_LENGTH = 50
+CHUNK = 500  # rows per statement; keeps the IN lists well under SQLite's variable limit
+
+
+class DuplicateQuestion(Exception):
+    pass
+
+
+def _normalize(value):
+    return " ".join((value or "").split()).casefold()
+
+
+def content_hash(row):
+    parts = [_normalize(row.get(field)) for field in CONTENT_FIELDS]
+    parts[-1] = parts[-1] or "mcq"
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+
+def normalize_tags(tags):
+    tags = {" ".join(tag.split()).casefold()[:TAG_LENGTH] for tag in tags or ()}
+    tags.discard("")
+    return sorted(tags)
+
+
+def _chunks(rows):
+    for start in range(0, len(rows), CHUNK):
+        yield rows[start:start + CHUNK]
+
+
+def _insert_ignoring(db: Session, table, rows, index_elements):
+    """Insert ``rows`` into ``table``, skipping those that hit the unique key ``index_elements``."""
+    if not rows:
+        return
+    insert = database.upsert_insert(db.get_bind())
+    if insert is not None:
+        db.execute(insert(table).on_conflict_do_nothing(index_elements=index_elements), rows)
+        return
+    # Portable fallback: look the keys up first and insert the rest
+    columns = [table.c[name] for name in index_elements]
+    keys = [tuple(row[name] for name in index_elements) for row in rows]
+    existing = set(db.execute(select(*columns).where(tuple_(*columns).in_(keys))).all())
+    missing = [row for row, key in zip(rows, keys) if key not in existing]
+    if missing:
+        db.execute(table.insert(), missing)
+
+
+def store_items(db: Session, course_id: int, rows):
+    """Bank items for ``rows`` (dicts with CONTENT_FIELDS and optionally difficulty and tags), in order.
+
+    Rows the course's bank already holds resolve to the existing item; the
+    rest are inserted. Tags are added to the item, and difficulty is only
+    set on newly inserted items. Returns (item_id, random_key) pairs.
+    """
+    items = models.QuestionBankItem.__table__
+    hashes = [content_hash(row) for row in rows]
+    new = {}
+    for row, digest in zip(rows, hashes):
+        if digest not in new:
+            new[digest] = dict(
+                {field: row.get(field) for field in CONTENT_FIELDS},
+                question_type=row.get("question_type") or "mcq",
+                course_id=course_id, content_hash=digest,
+                difficulty=row.get("difficulty"), random_key=random.random(),
+            )
+    found = {}
+    for chunk in _chunks(list(new.values())):
+        _insert_ignoring(db, items, chunk, ["course_id", "content_hash"])
+        found.update(
+            (digest, (item_id, key))
+            for digest, item_id, key in db.execute(
+                select(items.c.content_hash, items.c.id, items.c.random_key)
+                .where(items.c.course_id == course_id, items.c.content_hash.in_([row["content_hash"] for row in chunk]))
+            )
+        )
+
+    tags = {}
+    for row, digest in zip(rows, hashes):
+        item_id, key = found[digest]
+        for tag in normalize_tags(row.get("tags")):
+            tags[(item_id, tag)] = dict(item_id=item_id, tag=tag, course_id=course_id, random_key=key)
+    for chunk in _chunks(list(tags.values())):
+        _insert_ignoring(db, models.QuestionBankTag.__table__, chunk, ["item_id", "tag"])
+    return [found[digest] for digest in hashes]
+
+
+def link_items(db: Session, quiz_id: int, links):
+    """Add (item_id, point_value) pairs to the quiz, skipping items it already has.
+
+    Returns how many were added.
+    """
+    questions = models.Question.__table__
+    added = 0
+    for chunk in _chunks(list(links)):
+        existing = set(db.execute(
+            select(questions.c.item_id).where(questions.c.quiz_id == quiz_id, questions.c.item_id.in_([item_id for item_id, _ in chunk]))
+        ).scalars())
+        rows = []
+        for item_id, point_value in chunk:
+            if item_id not in existing:
+                existing.add(item_id)
+                rows.append(dict(quiz_id=quiz_id, item_id=item_id, point_value=point_value))
+        if rows:
+            db.execute(questions.insert(), rows)
+            added += len(rows)
+    return added
+
+
+def add_questions(db: Session, quiz: models.Quiz, rows):
+    """Store ``rows`` in the quiz's course bank and link them to the quiz; the caller commits.
+
+    Returns (added, duplicates): questions the quiz already had are not linked twice.
+    """
+    items = store_items(db, quiz.course_id, rows)
+    added = link_items(db, quiz.id, [(item_id, row.get("point_value") or 1) for (item_id, _), row in zip(items, rows)])
+    return added, len(rows) - added
+
+
+def replace_content(db: Session, question: models.Question, changes):
+    """Point ``question`` at the bank item for its content with ``changes`` applied.
+
+    Items are shared, so an edit never rewrites one in place: the edited content
+    resolves to its own (possibly existing) item and other quizzes keep theirs.
+    """
+    content = {field: getattr(question, field) for field in CONTENT_FIELDS}
+    content.update((field, changes[field]) for field in CONTENT_FIELDS if field in changes)
+    content["difficulty"] = changes.get("difficulty", question.difficulty)
+    [(item_id, _)] = store_items(db, question.quiz.course_id, [content])
+    if item_id != question.item_id:
+        clash = db.execute(
+            select(models.Question.id).where(models.Question.quiz_id == question.quiz_id, models.Question.item_id == item_id)
+        ).first()
+        if clash:
+            raise DuplicateQuestion("The quiz already has this question")
+        question.item_id = item_id
+    item = db.get(models.QuestionBankItem, item_id)
+    if "difficulty" in changes:
+        item.difficulty = changes["difficulty"]
+    if changes.get("tags") is not None:
+        set_tags(item, changes["tags"])
+
+
+def set_tags(item: models.QuestionBankItem, tags):
+    current = {tag.tag: tag for tag in item.tags}
+    item.tags = [
+        current.get(tag) or models.QuestionBankTag(tag=tag, course_id=item.course_id, random_key=item.random_key)
+        for tag in normalize_tags(tags)
+    ]
+
+
+def draw(db: Session, course_id: int, count: int, tags=(), difficulty=None, exclude_quiz_id=None, rng=random):
+    """Ids of up to ``count`` random bank items of the course, optionally limited to any of ``tags`` and a difficulty.
+
+    Items already in ``exclude_quiz_id`` are not drawn. Fewer than ``count``
+    come back only when fewer items match. The drawn items' keys are
+    resampled in the caller's transaction.
+    """
+    tags = normalize_tags(tags)
+    if tags:
+        # The tag index holds (course_id, tag, random_key); a difficulty is checked on the joined item
+        key, item_id = models.QuestionBankTag.random_key, models.QuestionBankTag.item_id
+        base = select(item_id, key).where(models.QuestionBankTag.course_id == course_id, models.QuestionBankTag.tag.in_(tags))
+        if difficulty is not None:
+            base = base.join(models.QuestionBankItem, models.QuestionBankItem.id == item_id).where(models.QuestionBankItem.difficulty == difficulty)
+    else:
+        key, item_id = models.QuestionBankItem.random_key, models.QuestionBankItem.id
+        base = select(item_id, key).where(models.QuestionBankItem.course_id == course_id)
+        if difficulty is not None:
+            base = base.where(models.QuestionBankItem.difficulty == difficulty)
+    if exclude_quiz_id is not None:
+        base = base.where(~exists().where(models.Question.quiz_id == exclude_quiz_id, models.Question.item_id == item_id))
+
+    chosen = {}
+    while len(chosen) < count:
+        picked = _first_unchosen(db, base, key, rng.random(), chosen)
+        if picked is None:
+            break  # fewer than count items match
+        chosen[picked] = None
+    _resample_keys(db, list(chosen), rng)
+    return list(chosen)
+
+
+def _first_unchosen(db: Session, base, key, start, chosen):
+    """The first item at or after ``start`` in key order, wrapping around once, that isn't in ``chosen``."""
+    limit = len(chosen) + 1
+    for bounds in ((key >= start,), (key < start,)):
+        after = None
+        while True:
+            stmt = base.where(*bounds)
+            if after is not None:
+                stmt = stmt.where(key > after)
+            rows = db.execute(stmt.order_by(key).limit(limit)).all()
+            for row_item_id, _ in rows:
+                # Taken items are skipped; an item carrying several of the tags shows up once per tag
+                if row_item_id not in chosen:
+                    return row_item_id
+            if len(rows) < limit:
+                break
+            after = rows[-1][1]
+    return None
+
+
+def _resample_keys(db: Session, item_ids, rng):
+    """Give drawn items new random keys, on the item and on its tag rows; the caller commits."""
+    if not item_ids:
+        return
+    items, tags = models.QuestionBankItem.__table__, models.QuestionBankTag.__table__
+    params = [{"b_id": item_id, "b_key": rng.random()} for item_id in item_ids]
+    db.execute(update(items).where(items.c.id == bindparam("b_id")).values(random_key=bindparam("b_key")), params)
+    db.execute(update(tags).where(tags.c.item_id == bindparam("b_id")).values(random_key=bindparam("b_key")), params)
+
+
+def update_total_marks(db: Session, quiz_id: int):
+    total = db.execute(select(func.coalesce(func.sum(models.Question.point_value), 0)).where(models.Question.quiz_id == quiz_id)).scalar()
+    db.execute(update(models.Quiz).where(models.Quiz.id == quiz_id).values(total_marks=total))
+    return total
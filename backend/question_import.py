@@ -0,0 +1,136 @@
+"""Streaming import of the pipe-delimited question format (public/demo_questions.txt).
+
+One question per line, fields separated by ``|``:
+  mcq:          Question | A | B | C | D | letter | points
+  true_false:   Question | True/False | points
+  description:  Question | points
+As in the dashboard's parser, the points field may be left off (1 point).
+
+The upload is read line by line and inserted in executemany batches of
+BATCH_SIZE inside one transaction, so memory stays flat however large the bank
+is. Questions go through the course's question bank (backend/question_bank.py):
+lines the bank already holds are linked rather than copied, and lines the quiz
+already has are counted as duplicates. Every bad line is reported with its
+line number. By default any error rolls back the whole import; with
+``skip_invalid`` the valid lines are kept.
+"""
+from sqlalchemy.orm import Session
+
+from backend import models, question_bank
+
+FORMAT_PATTERN = "^(mcq|true_false|description)$"
+BATCH_SIZE = 1000
+MAX_ERRORS = 100  # reported individually; the rest are only counted
+
+LAYOUTS = {
+    "mcq": "Question | A | B | C | D | letter | points",
+    "true_false": "Question | True/False | points",
+    "description": "Question | points",
+}
+TRUE_FALSE = {"true": "a", "t": "a", "false": "b", "f": "b"}
+
+
+class ImportFailed(Exception):
+    def __init__(self, errors, error_count):
+        super().__init__(f"{error_count} invalid line{'' if error_count == 1 else 's'}")
+        self.errors = errors
+        self.error_count = error_count
+
+
+def _fields(text, format, count):
+    parts = [part.strip() for part in text.split("|")]
+    # The trailing points field is optional
+    if len(parts) not in (count - 1, count):
+        raise ValueError(f"expected {count} fields ({LAYOUTS[format]}), got {len(parts)}")
+    if not parts[0]:
+        raise ValueError("question text is empty")
+    return parts
+
+
+def _points(parts, count):
+    value = parts[count - 1] if len(parts) == count else ""
+    if value == "":
+        return 1
+    if not (value.isascii() and value.isdigit()) or int(value) < 1:
+        raise ValueError(f"points must be a whole number of at least 1, got {value!r}")
+    return int(value)
+
+
+def parse_line(text, format):
+    """The Question columns for one line, or ValueError saying what is wrong with it."""
+    if format == "mcq":
+        parts = _fields(text, format, 7)
+        options = dict(zip("abcd", parts[1:5]))
+        letter = parts[5].lower()
+        if letter not in options:
+            raise ValueError(f"correct letter must be a, b, c or d, got {parts[5]!r}")
+        if not options[letter]:
+            raise ValueError(f"option {letter.upper()} is marked correct but is empty")
+        return dict(
+            text=parts[0], question_type="mcq",
+            option_a=options["a"], option_b=options["b"], option_c=options["c"], option_d=options["d"],
+            correct_option=letter, point_value=_points(parts, 7),
+        )
+    if format == "true_false":
+        parts = _fields(text, format, 3)
+        correct = TRUE_FALSE.get(parts[1].lower())
+        if correct is None:
+            raise ValueError(f"answer must be True or False, got {parts[1]!r}")
+        return dict(
+            text=parts[0], question_type="true_false",
+            option_a="True", option_b="False", option_c="", option_d="",
+            correct_option=correct, point_value=_points(parts, 3),
+        )
+    parts = _fields(text, format, 2)
+    return dict(
+        text=parts[0], question_type="description",
+        option_a="", option_b="", option_c="", option_d="",
+        correct_option="", point_value=_points(parts, 2),
+    )
+
+
+def import_questions(db: Session, quiz_id: int, lines, format, skip_invalid=False):
+    """Insert the questions in ``lines`` (an iterable of bytes lines) into the quiz; the caller commits.
+
+    Raises ImportFailed, with nothing to keep, if a line is invalid and ``skip_invalid`` is off.
+    """
+    quiz = db.get(models.Quiz, quiz_id)
+    imported = duplicates = error_count = 0
+    errors, batch = [], []
+
+    for line_no, raw in enumerate(lines, 1):
+        try:
+            text = raw.decode("utf-8-sig" if line_no == 1 else "utf-8").strip()
+            if not text:
+                continue
+            row = parse_line(text, format)
+        except UnicodeDecodeError:
+            error = "line is not valid UTF-8 text"
+        except ValueError as exc:
+            error = str(exc)
+        else:
+            # After the first error a strict import only keeps validating, to report every bad line
+            if error_count and not skip_invalid:
+                continue
+            batch.append(row)
+            if len(batch) >= BATCH_SIZE:
+                # Core executemany on the bank and link tables: no ORM objects or identity-map bookkeeping per row
+                added, skipped = question_bank.add_questions(db, quiz, batch)
+                imported += added
+                duplicates += skipped
+                batch = []
+            continue
+        error_count += 1
+        if len(errors) < MAX_ERRORS:
+            errors.append({"line": line_no, "error": error})
+
+    if error_count and not skip_invalid:
+        raise ImportFailed(errors, error_count)
+    if batch:
+        added, skipped = question_bank.add_questions(db, quiz, batch)
+        imported += added
+        duplicates += skipped
+
+    # Once for the whole import instead of after every question
+    total = question_bank.update_total_marks(db, quiz_id)
+    return {"imported": imported, "duplicates": duplicates, "skipped": error_count, "errors": errors, "total_marks": total}
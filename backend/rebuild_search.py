@@ -0,0 +1,42 @@
+import sys
+import os
+import argparse
+import time
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+# Same path setup as view_db.py so this runs from the project root or backend/
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(backend_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from backend import search
+
+# Re-index the full-text search tables from courses, quizzes and the question bank,
+# e.g. after restoring a backup or bulk-loading rows with triggers disabled
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the SQLite FTS5 search indexes.")
+    parser.add_argument("--db", help="path to the SQLite database (default: quizi.db in the project root, else backend/)")
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(project_root, "quizi.db")
+    if not args.db and not os.path.exists(db_path):
+        db_path = os.path.join(backend_dir, "quizi.db")
+    if not os.path.exists(db_path):
+        sys.exit(f"Database not found: {db_path}")
+    print(f"Using database at: {db_path}")
+
+    engine = create_engine(f"sqlite:///{db_path}")
+    start = time.perf_counter()
+    try:
+        if not search.ensure(engine):
+            sys.exit("This SQLite build has no FTS5 support; search falls back to LIKE scans.")
+        search.rebuild(engine)
+    except OperationalError as exc:
+        sys.exit(f"{exc.orig}: run the migrate_*.py scripts (or start the app once) first")
+    with engine.connect() as conn:
+        for name, (model, _) in search.INDEXES.items():
+            rows = conn.execute(text(f"SELECT COUNT(*) FROM {model.__tablename__}")).scalar()
+            print(f"{name:<20} {rows} rows")
+    print(f"Rebuilt in {time.perf_counter() - start:.2f}s")
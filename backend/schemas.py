@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import AliasChoices, BaseModel, EmailStr, Field
 from typing import Optional, List
 from datetime import datetime
 
@@ -99,7 +99,7 @@ class QuizBase(BaseModel):
     fullscreen_required: bool = False
     tab_switch_detection: bool = False
     violation_limit: int = 5
-    status: str = "draft"
+    status: str = "draft" # set by the server from start_time/end_time; ignored on input
 
 class QuizCreate(QuizBase):
     course_id: int
@@ -122,10 +122,13 @@ class QuestionBase(BaseModel):
     correct_option: Optional[str] = None
     point_value: int = 1
     question_type: str = "mcq" # mcq, true_false, description
+    difficulty: Optional[int] = None # kept on the course bank item
+    tags: Optional[List[str]] = None
 
 class QuestionCreate(QuestionBase):
     quiz_id: Optional[int] = None
 
+# Teacher-facing: includes the answer key
 class QuestionResponse(QuestionBase):
     id: int
     quiz_id: int
@@ -133,14 +136,74 @@ class QuestionResponse(QuestionBase):
     class Config:
         from_attributes = True
 
+# Student-facing: same question without correct_option
+class QuestionStudentResponse(BaseModel):
+    id: int
+    quiz_id: int
+    text: str
+    option_a: Optional[str] = None
+    option_b: Optional[str] = None
+    option_c: Optional[str] = None
+    option_d: Optional[str] = None
+    point_value: int = 1
+    question_type: str = "mcq"
+
+    class Config:
+        from_attributes = True
+
+# --- Question Bank Schemas ---
+class BankItemResponse(BaseModel):
+    id: int
+    course_id: int
+    text: str
+    option_a: Optional[str] = None
+    option_b: Optional[str] = None
+    option_c: Optional[str] = None
+    option_d: Optional[str] = None
+    correct_option: Optional[str] = None
+    question_type: str = "mcq"
+    difficulty: Optional[int] = None
+    tags: List[str] = Field(validation_alias=AliasChoices("tag_names", "tags"))
+    created_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class BankItemUpdate(BaseModel):
+    difficulty: Optional[int] = None
+    tags: Optional[List[str]] = None
+
+class BankLinkRequest(BaseModel):
+    item_ids: List[int]
+    point_value: int = Field(1, ge=1)
+
+class BankDrawRequest(BaseModel):
+    count: int = Field(ge=1, le=500)
+    tags: List[str] = [] # any of these
+    difficulty: Optional[int] = None
+    point_value: int = Field(1, ge=1)
+
+# --- Search Schemas ---
+# snippet: the best-matching passage, matches wrapped in <mark></mark> (text is not HTML-escaped)
+class CourseSearchHit(CourseResponse):
+    snippet: str = ""
+
+class QuizSearchHit(QuizResponse):
+    snippet: str = ""
+
+class QuestionSearchHit(BankItemResponse):
+    snippet: str = ""
+
 # --- Result Schemas ---
 class ResultCreate(BaseModel):
     quiz_id: int
-    score: int
-    total_marks: int
+    # Graded on the server; kept so older clients still validate
+    score: int = 0
+    total_marks: int = 0
     eye_tracking_violations: int = 0
     timeline: Optional[List[dict]] = None
     answers: Optional[dict] = None
+    attempt_id: Optional[int] = None # From the X-Attempt-Id header of /quizzes/{id}/start
 
 class ResultResponse(BaseModel):
     id: int
@@ -149,16 +212,67 @@ class ResultResponse(BaseModel):
     score: int
     total_marks: int
     eye_tracking_violations: int
-    timeline: Optional[List[dict]] = None
+    # Filled only where the route loads it (include_timeline=true on the list routes)
+    timeline: Optional[List[dict]] = Field(None, validation_alias=AliasChoices("loaded_timeline", "timeline"))
     answers: Optional[dict] = None
     feedback: Optional[dict] = None
     completed_at: datetime
+    attempt_id: Optional[int] = None
+    submission_id: Optional[str] = None
     student: Optional[UserResponse] = None
     quiz: Optional[QuizResponse] = None
     
     class Config:
         from_attributes = True
 
+# --- Attempt Autosave Schemas ---
+class AttemptPatch(BaseModel):
+    answers: Optional[dict] = None # only the answers that changed; null clears one
+    timeline: Optional[List[dict]] = None # events since the last save
+    timeline_start: Optional[int] = None # index of timeline[0] in the attempt's timeline; a retry skips events already saved
+    current_index: Optional[int] = None
+    violations: Optional[int] = None
+    time_left: Optional[int] = None
+
+class AttemptResponse(BaseModel):
+    id: int
+    quiz_id: int
+    answers: dict
+    timeline: List[dict]
+    current_index: int
+    violations: int
+    time_left: Optional[int] = None
+    started_at: Optional[datetime] = None
+    saved_at: Optional[datetime] = None
+    submitted_at: Optional[datetime] = None
+
+class ScoreBucket(BaseModel):
+    from_percent: int
+    to_percent: int
+    count: int
+
+class QuestionAnalytics(BaseModel):
+    question_id: int
+    text: str
+    question_type: str
+    point_value: int
+    responses: int
+    p_value: Optional[float] = None # mean fraction of the question's points earned
+    discrimination: Optional[float] = None # point-biserial correlation with the total score
+
+class QuizAnalyticsResponse(BaseModel):
+    quiz_id: int
+    attempts: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    std_dev: Optional[float] = None
+    min: Optional[int] = None
+    max: Optional[int] = None
+    passing_marks: Optional[int] = None
+    pass_rate: Optional[float] = None  # None when the quiz has no passing mark
+    histogram: List[ScoreBucket]
+    questions: List[QuestionAnalytics]
+
 class NotificationResponse(BaseModel):
     id: int
     user_id: Optional[int] = None
@@ -171,6 +285,11 @@ class NotificationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# ids: these notifications; omitted: all of them, up to max_id when given (the newest id the client has seen)
+class NotificationSelection(BaseModel):
+    ids: Optional[List[int]] = Field(None, max_length=1000)
+    max_id: Optional[int] = None
+
 class LeaveRequestBase(BaseModel):
     course_id: int
 
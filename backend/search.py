@@ -0,0 +1,125 @@
+"""Full-text search over courses, quizzes and bank questions.
+
+On SQLite each searchable table has an external-content FTS5 index
+(``courses_fts``, ``quizzes_fts``, ``question_bank_fts``). It stores only the
+inverted index and reads the text back from the source table. Triggers keep it
+in step with every INSERT, DELETE and UPDATE of an indexed column, whether the
+write comes from the ORM, Core executemany or a migration script. ``ensure``
+creates the tables and triggers at startup and fills them from existing rows.
+``rebuild`` (python backend/rebuild_search.py) re-indexes from scratch.
+
+Every search term is a prefix match, and all terms must match. Hits are
+ranked by bm25 with title-like columns weighted up, and come with a snippet
+whose matches are wrapped in HIGHLIGHT markers. On other backends, or SQLite
+builds without FTS5, the same calls fall back to LIKE scans.
+"""
+import re
+
+from sqlalchemy import and_, column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from backend import models
+
+HIGHLIGHT = ("<mark>", "</mark>")
+SNIPPET_TOKENS = 12
+MAX_TERMS = 8
+
+# name -> (model, {column: bm25 weight})
+INDEXES = {
+    "courses_fts": (models.Course, {"title": 10.0, "course_code": 8.0, "subject": 4.0, "description": 1.0}),
+    "quizzes_fts": (models.Quiz, {"title": 10.0, "description": 1.0}),
+    "question_bank_fts": (models.QuestionBankItem, {"text": 1.0}),
+}
+
+_ready = set()  # engine URLs whose FTS tables are in place
+
+
+def _schema(name):
+    model, weights = INDEXES[name]
+    source, columns = model.__tablename__, list(weights)
+    cols = ", ".join(columns)
+    new = ", ".join(f"new.{c}" for c in columns)
+    old = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {name} USING fts5({cols}, content='{source}', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER {name}_insert AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END",
+        f"CREATE TRIGGER {name}_delete AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); END",
+        # Only when an indexed column changes, not on every status or total_marks update
+        f"CREATE TRIGGER {name}_update AFTER UPDATE OF {cols} ON {source} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {cols}) VALUES ('delete', old.id, {old}); "
+        f"INSERT INTO {name}(rowid, {cols}) VALUES (new.id, {new}); END",
+    ]
+
+
+def _configure(conn, name):
+    # Stored rank function, so "ORDER BY rank" is answered inside FTS5 and only the top rows get joined
+    weights = ", ".join(str(weight) for weight in INDEXES[name][1].values())
+    conn.execute(text(f"INSERT INTO {name}({name}, rank) VALUES ('rank', 'bm25({weights})')"))
+
+
+def ensure(engine):
+    """Create any missing FTS table with its triggers and index the existing rows. No-op off SQLite."""
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.begin() as conn:
+        # SQLite built without FTS5: search uses LIKE scans
+        if not conn.execute(text("SELECT 1 FROM pragma_compile_options WHERE compile_options = 'ENABLE_FTS5'")).first():
+            return False
+        existing = set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+        for name in INDEXES:
+            if name in existing:
+                continue
+            for statement in _schema(name):
+                conn.execute(text(statement))
+            _configure(conn, name)
+            conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+    _ready.add(str(engine.url))
+    return True
+
+
+def rebuild(engine):
+    """Re-index every FTS table from its source table and merge its segments."""
+    ensure(engine)
+    with engine.begin() as conn:
+        for name in INDEXES:
+            _configure(conn, name)
+            conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+            conn.execute(text(f"INSERT INTO {name}({name}) VALUES ('optimize')"))
+
+
+def terms(query):
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def _match(words):
+    # Each word quoted, so FTS5 operators and punctuation in the input are taken literally
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search(db: Session, name, query, limit, *where, options=()):
+    """(row, snippet) pairs for the ``name`` index's model, best first, restricted by ``where``."""
+    model, weights = INDEXES[name]
+    words = terms(query)
+    if not words:
+        return []
+    if str(db.get_bind().url) in _ready:
+        fts = table(name, column("rowid"))
+        index = literal_column(name)
+        stmt = (
+            select(model, func.snippet(index, -1, *HIGHLIGHT, "…", SNIPPET_TOKENS))
+            .join_from(fts, model, model.id == fts.c.rowid)
+            .where(index.op("MATCH")(_match(words)), *where)
+            .order_by(literal_column(f"{name}.rank"))
+        )
+    else:
+        # No snippet without the index: the first column stands in for it
+        columns = [getattr(model, c) for c in weights]
+        stmt = (
+            select(model, columns[0])
+            .where(and_(*(or_(*(c.ilike(f"%{word}%") for c in columns)) for word in words)), *where)
+            .order_by(model.id)
+        )
+    return db.execute(stmt.options(*options).limit(limit)).all()
@@ -0,0 +1,59 @@
+"""Row-to-dict fast paths for hot list endpoints.
+
+Produce the same JSON shape as the Pydantic response models, but read ORM
+attributes directly instead of validating every row (and every nested
+course/student/quiz) again. Enabled with QUIZI_FAST_JSON=1, which also
+switches the app's default response class to ORJSONResponse.
+"""
+import os
+
+import orjson
+
+from backend import schemas
+
+FAST_JSON = os.getenv("QUIZI_FAST_JSON", "0") not in ("0", "false", "False", "")
+
+NESTED = {"course", "student", "quiz"}
+USER_FIELDS = tuple(schemas.UserResponse.model_fields)
+COURSE_FIELDS = tuple(f for f in schemas.CourseResponse.model_fields if f != "quiz_count")
+QUIZ_FIELDS = tuple(f for f in schemas.QuizResponse.model_fields if f not in NESTED)
+RESULT_FIELDS = tuple(f for f in schemas.ResultResponse.model_fields if f not in NESTED and f != "timeline")
+NOTIFICATION_FIELDS = tuple(schemas.NotificationResponse.model_fields)
+
+
+def user_to_dict(user):
+    if user is None:
+        return None
+    return {f: getattr(user, f) for f in USER_FIELDS}
+
+
+def course_to_dict(course):
+    if course is None:
+        return None
+    data = {f: getattr(course, f) for f in COURSE_FIELDS}
+    data["quiz_count"] = getattr(course, "quiz_count", 0)
+    return data
+
+
+def quiz_to_dict(quiz):
+    if quiz is None:
+        return None
+    data = {f: getattr(quiz, f) for f in QUIZ_FIELDS}
+    data["course"] = course_to_dict(quiz.course)
+    return data
+
+
+def result_to_dict(result):
+    data = {f: getattr(result, f) for f in RESULT_FIELDS}
+    data["timeline"] = result.loaded_timeline
+    data["student"] = user_to_dict(result.student)
+    data["quiz"] = quiz_to_dict(result.quiz)
+    return data
+
+
+def notification_to_dict(notif):
+    return {f: getattr(notif, f) for f in NOTIFICATION_FIELDS}
+
+
+def ndjson_line(data):
+    return orjson.dumps(data) + b"\n"
@@ -0,0 +1,347 @@
+"""Quiz submission grading, plus an optional write-behind ingestion queue.
+
+``grade_submission`` is the one place a ResultCreate payload becomes a graded
+Result (and the teacher's notification); both the synchronous route and the
+queue worker use it.
+
+With QUIZI_SUBMISSION_JOURNAL=<directory> set, POST /results instead appends
+the raw payload to an fsync'ed journal file in that directory and answers 202
+with a submission id straight away. A single worker thread drains the journal
+and grades and inserts submissions in batched transactions, so a deadline
+burst costs one SQLite write transaction per batch instead of one per student.
+The client polls GET /results/submissions/{id} for the graded result.
+
+A crash can't lose an acknowledged submission. Everything past the last
+checkpoint is replayed on startup. ``Result.submission_id`` is unique, so a
+batch that committed just before the crash is skipped rather than inserted
+twice.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, selectinload, undefer
+
+from backend import analytics, autosave, cache, database, grading, models, schemas
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = os.getenv("QUIZI_SUBMISSION_JOURNAL")
+BATCH_SIZE = int(os.getenv("QUIZI_SUBMISSION_BATCH", "200"))
+# Let a burst pile up briefly so it lands in one transaction
+LINGER_SECONDS = float(os.getenv("QUIZI_SUBMISSION_LINGER_MS", "50")) / 1000
+
+
+class SubmissionRejected(Exception):
+    def __init__(self, status_code, detail):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def claim_idempotency_key(db: Session, student_id: int, key: str):
+    """True if this is the first submission to use ``key``: one INSERT .. ON CONFLICT DO NOTHING."""
+    table = models.IdempotencyKey.__table__
+    insert = database.upsert_insert(db.get_bind())
+    if insert is not None:
+        stmt = (
+            insert(table)
+            .values(student_id=student_id, key=key)
+            .on_conflict_do_nothing(index_elements=["student_id", "key"])
+            .returning(table.c.id)
+        )
+        return db.execute(stmt).first() is not None
+    try:
+        with db.begin_nested():
+            db.execute(table.insert().values(student_id=student_id, key=key))
+        return True
+    except IntegrityError:
+        return False
+
+
+def take_attempt(db: Session, student_id: int, quiz_id: int, limit):
+    """Count one more attempt unless ``limit`` is already reached; the check and the increment are one statement."""
+    table = models.QuizAttemptCount.__table__
+    limited = limit is not None and limit > 0
+    insert = database.upsert_insert(db.get_bind())
+    if insert is not None:
+        stmt = insert(table).values(student_id=student_id, quiz_id=quiz_id, count=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["student_id", "quiz_id"],
+            set_={"count": table.c.count + 1},
+            where=(table.c.count < limit) if limited else None,
+        ).returning(table.c.count)
+        return db.execute(stmt).first() is not None
+    # Portable fallback: guarded increment, insert on first attempt
+    match = (table.c.student_id == student_id, table.c.quiz_id == quiz_id)
+    guard = (table.c.count < limit,) if limited else ()
+    if db.execute(update(table).where(*match, *guard).values(count=table.c.count + 1)).rowcount:
+        return True
+    if db.execute(select(table.c.count).where(*match)).first():
+        return False
+    db.execute(table.insert().values(student_id=student_id, quiz_id=quiz_id, count=1))
+    return True
+
+
+def previous_result(db: Session, student_id: int, key: str):
+    """The result an earlier request with the same Idempotency-Key produced."""
+    result_id = db.execute(
+        select(models.IdempotencyKey.result_id).where(models.IdempotencyKey.student_id == student_id, models.IdempotencyKey.key == key)
+    ).scalar()
+    if result_id is None:
+        raise SubmissionRejected(409, "A submission with this Idempotency-Key is still being processed")
+    # Loaded eagerly: the async route serializes it outside the session's greenlet
+    return db.execute(
+        select(models.Result)
+        .options(selectinload(models.Result.student), selectinload(models.Result.quiz).selectinload(models.Quiz.course), undefer(models.Result.timeline))
+        .where(models.Result.id == result_id)
+    ).scalar_one()
+
+
+def release_idempotency_key(db: Session, student_id: int, key):
+    """Drop a claimed key again, so a rejection the batch worker commits does not keep it."""
+    if key is not None:
+        db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.student_id == student_id, models.IdempotencyKey.key == key))
+
+
+def grade_submission(db: Session, student: models.User, payload: schemas.ResultCreate, submission_id=None, idempotency_key=None):
+    """Grade ``payload`` and add the Result and teacher notification to ``db``; the caller commits.
+
+    A repeated ``idempotency_key`` returns the result the first request created instead of a new one.
+    With ``attempt_id`` set the payload only needs to carry what was not autosaved yet; it is
+    merged onto the attempt's saved answers and timeline, and the attempt is closed.
+    """
+    quiz = db.get(models.Quiz, payload.quiz_id, options=[selectinload(models.Quiz.course)])
+    if not quiz:
+        raise SubmissionRejected(404, "Quiz not found")
+
+    # The attempt's seed tells us which questions this student was actually given
+    if payload.attempt_id is not None:
+        attempt = db.get(models.QuizAttempt, payload.attempt_id)
+        if not attempt or attempt.student_id != student.id or attempt.quiz_id != payload.quiz_id:
+            raise SubmissionRejected(400, "Invalid attempt")
+    else:
+        attempt = db.execute(
+            select(models.QuizAttempt)
+            .where(models.QuizAttempt.student_id == student.id, models.QuizAttempt.quiz_id == payload.quiz_id)
+            .order_by(models.QuizAttempt.id.desc())
+            .limit(1)
+        ).scalars().first()
+
+    # Retries claim the same key and get the original result back, without using up an attempt
+    if idempotency_key is not None and not claim_idempotency_key(db, student.id, idempotency_key):
+        return previous_result(db, student.id, idempotency_key)
+    if payload.attempt_id is not None and attempt.submitted_at is not None:
+        release_idempotency_key(db, student.id, idempotency_key)
+        raise SubmissionRejected(409, "Attempt already submitted")
+    if not take_attempt(db, student.id, quiz.id, quiz.attempts_count):
+        release_idempotency_key(db, student.id, idempotency_key)
+        raise SubmissionRejected(409, "Attempt limit reached for this quiz")
+
+    answers, timeline, violations = payload.answers, payload.timeline, payload.eye_tracking_violations
+    if payload.attempt_id is not None:
+        # The payload is only the tail no autosave has acknowledged yet
+        autosave.apply_delta(attempt, {"answers": payload.answers or {}, "timeline": autosave.sequence(payload.timeline), "fields": {}})
+        answers, timeline = attempt.answers, attempt.timeline
+        violations = max(violations, attempt.violations or 0)
+        attempt.submitted_at = datetime.now(timezone.utc)
+
+    # Server-side Grading Logic (description questions need manual grading, 0 points for now)
+    answer_key = grading.get_answer_key(db, payload.quiz_id)
+    selected = grading.selection_for_attempt(db, answer_key, attempt)
+    calculated_score = answer_key.score(answers, selected=selected)
+    calculated_total_marks = answer_key.total_for(selected) # Verify total marks dynamically
+    # Same transaction as the result, so the analytics never count a submission twice or miss one
+    analytics.record(db, payload.quiz_id, [analytics.contribution(answer_key, answers, None, selected, calculated_score, calculated_total_marks)])
+
+    new_result = models.Result(
+        score=calculated_score,
+        total_marks=calculated_total_marks,
+        eye_tracking_violations=violations,
+        timeline=timeline,
+        answers=answers,
+        student=student,
+        quiz=quiz,
+        attempt_id=attempt.id if attempt else None,
+        submission_id=submission_id,
+    )
+    db.add(new_result)
+    if idempotency_key is not None:
+        db.flush()
+        db.execute(
+            update(models.IdempotencyKey)
+            .where(models.IdempotencyKey.student_id == student.id, models.IdempotencyKey.key == idempotency_key)
+            .values(result_id=new_result.id)
+        )
+
+    # Notify Teacher of Submission (same transaction as the result)
+    db.add(models.Notification(
+        user_id=quiz.course.teacher_id,
+        title="New Quiz Submission",
+        message=f"Student {student.full_name} has submitted an attempt for quiz: {quiz.title}",
+        type="quiz"
+    ))
+    return new_result
+
+
+class SubmissionJournal:
+    """Append-only JSON-lines file with group-committed fsync and a consumer checkpoint."""
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "submissions.log")
+        self.checkpoint_path = os.path.join(directory, "submissions.offset")
+        self._file = open(self.path, "ab")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._written = self._synced = self._file.tell()
+        self.offset = min(self._read_checkpoint(), self._written)
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)["offset"]
+        except (OSError, ValueError, KeyError):
+            return 0
+
+    def append(self, entry):
+        line = json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self._written += len(line)
+            end = self._written
+        # Group commit: whoever holds the sync lock fsyncs everything written so far,
+        # so appenders queued behind it usually find their line already durable
+        with self._sync_lock:
+            if self._synced >= end:
+                return
+            target = self._written
+            os.fsync(self._file.fileno())
+            self._synced = target
+
+    def read(self, limit):
+        """Up to ``limit`` durable entries after the checkpoint, with the offset just past them."""
+        entries, offset = [], self.offset
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while len(entries) < limit and offset < self._synced:
+                line = f.readline()
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                entries.append(json.loads(line))
+        return entries, offset
+
+    def commit(self, offset):
+        """Mark everything before ``offset`` as processed; empties the file once fully drained."""
+        with self._lock, self._sync_lock:
+            if offset == self._written:
+                self._file.truncate(0)
+                self._file.seek(0)
+                self._written = self._synced = offset = 0
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"offset": offset}, f)
+        os.replace(tmp, self.checkpoint_path)
+        self.offset = offset
+
+
+class SubmissionQueue:
+    def __init__(self, journal: SubmissionJournal, batch_size=BATCH_SIZE, linger=LINGER_SECONDS):
+        self.journal = journal
+        self.batch_size = batch_size
+        self.linger = linger
+        # submission_id -> {"student_id", "status": queued|failed, "status_code", "detail"}
+        self.statuses = cache.TTLCache(maxsize=200_000, ttl=3600)
+        self._wake = threading.Event()
+        self._stopped = False
+        for entry in journal.read(float("inf"))[0]:
+            self.statuses.set(entry["submission_id"], {"student_id": entry["student_id"], "status": "queued"})
+        self._thread = threading.Thread(target=self._run, name="submission-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, student_id, payload: schemas.ResultCreate, idempotency_key=None):
+        if idempotency_key is None:
+            submission_id = uuid.uuid4().hex
+        else:
+            # A retry maps to the same submission, so polling either response finds the one result
+            submission_id = uuid.uuid5(uuid.NAMESPACE_URL, f"quizi:{student_id}:{idempotency_key}").hex
+            pending = self.statuses.get(submission_id)
+            if pending is not None and pending["status"] == "queued":
+                return submission_id
+        self.statuses.set(submission_id, {"student_id": student_id, "status": "queued"})
+        self.journal.append({"submission_id": submission_id, "student_id": student_id, "idempotency_key": idempotency_key, "payload": payload.model_dump()})
+        self._wake.set()
+        return submission_id
+
+    def status(self, submission_id):
+        return self.statuses.get(submission_id)
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(timeout=1)
+            self._wake.clear()
+            time.sleep(self.linger)
+            while True:
+                entries, offset = self.journal.read(self.batch_size)
+                if not entries:
+                    break
+                try:
+                    self._process(entries)
+                except Exception:
+                    logger.exception("Submission batch failed; retrying one by one")
+                    for entry in entries:
+                        try:
+                            self._process([entry])
+                        except Exception as exc:
+                            logger.exception("Submission %s failed", entry["submission_id"])
+                            self._fail(entry, 500, str(exc))
+                self.journal.commit(offset)
+
+    def _fail(self, entry, status_code, detail):
+        self.statuses.set(entry["submission_id"], {"student_id": entry["student_id"], "status": "failed", "status_code": status_code, "detail": detail})
+
+    def _process(self, entries):
+        """Grade and insert a batch of journal entries in one transaction."""
+        with database.SessionLocal() as db:
+            ids = [entry["submission_id"] for entry in entries]
+            # Replayed after a crash: already inserted by the batch that committed before it
+            done = set(db.execute(select(models.Result.submission_id).where(models.Result.submission_id.in_(ids))).scalars())
+            students = {u.id: u for u in db.execute(select(models.User).where(models.User.id.in_({e["student_id"] for e in entries}))).scalars()}
+            graded, failed = [], []
+            for entry in entries:
+                if entry["submission_id"] in done:
+                    graded.append(entry)
+                    continue
+                done.add(entry["submission_id"])
+                student = students.get(entry["student_id"])
+                if student is None:
+                    failed.append((entry, 401, "User not found"))
+                    continue
+                try:
+                    grade_submission(db, student, schemas.ResultCreate(**entry["payload"]), entry["submission_id"], entry.get("idempotency_key"))
+                    graded.append(entry)
+                except SubmissionRejected as exc:
+                    failed.append((entry, exc.status_code, exc.detail))
+            db.commit()
+        for entry in graded:
+            # The result row is now the source of truth for polling
+            self.statuses.pop(entry["submission_id"])
+        for entry, status_code, detail in failed:
+            self._fail(entry, status_code, detail)
+
+
+def queue_from_env():
+    return SubmissionQueue(SubmissionJournal(JOURNAL_DIR)) if JOURNAL_DIR else None
@@ -0,0 +1,51 @@
+import os
+import tempfile
+
+import pytest
+
+# The engines are built when backend.database is imported: point them at a scratch file first
+os.environ["QUIZI_DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from backend import database  # noqa: E402
+from backend.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app)
+
+
+def register(client, email, user_type):
+    client.post("/auth/register", json=dict(email=email, full_name=email, mobile="1", password="pw", user_type=user_type))
+    response = client.post("/auth/login", json=dict(email=email, password="pw"))
+    assert response.status_code == 200, response.text
+    return {"Authorization": "Bearer " + response.json()["access_token"]}
+
+
+class StatementCounter:
+    """Counts the SQL statements both engines send while active."""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        for engine in (database.engine, database.async_engine.sync_engine):
+            database.event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        for engine in (database.engine, database.async_engine.sync_engine):
+            database.event.remove(engine, "before_cursor_execute", self._record)
+
+    def __len__(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_statements():
+    return StatementCounter
@@ -0,0 +1,34 @@
+"""Students only get correct_option once they have no attempts left and the quiz has ended."""
+from datetime import datetime, timedelta, timezone
+
+from backend import database, models
+from backend.tests.conftest import register
+
+
+def test_answer_key_needs_used_attempts_and_ended_quiz(client):
+    teacher = register(client, "key-teacher@example.com", 1)
+    student = register(client, "key-student@example.com", 0)
+    course = dict(title="Key", course_code="KEY1", subject="s", semester="1", batch="b", description="d")
+    course_id = client.post("/courses", json=course, headers=teacher).json()["id"]
+    end = datetime.now(timezone.utc) + timedelta(hours=1)
+    quiz = dict(title="Key quiz", description="d", duration=10, passing_marks=1, total_marks=0, access_key="k", course_id=course_id, attempts_count=1, end_time=end.isoformat())
+    quiz_id = client.post("/quizzes", json=quiz, headers=teacher).json()["id"]
+    client.post(f"/quizzes/{quiz_id}/questions/bulk", json=[dict(text="q", option_a="1", option_b="2", correct_option="a")], headers=teacher)
+
+    def key_visible():
+        response = client.get(f"/quizzes/{quiz_id}/questions", headers=student)
+        assert response.status_code == 200, response.text
+        return any(q.get("correct_option") for q in response.json())
+
+    assert key_visible() is False
+    started = client.get(f"/quizzes/{quiz_id}/start?key=k", headers=student)
+    response = client.post("/results", json=dict(quiz_id=quiz_id, attempt_id=int(started.headers["X-Attempt-Id"])), headers=student)
+    assert response.status_code == 200, response.text
+
+    # Attempts used up, but classmates may still be answering
+    assert key_visible() is False
+
+    with database.SessionLocal() as db:
+        db.query(models.Quiz).filter_by(id=quiz_id).update({"end_time": datetime.now(timezone.utc) - timedelta(minutes=1)})
+        db.commit()
+    assert key_visible() is True
@@ -0,0 +1,67 @@
+"""The course list and detail routes run a fixed number of statements, however many rows they return."""
+import itertools
+
+import pytest
+
+from backend import database, models
+from backend.tests.conftest import register
+
+_codes = itertools.count()
+
+
+@pytest.fixture(scope="module")
+def users(client):
+    teacher = register(client, "queries-teacher@example.com", 1)
+    student = register(client, "queries-student@example.com", 0)
+    with database.SessionLocal() as db:
+        ids = dict(db.query(models.User.email, models.User.id).filter(models.User.email.like("queries-%")))
+    return {"teacher": teacher, "student": student, "teacher_id": ids["queries-teacher@example.com"], "student_id": ids["queries-student@example.com"]}
+
+
+def add_courses(users, n, quizzes_each=2):
+    with database.SessionLocal() as db:
+        for _ in range(n):
+            course = models.Course(title="c", course_code=f"QC{next(_codes)}", subject="s", semester="1", batch="b", description="d", teacher_id=users["teacher_id"])
+            db.add(course)
+            db.flush()
+            db.add_all(models.Quiz(title="q", description="d", duration=10, course_id=course.id) for _ in range(quizzes_each))
+            db.add(models.Enrollment(student_id=users["student_id"], course_id=course.id))
+        db.commit()
+        return course.id
+
+
+def statements_for(client, count_statements, url, headers=None):
+    client.get(url, headers=headers)  # warm the per-process caches (users, tokens)
+    with count_statements() as counter:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(counter), response.json()
+
+
+@pytest.mark.parametrize("url, role", [
+    ("/courses", None),
+    ("/courses/all", None),
+    ("/courses/my", "teacher"),
+    ("/courses/my", "student"),
+])
+def test_course_lists_run_constant_statements(client, count_statements, users, url, role):
+    headers = users[role] if role else None
+    add_courses(users, 3)
+    small, body = statements_for(client, count_statements, url, headers)
+    add_courses(users, 30)
+    large, more = statements_for(client, count_statements, url, headers)
+    assert len(more) >= len(body) + 30
+    # Other test modules share the database; check the courses this one added
+    assert all(course["quiz_count"] == 2 for course in more if course["course_code"].startswith("QC"))
+    assert small == large, f"{url}: {small} statements for {len(body)} courses, {large} for {len(more)}"
+
+
+def test_course_detail_runs_constant_statements(client, count_statements, users):
+    course_id = add_courses(users, 1, quizzes_each=1)
+    few, body = statements_for(client, count_statements, f"/courses/{course_id}")
+    with database.SessionLocal() as db:
+        db.add_all(models.Quiz(title="q", description="d", duration=10, course_id=course_id) for _ in range(40))
+        db.commit()
+    many, more = statements_for(client, count_statements, f"/courses/{course_id}")
+    assert (body["quiz_count"], more["quiz_count"]) == (1, 41)
+    assert few == many == 1
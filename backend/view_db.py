@@ -45,8 +45,10 @@ def view_data():
             models.Enrollment, 
             models.Quiz, 
             models.Question, 
+            models.QuestionBankItem, 
             models.Result, 
             models.Notification, 
+            models.NotificationCount, 
             models.LeaveRequest
         ]
 
@@ -37,6 +37,8 @@ import {
 import "./dashboard.css";
 import { useTheme } from "../context/ThemeContext";
 import toast from "react-hot-toast";
+import useNotificationStream from "./useNotificationStream";
+import { storeRefreshedToken } from "./authToken";
 
 // Helper Component for Bar Chart
 const BarChart = ({ data, labels, color }) => {
@@ -162,6 +164,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
     const saved = localStorage.getItem("student_activeQuizQuestions");
     return saved && saved !== "undefined" ? JSON.parse(saved) : null;
   });
+  const [activeAttemptId, setActiveAttemptId] = useState(() => localStorage.getItem("student_activeAttemptId"));
   const [resultData, setResultData] = useState(null);
   const [results, setResults] = useState([]);
   const [showEnrollModal, setShowEnrollModal] = useState(false);
@@ -169,9 +172,15 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
   const [enrollKey, setEnrollKey] = useState("");
   const fileInputRef = useRef(null);
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
+  const [notificationCursor, setNotificationCursor] = useState(null);
   const [showNotifications, setShowNotifications] = useState(false);
   const [fetchError, setFetchError] = useState(null);
   const notificationRef = useRef(null);
+  useNotificationStream((notif) => {
+    setNotifications(prev => prev.some(n => n.id === notif.id) ? prev : [notif, ...prev]);
+    if (!notif.is_read) setUnreadCount(prev => prev + 1);
+  });
   const [selectedCourseFilter, setSelectedCourseFilter] = useState('all');
   const [selectedQuizStatusFilter, setSelectedQuizStatusFilter] = useState('all');
   const [showOldPass, setShowOldPass] = useState(false);
@@ -221,6 +230,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
       });
 
       if (res.ok) {
+        storeRefreshedToken(res);
         const data = await res.json();
         setProfilePic(data.url);
         toast.success("Profile picture updated!");
@@ -245,6 +255,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
       });
 
       if (res.ok) {
+        storeRefreshedToken(res);
         setProfilePic(null);
         toast.success("Profile picture deleted!");
       } else {
@@ -286,16 +297,14 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
         const results = await Promise.all([
           fetch("http://127.0.0.1:8000/courses/all", { headers }),
           fetch("http://127.0.0.1:8000/courses/my", { headers }),
-          fetch("http://127.0.0.1:8000/results/my", { headers }),
-          fetch("http://127.0.0.1:8000/notifications", { headers })
+          fetch("http://127.0.0.1:8000/results/my", { headers })
         ]);
 
-        const [allRes, myRes, resultsRes, notifRes] = results;
+        const [allRes, myRes, resultsRes] = results;
         console.log("Student Dashboard Fetch Results:", {
           courses: allRes.status,
           myCourses: myRes.status,
-          results: resultsRes.status,
-          notifications: notifRes.status
+          results: resultsRes.status
         });
 
         if (!allRes.ok || !myRes.ok) {
@@ -312,12 +321,6 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
           console.warn("Results Fetch Failed:", resultsRes.status);
         }
 
-        if (notifRes.ok) {
-          setNotifications(await notifRes.json());
-        } else {
-          console.warn("Notifications Fetch Failed:", notifRes.status);
-        }
-
         setFetchError(null);
       } catch (err) {
         console.error("Student Dashboard Data Fetch Failure:", err);
@@ -326,7 +329,29 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
         setLoading(false);
       }
     };
+    // The inbox is fetched once; new notifications are pushed through useNotificationStream
+    const fetchNotifications = async () => {
+      try {
+        const headers = { "Authorization": `Bearer ${localStorage.getItem("token")}` };
+        const [notifRes, unreadRes] = await Promise.all([
+          fetch("http://127.0.0.1:8000/notifications", { headers }),
+          fetch("http://127.0.0.1:8000/notifications/unread-count", { headers })
+        ]);
+        if (notifRes.ok) {
+          setNotifications(await notifRes.json());
+          setNotificationCursor(notifRes.headers.get("X-Next-Cursor"));
+        } else {
+          console.warn("Notifications Fetch Failed:", notifRes.status);
+        }
+        if (unreadRes.ok) {
+          setUnreadCount((await unreadRes.json()).unread);
+        }
+      } catch (err) {
+        console.error("Notifications Fetch Failure:", err);
+      }
+    };
     fetchData();
+    fetchNotifications();
 
     // POLLING: Refresh data every 30 seconds
     const interval = setInterval(fetchData, 30000);
@@ -348,6 +373,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
   const handleLogout = () => {
     localStorage.removeItem("student_selectedQuiz");
     localStorage.removeItem("student_activeQuizQuestions");
+    localStorage.removeItem("student_activeAttemptId");
     onLogout();
   };
 
@@ -363,17 +389,56 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
     localStorage.setItem("student_activeQuizQuestions", JSON.stringify(activeQuizQuestions));
   }, [activeQuizQuestions]);
 
+  useEffect(() => {
+    if (activeAttemptId) localStorage.setItem("student_activeAttemptId", activeAttemptId);
+    else localStorage.removeItem("student_activeAttemptId");
+  }, [activeAttemptId]);
+
   const handleMarkAsRead = async (id) => {
     try {
       const token = localStorage.getItem("token");
-      await fetch(`http://127.0.0.1:8000/notifications/${id}/read`, {
+      const res = await fetch(`http://127.0.0.1:8000/notifications/${id}/read`, {
         method: "POST",
         headers: { "Authorization": `Bearer ${token}` }
       });
+      if (res.ok && notifications.some(n => n.id === id && !n.is_read)) {
+        setUnreadCount(prev => Math.max(prev - 1, 0));
+      }
       setNotifications(prev => prev.map(n => n.id === id ? { ...n, is_read: true } : n));
     } catch (err) { console.error(err); }
   };
 
+  const handleMarkAllAsRead = async () => {
+    if (notifications.length === 0) return;
+    try {
+      const token = localStorage.getItem("token");
+      // Up to the newest one shown, so anything arriving meanwhile stays unread
+      const res = await fetch("http://127.0.0.1:8000/notifications/read", {
+        method: "POST",
+        headers: { "Authorization": `Bearer ${token}`, "Content-Type": "application/json" },
+        body: JSON.stringify({ max_id: notifications[0].id })
+      });
+      if (res.ok) {
+        setUnreadCount((await res.json()).unread);
+        setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
+      }
+    } catch (err) { console.error(err); }
+  };
+
+  const handleLoadOlderNotifications = async () => {
+    try {
+      const token = localStorage.getItem("token");
+      const res = await fetch(`http://127.0.0.1:8000/notifications?before=${notificationCursor}`, {
+        headers: { "Authorization": `Bearer ${token}` }
+      });
+      if (res.ok) {
+        const older = await res.json();
+        setNotifications(prev => [...prev, ...older]);
+        setNotificationCursor(res.headers.get("X-Next-Cursor"));
+      }
+    } catch (err) { console.error(err); }
+  };
+
   const handleDeleteNotification = async (id) => {
     try {
       const token = localStorage.getItem("token");
@@ -382,6 +447,9 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
         headers: { "Authorization": `Bearer ${token}` }
       });
       if (res.ok) {
+        if (notifications.some(n => n.id === id && !n.is_read)) {
+          setUnreadCount(prev => Math.max(prev - 1, 0));
+        }
         setNotifications(prev => prev.filter(n => n.id !== id));
       }
     } catch (err) { console.error(err); }
@@ -404,6 +472,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
 
         if (startRes.ok) {
           const questions = await startRes.json();
+          setActiveAttemptId(startRes.headers.get("X-Attempt-Id"));
           setActiveQuizQuestions(questions);
           setShowKeyModal(false);
           setActiveTab("quiz-session");
@@ -562,9 +631,11 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
                   className="p-3 btn-secondary rounded-xl relative"
                   onClick={() => setShowNotifications(!showNotifications)}
                 >
-                  <Bell size={20} className={notifications.some(n => !n.is_read) ? "text-indigo-500" : "text-white"} />
-                  {notifications.some(n => !n.is_read) && (
-                    <span className="absolute top-2 right-2 w-2.5 h-2.5 bg-red-500 rounded-full border-2 border-white dark:border-slate-900 animate-pulse"></span>
+                  <Bell size={20} className={unreadCount > 0 ? "text-indigo-500" : "text-white"} />
+                  {unreadCount > 0 && (
+                    <span className="absolute -top-1 -right-1 min-w-[1.25rem] h-5 px-1 bg-red-500 text-white text-[10px] font-bold rounded-full border-2 border-white dark:border-slate-900 flex items-center justify-center">
+                      {unreadCount > 99 ? "99+" : unreadCount}
+                    </span>
                   )}
                 </button>
 
@@ -572,7 +643,12 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
                   <div ref={notificationRef} className="absolute right-0 mt-3 w-80 dropdown-card rounded-2xl z-[300] overflow-hidden">
                     <div className="p-4 border-b border-slate-200 dark:border-slate-800 flex justify-between items-center bg-slate-50 dark:bg-slate-800/50">
                       <h3 className="font-bold text-slate-900 dark:text-white">Notifications</h3>
-                      <button className="text-xs text-indigo-500 hover:underline" onClick={() => setShowNotifications(false)}>Close</button>
+                      <div className="flex gap-3">
+                        {unreadCount > 0 && (
+                          <button className="text-xs text-indigo-500 hover:underline" onClick={handleMarkAllAsRead}>Mark all read</button>
+                        )}
+                        <button className="text-xs text-indigo-500 hover:underline" onClick={() => setShowNotifications(false)}>Close</button>
+                      </div>
                     </div>
                     <div className="max-h-96 overflow-y-auto">
                       {notifications.length > 0 ? notifications.map(n => (
@@ -607,6 +683,9 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
                       )) : (
                         <div className="p-8 text-center text-slate-500 text-sm">No new notifications</div>
                       )}
+                      {notificationCursor && (
+                        <button className="w-full p-3 text-xs text-indigo-500 hover:underline" onClick={handleLoadOlderNotifications}>Load older</button>
+                      )}
                     </div>
                   </div>
                 )}
@@ -1012,7 +1091,9 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
             <QuizSession
               quiz={selectedQuiz}
               questions={activeQuizQuestions}
+              attemptId={activeAttemptId}
               onFinish={(result) => {
+                setActiveAttemptId(null);
                 setResultData(result);
                 setActiveTab("quiz-result");
               }}
@@ -1079,6 +1160,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
                         body: JSON.stringify(cleanUpdates)
                       });
                       if (res.ok) {
+                        storeRefreshedToken(res);
                         toast.success("Profile updated successfully!");
                       } else {
                         const err = await res.json();
@@ -1186,6 +1268,7 @@ export default function StudentDashboard({ studentData = {}, onLogout }) {
                           body: JSON.stringify(data)
                         });
                         if (res.ok) {
+                          storeRefreshedToken(res);
                           toast.success("Password updated successfully!");
                           e.target.reset();
                           setPassNew("");
@@ -1594,7 +1677,10 @@ function AttemptHistory({ results }) {
 
   useEffect(() => {
     if (selectedQuiz) {
-      fetch(`http://127.0.0.1:8000/quizzes/${selectedQuiz}/questions`)
+      // Authenticated so the server includes answer keys for quizzes we have submitted
+      fetch(`http://127.0.0.1:8000/quizzes/${selectedQuiz}/questions`, {
+        headers: { Authorization: `Bearer ${localStorage.getItem('token')}` }
+      })
         .then(res => res.json())
         .then(data => setQuizDetails(data));
     } else {
@@ -1785,9 +1871,16 @@ function AttemptHistory({ results }) {
   );
 }
 
-function QuizSession({ quiz, questions, onFinish }) {
+function QuizSession({ quiz, questions, attemptId, onFinish }) {
   const storageKey = `quiz_progress_${quiz.id}`;
 
+  // One Idempotency-Key per attempt, kept across reloads, so a retried or double submit is saved once
+  const submissionKey = useRef(null);
+  if (!submissionKey.current) {
+    submissionKey.current = localStorage.getItem(`${storageKey}_submission_key`) || crypto.randomUUID();
+    localStorage.setItem(`${storageKey}_submission_key`, submissionKey.current);
+  }
+
   // Multi-tab Prevention
   const [isMultiTab, setIsMultiTab] = useState(false);
 
@@ -1817,6 +1910,14 @@ function QuizSession({ quiz, questions, onFinish }) {
   const answersRef = useRef({});
   const timelineRef = useRef([]);
   const timeLeftRef = useRef(quiz.duration * 60);
+  const currentIndexRef = useRef(initialState.currentIndex);
+
+  // Server autosave: what the last successful PATCH /attempts/{id} already holds
+  const syncedAnswersRef = useRef({});
+  const syncedTimelineRef = useRef(0);
+  // Events the server held when this page loaded; the local timeline starts after them (null until known)
+  const timelineBaseRef = useRef(null);
+  const autosaveRef = useRef(null);
 
   const videoRef = useRef(null);
   const canvasRef = useRef(null);
@@ -1836,6 +1937,7 @@ function QuizSession({ quiz, questions, onFinish }) {
   useEffect(() => { alertsRef.current = violations; }, [violations]);
   useEffect(() => { timelineRef.current = violationTimeline; }, [violationTimeline]);
   useEffect(() => { timeLeftRef.current = timeLeft; }, [timeLeft]);
+  useEffect(() => { currentIndexRef.current = currentIndex; }, [currentIndex]);
 
   // Camera Access & Models Loading
   useEffect(() => {
@@ -1920,6 +2022,77 @@ function QuizSession({ quiz, questions, onFinish }) {
     localStorage.setItem(storageKey, JSON.stringify(state));
   }, [currentIndex, answers, violations, timeLeft]);
 
+  // Only what changed since the last server save: edited answers (null = cleared) and new timeline events
+  const unsavedChanges = () => {
+    const changed = {};
+    const current = answersRef.current;
+    const synced = syncedAnswersRef.current;
+    Object.keys(current).forEach(id => { if (current[id] !== synced[id]) changed[id] = current[id]; });
+    Object.keys(synced).forEach(id => { if (!(id in current)) changed[id] = null; });
+    return { answers: changed, timeline: timelineRef.current.slice(syncedTimelineRef.current) };
+  };
+
+  const saveToServer = async () => {
+    const { answers: changed, timeline } = unsavedChanges();
+    // Where these events go in the server's timeline, so a retried PATCH doesn't add them twice
+    const timelineStart = timelineBaseRef.current == null ? null : timelineBaseRef.current + syncedTimelineRef.current;
+    const answersSnapshot = answersRef.current;
+    const timelineLength = timelineRef.current.length;
+    const res = await fetch(`http://127.0.0.1:8000/attempts/${attemptId}`, {
+      method: "PATCH",
+      headers: {
+        "Content-Type": "application/json",
+        "Authorization": `Bearer ${localStorage.getItem("token")}`
+      },
+      body: JSON.stringify({
+        answers: changed,
+        timeline,
+        timeline_start: timelineStart,
+        current_index: currentIndexRef.current,
+        violations: alertsRef.current,
+        time_left: timeLeftRef.current
+      })
+    });
+    if (res.ok) {
+      syncedAnswersRef.current = answersSnapshot;
+      syncedTimelineRef.current = timelineLength;
+    }
+  };
+
+  // Server Auto-save: periodic deltas, so an attempt survives a lost browser and submit stays small
+  useEffect(() => {
+    if (!attemptId) return;
+    const interval = setInterval(() => {
+      if (autosaveRef.current) return;
+      autosaveRef.current = saveToServer()
+        .catch(err => console.error("Autosave failed", err))
+        .finally(() => { autosaveRef.current = null; });
+    }, 5000);
+    return () => clearInterval(interval);
+  }, [attemptId]);
+
+  // Learn how far the server's timeline goes, and resume from it when this browser has no local copy of the attempt
+  useEffect(() => {
+    if (!attemptId) return;
+    const hasLocalCopy = Boolean(localStorage.getItem(storageKey));
+    fetch(`http://127.0.0.1:8000/attempts/${attemptId}`, {
+      headers: { "Authorization": `Bearer ${localStorage.getItem("token")}` }
+    })
+      .then(res => res.ok ? res.json() : null)
+      .then(saved => {
+        if (!saved || saved.submitted_at) return;
+        timelineBaseRef.current = saved.timeline.length - syncedTimelineRef.current;
+        if (hasLocalCopy) return;
+        syncedAnswersRef.current = saved.answers;
+        answersRef.current = saved.answers;
+        setAnswers(saved.answers);
+        setCurrentIndex(saved.current_index);
+        setViolations(saved.violations);
+        if (saved.time_left != null) setTimeLeft(saved.time_left);
+      })
+      .catch(err => console.error("Resume failed", err));
+  }, [attemptId]);
+
   const startTracking = () => {
     trackingIntervalRef.current = setInterval(async () => {
       if (videoRef.current && videoRef.current.readyState === 4) {
@@ -2121,11 +2294,26 @@ function QuizSession({ quiz, questions, onFinish }) {
       timeline: finalTimeline,
       answers: currentAnswers // Include answers so they are saved in DB
     };
+    let payload = result;
+    if (attemptId) {
+      // The server already has the autosaved attempt: send only the unsaved tail as the commit marker
+      if (autosaveRef.current) await autosaveRef.current;
+      timelineRef.current = finalTimeline;
+      const unsaved = unsavedChanges();
+      payload = {
+        quiz_id: quiz.id,
+        attempt_id: Number(attemptId),
+        eye_tracking_violations: currentViolations,
+        answers: unsaved.answers,
+        timeline: unsaved.timeline
+      };
+    }
 
     console.log("Submitting Result:", result);
 
     try {
       localStorage.removeItem(storageKey); // Clear auto-save on finish
+      localStorage.removeItem(`${storageKey}_submission_key`);
       if (videoRef.current && videoRef.current.srcObject) {
         videoRef.current.srcObject.getTracks().forEach(t => t.stop());
       }
@@ -2138,11 +2326,25 @@ function QuizSession({ quiz, questions, onFinish }) {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
-          "Authorization": `Bearer ${token}`
+          "Authorization": `Bearer ${token}`,
+          "Idempotency-Key": submissionKey.current
         },
-        body: JSON.stringify(result)
+        body: JSON.stringify(payload)
       });
-      if (res.ok) {
+      if (res.status === 202) {
+        // Queued by the server's submission journal: poll until it has been graded
+        const { submission_id } = await res.json();
+        let savedResult = null;
+        for (let i = 0; i < 30 && !savedResult; i++) {
+          await new Promise(resolve => setTimeout(resolve, 1000));
+          const poll = await fetch(`http://127.0.0.1:8000/results/submissions/${submission_id}`, {
+            headers: { "Authorization": `Bearer ${token}` }
+          });
+          if (poll.status === 200) savedResult = await poll.json();
+          else if (poll.status !== 202) break;
+        }
+        onFinish(savedResult || { ...result, total_score: result.total_marks });
+      } else if (res.ok) {
         const savedResult = await res.json();
         onFinish(savedResult);
       } else {
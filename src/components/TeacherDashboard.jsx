@@ -40,6 +40,16 @@ import {
 import "./dashboard.css";
 import { useTheme } from "../context/ThemeContext";
 import toast from "react-hot-toast";
+import useNotificationStream from "./useNotificationStream";
+import { storeRefreshedToken } from "./authToken";
+
+// datetime-local inputs hold local wall time; the API speaks UTC
+const toLocalInput = (value) => {
+  if (!value) return "";
+  const date = new Date(value);
+  return new Date(date.getTime() - date.getTimezoneOffset() * 60000).toISOString().slice(0, 16);
+};
+const toUtcIso = (value) => (value ? new Date(value).toISOString() : null);
 
 // Helper Component for Bar Chart
 // Helper Component for Bar Chart
@@ -201,6 +211,24 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
   });
   const [editingQuestion, setEditingQuestion] = useState(null);
   const [expandedResultId, setExpandedResultId] = useState(null);
+  const [resultTimelines, setResultTimelines] = useState({});
+
+  // Result lists come without timelines; load one when its row is expanded
+  const loadResultTimeline = async (resultId) => {
+    if (resultTimelines[resultId]) return;
+    try {
+      const token = localStorage.getItem("token");
+      const res = await fetch(`http://127.0.0.1:8000/results/${resultId}/timeline`, {
+        headers: { "Authorization": `Bearer ${token}` }
+      });
+      if (res.ok) {
+        const timeline = await res.json();
+        setResultTimelines(prev => ({ ...prev, [resultId]: timeline }));
+      }
+    } catch (err) {
+      console.error("Failed to load timeline", err);
+    }
+  };
 
   const [newCourse, setNewCourse] = useState({
     title: "",
@@ -215,12 +243,15 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
   const [courseQuizzes, setCourseQuizzes] = useState([]);
   const [allQuizzes, setAllQuizzes] = useState([]);
   const [quizSearchQuery, setQuizSearchQuery] = useState("");
+  const [quizSearchHits, setQuizSearchHits] = useState(null); // ranked /search/quizzes results, null when not searching
   const [myStudents, setMyStudents] = useState([]);
   const [studentCourseFilter, setStudentCourseFilter] = useState('all');
   const [quizCourseFilter, setQuizCourseFilter] = useState('all');
   const [allResults, setAllResults] = useState([]);
   const [refreshKey, setRefreshKey] = useState(0);
   const [notifications, setNotifications] = useState([]);
+  const [unreadCount, setUnreadCount] = useState(0);
+  const [notificationCursor, setNotificationCursor] = useState(null);
   const [showNotifications, setShowNotifications] = useState(false);
   const { theme, toggleTheme } = useTheme();
   const [bulkType, setBulkType] = useState(localStorage.getItem("teacher_bulkType") || 'mcq');
@@ -268,6 +299,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
       });
 
       if (res.ok) {
+        storeRefreshedToken(res);
         const data = await res.json();
         setProfilePic(data.url);
         toast.success("Profile picture updated!");
@@ -292,6 +324,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
       });
 
       if (res.ok) {
+        storeRefreshedToken(res);
         setProfilePic(null);
         toast.success("Profile picture deleted!");
       } else {
@@ -375,6 +408,32 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
   useEffect(() => {
     localStorage.setItem("teacher_bulkType", bulkType);
   }, [bulkType]);
+
+  // Server-side full-text search, debounced while typing
+  useEffect(() => {
+    const query = quizSearchQuery.trim();
+    if (!query) {
+      setQuizSearchHits(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const token = localStorage.getItem("token");
+        const res = await fetch(`http://127.0.0.1:8000/search/quizzes?q=${encodeURIComponent(query)}&limit=100`, {
+          headers: { "Authorization": `Bearer ${token}` }
+        });
+        if (res.ok) setQuizSearchHits(await res.json());
+      } catch (err) { console.error(err); }
+    }, 250);
+    return () => clearTimeout(timer);
+  }, [quizSearchQuery, refreshKey]);
+
+  // Search snippets wrap matches in <mark></mark>; render them as elements, never as HTML
+  const renderSnippet = (snippet) => snippet.split(/(<mark>.*?<\/mark>)/).map((part, i) =>
+    part.startsWith("<mark>")
+      ? <mark key={i} className="bg-indigo-500/20 text-inherit rounded px-0.5">{part.slice(6, -7)}</mark>
+      : <React.Fragment key={i}>{part}</React.Fragment>
+  );
   // Result Review and Grading
   const [selectedAttempt, setSelectedAttempt] = useState(null);
   const [showGradingModal, setShowGradingModal] = useState(false);
@@ -420,11 +479,35 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
   const fetchNotifications = async () => {
     try {
       const token = localStorage.getItem("token");
-      const res = await fetch("http://127.0.0.1:8000/notifications", {
-        headers: { "Authorization": `Bearer ${token}` }
-      });
+      const headers = { "Authorization": `Bearer ${token}` };
+      const [res, unreadRes] = await Promise.all([
+        fetch("http://127.0.0.1:8000/notifications", { headers }),
+        fetch("http://127.0.0.1:8000/notifications/unread-count", { headers })
+      ]);
       const data = await res.json();
       setNotifications(data);
+      setNotificationCursor(res.headers.get("X-Next-Cursor"));
+      if (unreadRes.ok) setUnreadCount((await unreadRes.json()).unread);
+    } catch (err) { console.error(err); }
+  };
+
+  // New notifications are pushed; the inbox is only fetched on load
+  useNotificationStream((notif) => {
+    setNotifications(prev => prev.some(n => n.id === notif.id) ? prev : [notif, ...prev]);
+    if (!notif.is_read) setUnreadCount(prev => prev + 1);
+  });
+
+  const handleLoadOlderNotifications = async () => {
+    try {
+      const token = localStorage.getItem("token");
+      const res = await fetch(`http://127.0.0.1:8000/notifications?before=${notificationCursor}`, {
+        headers: { "Authorization": `Bearer ${token}` }
+      });
+      if (res.ok) {
+        const older = await res.json();
+        setNotifications(prev => [...prev, ...older]);
+        setNotificationCursor(res.headers.get("X-Next-Cursor"));
+      }
     } catch (err) { console.error(err); }
   };
 
@@ -449,7 +532,6 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
     // POLLING: Every 30 seconds
     const interval = setInterval(() => {
       fetchMyCourses();
-      fetchNotifications();
       fetchAllQuizzes();
       fetchAllResults();
       fetchMyStudents();
@@ -488,10 +570,17 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
   const fetchAllResults = async () => {
     try {
       const token = localStorage.getItem("token");
-      const res = await fetch("http://127.0.0.1:8000/results/teacher/all", {
-        headers: { "Authorization": `Bearer ${token}` }
-      });
-      const data = await res.json();
+      // Results are paginated; follow X-Next-Cursor until the last page
+      let data = [];
+      let cursor = null;
+      do {
+        const res = await fetch(`http://127.0.0.1:8000/results/teacher/all${cursor ? `?cursor=${cursor}` : ""}`, {
+          headers: { "Authorization": `Bearer ${token}` }
+        });
+        if (!res.ok) break;
+        data = data.concat(await res.json());
+        cursor = res.headers.get("X-Next-Cursor");
+      } while (cursor);
       setAllResults(data);
     } catch (err) { console.error(err); }
   };
@@ -509,14 +598,34 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
   const handleMarkAsRead = async (id) => {
     try {
       const token = localStorage.getItem("token");
-      await fetch(`http://127.0.0.1:8000/notifications/${id}/read`, {
+      const res = await fetch(`http://127.0.0.1:8000/notifications/${id}/read`, {
         method: "POST",
         headers: { "Authorization": `Bearer ${token}` }
       });
+      if (res.ok && notifications.some(n => n.id === id && !n.is_read)) {
+        setUnreadCount(prev => Math.max(prev - 1, 0));
+      }
       setNotifications(prev => prev.map(n => n.id === id ? { ...n, is_read: true } : n));
     } catch (err) { console.error(err); }
   };
 
+  const handleMarkAllAsRead = async () => {
+    if (notifications.length === 0) return;
+    try {
+      const token = localStorage.getItem("token");
+      // Up to the newest one shown, so anything arriving meanwhile stays unread
+      const res = await fetch("http://127.0.0.1:8000/notifications/read", {
+        method: "POST",
+        headers: { "Authorization": `Bearer ${token}`, "Content-Type": "application/json" },
+        body: JSON.stringify({ max_id: notifications[0].id })
+      });
+      if (res.ok) {
+        setUnreadCount((await res.json()).unread);
+        setNotifications(prev => prev.map(n => ({ ...n, is_read: true })));
+      }
+    } catch (err) { console.error(err); }
+  };
+
   const handleDeleteNotification = async (id) => {
     try {
       const token = localStorage.getItem("token");
@@ -525,6 +634,9 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
         headers: { "Authorization": `Bearer ${token}` }
       });
       if (res.ok) {
+        if (notifications.some(n => n.id === id && !n.is_read)) {
+          setUnreadCount(prev => Math.max(prev - 1, 0));
+        }
         setNotifications(prev => prev.filter(n => n.id !== id));
       }
     } catch (err) { console.error(err); }
@@ -613,8 +725,14 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
     if (!selectedCourse) return;
     try {
       const token = localStorage.getItem("token");
-      const quizData = { ...newQuiz, course_id: selectedCourse.id };
-      // Clean up empty strings for optional fields
+      const quizData = {
+        ...newQuiz,
+        course_id: selectedCourse.id,
+        start_time: toUtcIso(newQuiz.start_time),
+        end_time: toUtcIso(newQuiz.end_time),
+        deadline: toUtcIso(newQuiz.deadline),
+      };
+      // Clean up empty values for optional fields
       if (!quizData.deadline) delete quizData.deadline;
       if (!quizData.start_time) delete quizData.start_time;
       if (!quizData.end_time) delete quizData.end_time;
@@ -683,9 +801,9 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
     // Format dates for backend
     const formattedQuiz = {
       ...editingQuiz,
-      start_time: new Date(editingQuiz.start_time).toISOString(),
-      end_time: new Date(editingQuiz.end_time).toISOString(),
-      deadline: editingQuiz.deadline ? new Date(editingQuiz.deadline).toISOString() : null,
+      start_time: toUtcIso(editingQuiz.start_time),
+      end_time: toUtcIso(editingQuiz.end_time),
+      deadline: toUtcIso(editingQuiz.deadline),
     };
     // Clean legacy fields
     delete formattedQuiz.max_questions;
@@ -1037,123 +1155,58 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
     const file = e.target.files[0];
     if (!file) return;
 
-    const reader = new FileReader();
-    reader.onload = async (event) => {
-      try {
-        const text = event.target.result;
-        const lines = text.split(/\r?\n/);
-        const questions = [];
-
-        for (let i = 0; i < lines.length; i++) {
-          const line = lines[i].trim();
-          if (!line) continue;
-
-          // Split by | trimming each part
-          const parts = line.split('|').map(p => p.trim());
-
-          if (bulkType === 'true_false') {
-            if (parts.length < 3) {
-              console.warn(`Skipping T/F line ${i + 1}: Insufficient parts`, line);
-              continue;
-            }
-            let correct = parts[1].toLowerCase();
-            if (correct === 'true' || correct === 't') correct = 'a';
-            else if (correct === 'false' || correct === 'f') correct = 'b';
-            else correct = 'a'; // default
-
-            questions.push({
-              text: parts[0],
-              question_type: 'true_false',
-              option_a: 'True',
-              option_b: 'False',
-              option_c: '',
-              option_d: '',
-              correct_option: correct,
-              point_value: parseInt(parts[2]) || 1
-            });
-
-          } else if (bulkType === 'description') {
-            if (parts.length < 2) {
-              console.warn(`Skipping Desc line ${i + 1}: Insufficient parts`, line);
-              continue;
-            }
-            questions.push({
-              text: parts[0],
-              question_type: 'description',
-              option_a: '',
-              option_b: '',
-              option_c: '',
-              option_d: '',
-              correct_option: '',
-              point_value: parseInt(parts[1]) || 1
-            });
-
-          } else {
-            // MCQ (Default, matches 'mcq')
-            if (parts.length < 6) {
-              console.warn(`Skipping MCQ line ${i + 1} due to insufficient parts:`, line);
-              continue;
-            }
-            questions.push({
-              text: parts[0],
-              question_type: 'mcq',
-              option_a: parts[1],
-              option_b: parts[2],
-              option_c: parts[3],
-              option_d: parts[4],
-              correct_option: (parts[5] || 'a').toString().toLowerCase(),
-              point_value: parseInt(parts[6]) || 1
-            });
-          }
-        }
-        console.log("Parsed questions from TXT (" + bulkType + "):", questions);
+    if (!selectedQuiz || !selectedQuiz.id) {
+      toast.error("Error: No quiz selected. Please select a quiz before uploading.");
+      return;
+    }
 
-        if (questions.length === 0) {
-          let format = "Question | A | B | C | D | CorrectLetter | Points";
-          if (bulkType === 'true_false') format = "Question | True/False | Points";
-          if (bulkType === 'description') format = "Question | Points";
+    // Parsed and validated on the server, line by line, so large banks never load into the page
+    try {
+      const token = localStorage.getItem("token");
+      const formData = new FormData();
+      formData.append("file", file);
+      const url = `http://127.0.0.1:8000/quizzes/${selectedQuiz.id}/questions/import?format=${bulkType}`;
+      console.log("Bulk Upload Start:", { url, size: file.size, bulkType });
 
-          toast.error(`UPLOAD FAILED: No valid questions found.\n\nYou selected '${bulkType.toUpperCase()}' format. Ensure your file matches this format:\n\n${format}`);
-          return;
-        }
+      const res = await fetch(url, {
+        method: "POST",
+        headers: { "Authorization": `Bearer ${token}` },
+        body: formData
+      });
 
-        if (!selectedQuiz || !selectedQuiz.id) {
-          toast.error("Error: No quiz selected. Please select a quiz before uploading.");
+      if (res.ok) {
+        const data = await res.json();
+        if (data.imported === 0 && !data.duplicates) {
+          toast.error("UPLOAD FAILED: No questions found in the file.");
           return;
         }
-
-        const token = localStorage.getItem("token");
-        const url = `http://127.0.0.1:8000/quizzes/${selectedQuiz.id}/questions/bulk`;
-        console.log("Bulk Upload Start:", { url, count: questions.length, bulkType });
-
-        const res = await fetch(url, {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            "Authorization": `Bearer ${token}`
-          },
-          body: JSON.stringify(questions)
-        });
-
-        if (res.ok) {
-          toast.success(`SUCCESS: Uploaded ${questions.length} questions successfully!`);
-          setRefreshKey(prev => prev + 1);
-        } else {
-          let errorDetail = "";
-          try {
-            const error = await res.json();
+        const skipped = data.duplicates ? ` (${data.duplicates} already in this quiz were skipped)` : "";
+        toast.success(`SUCCESS: Uploaded ${data.imported} questions successfully!${skipped}`);
+        setRefreshKey(prev => prev + 1);
+      } else {
+        let errorDetail = "";
+        try {
+          const error = await res.json();
+          if (error.detail && error.detail.errors) {
+            let format = "Question | A | B | C | D | CorrectLetter | Points";
+            if (bulkType === 'true_false') format = "Question | True/False | Points";
+            if (bulkType === 'description') format = "Question | Points";
+            const lines = error.detail.errors.slice(0, 5).map(err => `Line ${err.line}: ${err.error}`).join("\n");
+            errorDetail = `${error.detail.message}\n${lines}\n\nYou selected '${bulkType.toUpperCase()}' format:\n${format}`;
+          } else {
             errorDetail = Array.isArray(error.detail) ? error.detail.map(d => d.msg).join(", ") : error.detail;
-          } catch (e) {
-            errorDetail = await res.text() || "Unknown server error (non-JSON response)";
           }
-          toast.error(`UPLOAD FAILED (Status ${res.status}):\n${errorDetail}`);
+        } catch (e) {
+          errorDetail = await res.text() || "Unknown server error (non-JSON response)";
         }
-      } catch (err) {
-        console.error("Upload process error:", err);
-        toast.error(`NETWORK ERROR: Failed to connect to server.\n\nDetails: ${err.message}\n\nPlease ensure the backend is running at http://127.0.0.1:8000`);
+        toast.error(`UPLOAD FAILED (Status ${res.status}):\n${errorDetail}`);
       }
-    };
-    reader.readAsText(file);
+    } catch (err) {
+      console.error("Upload process error:", err);
+      toast.error(`NETWORK ERROR: Failed to connect to server.\n\nDetails: ${err.message}\n\nPlease ensure the backend is running at http://127.0.0.1:8000`);
+    } finally {
+      e.target.value = "";
+    }
   };
 
   const toggleSidebar = () => setIsSidebarOpen(!isSidebarOpen);
@@ -1273,10 +1326,12 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                 className="p-3 btn-secondary rounded-xl relative"
                 onClick={() => setShowNotifications(!showNotifications)}
               >
-                {notifications.some(n => !n.is_read) ? (
+                {unreadCount > 0 ? (
                   <>
                     <BellDot className="text-indigo-500" size={20} />
-                    <span className="absolute top-2.5 right-2.5 w-2 h-2 bg-red-500 rounded-full border border-white dark:border-slate-900 animate-pulse"></span>
+                    <span className="absolute -top-1 -right-1 min-w-[1.25rem] h-5 px-1 bg-red-500 text-white text-[10px] font-bold rounded-full border-2 border-white dark:border-slate-900 flex items-center justify-center">
+                      {unreadCount > 99 ? "99+" : unreadCount}
+                    </span>
                   </>
                 ) : <Bell size={20} />}
               </button>
@@ -1285,7 +1340,12 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                 <div className="absolute right-0 mt-3 w-80 dropdown-card rounded-2xl z-[300] overflow-hidden">
                   <div className="p-4 border-b border-slate-200 dark:border-slate-800 flex justify-between items-center bg-slate-50 dark:bg-slate-800/50">
                     <h3 className="font-bold text-slate-900 dark:text-white">Notifications</h3>
-                    <button className="text-xs text-indigo-500 hover:underline" onClick={() => setShowNotifications(false)}>Close</button>
+                    <div className="flex gap-3">
+                      {unreadCount > 0 && (
+                        <button className="text-xs text-indigo-500 hover:underline" onClick={handleMarkAllAsRead}>Mark all read</button>
+                      )}
+                      <button className="text-xs text-indigo-500 hover:underline" onClick={() => setShowNotifications(false)}>Close</button>
+                    </div>
                   </div>
                   <div className="max-h-96 overflow-y-auto">
                     {notifications.length > 0 ? notifications.map(n => (
@@ -1320,6 +1380,9 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                     )) : (
                       <div className="p-8 text-center text-slate-500 text-sm">No new notifications</div>
                     )}
+                    {notificationCursor && (
+                      <button className="w-full p-3 text-xs text-indigo-500 hover:underline" onClick={handleLoadOlderNotifications}>Load older</button>
+                    )}
                   </div>
                 </div>
               )}
@@ -1539,7 +1602,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                             <div className="flex items-center gap-3 text-xs text-slate-500 dark:text-gray-400 mt-1">
                               <span className="flex items-center gap-1"><Clock size={12} /> {quiz.duration}m</span>
                               <span className="flex items-center gap-1"><Key size={12} /> {quiz.access_key}</span>
-                              <span className={`px-2 py-0.5 rounded-full ${quiz.status === 'published' ? 'bg-green-500/10 text-green-600 dark:text-green-400' : 'bg-slate-100 dark:bg-slate-700 text-slate-500 dark:text-gray-300'}`}>
+                              <span className={`px-2 py-0.5 rounded-full ${quiz.status === 'live' ? 'bg-green-500/10 text-green-600 dark:text-green-400' : 'bg-slate-100 dark:bg-slate-700 text-slate-500 dark:text-gray-300'}`}>
                                 {quiz.status}
                               </span>
                             </div>
@@ -1556,9 +1619,9 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                             <button
                               className="bg-slate-100 dark:bg-slate-800 text-indigo-600 dark:text-indigo-400 px-3 py-2 rounded-lg hover:bg-indigo-600 hover:text-white transition"
                               onClick={() => {
-                                const start = new Date(quiz.start_time).toISOString().slice(0, 16);
-                                const end = new Date(quiz.end_time).toISOString().slice(0, 16);
-                                const deadline = quiz.deadline ? new Date(quiz.deadline).toISOString().slice(0, 16) : "";
+                                const start = toLocalInput(quiz.start_time);
+                                const end = toLocalInput(quiz.end_time);
+                                const deadline = toLocalInput(quiz.deadline);
                                 setEditingQuiz({ ...quiz, start_time: start, end_time: end, deadline: deadline });
                                 setShowEditQuiz(true);
                               }}
@@ -1936,12 +1999,8 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
               </div>
 
               <div className="grid grid-cols-1 gap-4">
-                {allQuizzes
+                {(quizSearchHits ?? allQuizzes)
                   .filter(q => (quizCourseFilter === 'all' || (q.course && q.course.id === Number(quizCourseFilter))))
-                  .filter(q =>
-                    q.title.toLowerCase().includes(quizSearchQuery.toLowerCase()) ||
-                    q.course?.title.toLowerCase().includes(quizSearchQuery.toLowerCase())
-                  )
                   .map(quiz => (
                     <div key={quiz.id} className="bg-white dark:bg-slate-800/50 border border-slate-200 dark:border-slate-800 p-6 rounded-2xl flex justify-between items-center group hover:border-indigo-500 transition shadow-sm dark:shadow-none">
                       <div className="flex gap-4 items-center">
@@ -1950,10 +2009,13 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                         </div>
                         <div>
                           <h4 className="font-bold text-lg text-slate-900 dark:text-white">{quiz.title}</h4>
+                          {quiz.snippet && (
+                            <p className="text-sm text-slate-500 dark:text-gray-400 mt-1">{renderSnippet(quiz.snippet)}</p>
+                          )}
                           <div className="flex items-center gap-3 text-xs text-slate-500 dark:text-gray-400 mt-1">
                             <span className="flex items-center gap-1"><Layers size={12} /> {quiz.course?.title}</span>
                             <span className="flex items-center gap-1"><Clock size={12} /> {quiz.duration}m</span>
-                            <span className={`px-2 py-0.5 rounded-full ${quiz.status === 'published' ? 'bg-green-500/10 text-green-400' : 'bg-slate-700 text-gray-300'}`}>
+                            <span className={`px-2 py-0.5 rounded-full ${quiz.status === 'live' ? 'bg-green-500/10 text-green-400' : 'bg-slate-700 text-gray-300'}`}>
                               {quiz.status}
                             </span>
                           </div>
@@ -1973,9 +2035,9 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                         <button
                           className="bg-slate-100 dark:bg-slate-800 text-indigo-600 dark:text-indigo-400 px-3 py-2 rounded-lg hover:bg-indigo-600 hover:text-white transition"
                           onClick={() => {
-                            const start = new Date(quiz.start_time).toISOString().slice(0, 16);
-                            const end = new Date(quiz.end_time).toISOString().slice(0, 16);
-                            const deadline = quiz.deadline ? new Date(quiz.deadline).toISOString().slice(0, 16) : "";
+                            const start = toLocalInput(quiz.start_time);
+                            const end = toLocalInput(quiz.end_time);
+                            const deadline = toLocalInput(quiz.deadline);
                             setEditingQuiz({ ...quiz, start_time: start, end_time: end, deadline: deadline });
                             setShowEditQuiz(true);
                           }}
@@ -2091,6 +2153,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                                     // Toggle expanded row logic
                                     const key = `expanded_${result.id}`;
                                     setExpandedResultId(expandedResultId === result.id ? null : result.id);
+                                    if (expandedResultId !== result.id) loadResultTimeline(result.id);
                                   }
                                 }}
                                 className={`px-3 py-1 rounded-full text-[10px] font-black transition-all ${result.eye_tracking_violations > 0
@@ -2102,7 +2165,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                             </td>
                             <td className="p-4 text-xs text-gray-500">{new Date(result.completed_at).toLocaleDateString()}</td>
                           </tr>
-                          {expandedResultId === result.id && result.timeline && (
+                          {expandedResultId === result.id && resultTimelines[result.id] && (
                             <tr className="bg-slate-50 dark:bg-slate-900/50">
                               <td colSpan="7" className="p-4">
                                 <div className="bg-white dark:bg-slate-800 rounded-2xl p-4 border border-red-500/10 shadow-inner">
@@ -2110,7 +2173,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                                     <ShieldAlert size={12} /> Violation Timeline
                                   </h5>
                                   <div className="space-y-2">
-                                    {result.timeline.map((log, lidx) => (
+                                    {resultTimelines[result.id].map((log, lidx) => (
                                       <div key={lidx} className="flex justify-between items-center text-xs p-2 rounded-lg bg-slate-50 dark:bg-slate-900/30">
                                         <span className="font-mono text-slate-400">{log.time}</span>
                                         <span className="font-bold text-slate-700 dark:text-gray-300">{log.reason}</span>
@@ -2390,6 +2453,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                       body: JSON.stringify(cleanUpdates)
                     });
                     if (res.ok) {
+                      storeRefreshedToken(res);
                       toast.success("Profile updated successfully!");
                     } else {
                       const err = await res.json();
@@ -2499,6 +2563,7 @@ export default function TeacherDashboard({ teacherData, onLogout }) {
                         body: JSON.stringify(data)
                       });
                       if (res.ok) {
+                        storeRefreshedToken(res);
                         toast.success("Password updated successfully!");
                         e.target.reset();
                         setPassNew("");
@@ -0,0 +1,6 @@
+// Routes that change the signed-in user answer with a fresh token in X-Access-Token, so every
+// server shows this browser the change at once. After a password change the old one stops working.
+export const storeRefreshedToken = (res) => {
+  const token = res.headers.get("X-Access-Token");
+  if (token) localStorage.setItem("token", token);
+};
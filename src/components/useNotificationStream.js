@@ -0,0 +1,16 @@
+import { useEffect, useRef } from "react";
+
+// Calls onNotification for every notification pushed over GET /notifications/stream.
+// EventSource reconnects by itself and resumes after the last event id it saw.
+export default function useNotificationStream(onNotification) {
+  const handlerRef = useRef(onNotification);
+  handlerRef.current = onNotification;
+
+  useEffect(() => {
+    const token = localStorage.getItem("token");
+    if (!token || typeof EventSource === "undefined") return;
+    const source = new EventSource(`http://127.0.0.1:8000/notifications/stream?token=${encodeURIComponent(token)}`);
+    source.addEventListener("notification", (event) => handlerRef.current(JSON.parse(event.data)));
+    return () => source.close();
+  }, []);
+}